@@ -0,0 +1,5 @@
+"""ホスト(CPython)上で動かすためのツール群
+
+- `host.sim`: machine/utime などを置き換えるシミュレーター
+- `host.bench`: エントリーポイントのベンチマーク
+"""
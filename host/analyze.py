@@ -0,0 +1,435 @@
+"""CustomLoggingのテキストログから測定値を列ごとの配列に取り出すツール
+
+- ファイル（log.txt）はメモリマップで読み、ディレクトリはセグメント（host.logs）を
+  古い順につなげて読む
+- "new session"の行でセッションに分け、行頭の[YYYY-MM-DD HH:MM:SS]と
+  AMeDASMeasurement・Distance・温度の値を取り出す（それ以外の行は数えるだけ）
+- NumPyがあれば行の区切り・時刻・数値をまとめて変換し、なければ1行ずつ変換する
+- 列名はhost.telemetryと同じなので、CSVはバイナリのテレメトリと同じ形になる
+- ログの時刻は地方時（src.constのTIME_UTC_OFFSET_SEC）なので、時差を引いてUTCのUNIX時刻に
+  換算する（host.telemetryと同じ時刻になる）。UTCで書かれた古いログは--utc-offset 0で読む
+
+Examples:
+    $ python -m host.analyze log.txt --summary
+    $ python -m host.analyze log.txt --csv log.csv
+    $ python -m host.analyze logs --resample 600 --csv log_10min.csv  # セグメントのディレクトリ
+    $ python -m host.analyze log.txt --npz log.npz  # NumPyが必要
+    $ python -m host.analyze old_log.txt --utc-offset 0 --csv old.csv  # UTCで書かれたログ
+"""
+import argparse
+import calendar
+import csv
+import mmap
+import os
+import re
+import sys
+import warnings
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from host.logs import iter_segments  # noqa: E402
+from src.const import TIME_UTC_OFFSET_SEC  # noqa: E402
+
+SESSION_MARKER = b"new session"
+PREFIX_SIZE = len("[YYYY-MM-DD HH:MM:SS] ")
+DISTANCE_PREFIX = b"Distance(left: "
+CHUNK_LINES = 1 << 16  # NumPyでまとめて変換する行数（作業用の配列の大きさを抑える）
+
+# 種別ごとの列名（host.telemetryと同じ名前で、テキストに現れる順）
+COLUMNS = {
+    "amedas": ["pressure_hpa", "temperature_c", "humidity"],
+    "distance": ["left_cm", "front_cm", "right_cm"],
+    "temperature": ["temperature_c"],
+}
+LINE = re.compile(rb"\[(\d{4})-(\d\d)-(\d\d) (\d\d):(\d\d):(\d\d)\] (.*)")
+NUMBER = re.compile(rb"-?\d+(?:\.\d+)?(?:e[-+]?\d+)?")
+
+
+def load(path: str):
+    """ログを読む
+
+    Returns:
+        mmap.mmap | bytes: ファイルならメモリマップ、ディレクトリならセグメントをつなげたもの
+    """
+    if os.path.isdir(path):
+        return b"".join(data for _, _, data in iter_segments(path))
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def classify(payload: bytes):
+    """行頭の時刻を除いた部分から種別を判定する（測定値でなければNone）"""
+    if payload.startswith(DISTANCE_PREFIX) and payload.endswith(b")"):
+        return "distance"
+    if not payload or not (payload[:1].isdigit() or payload[:1] == b"-"):
+        return None
+    if payload.endswith(b"%"):
+        return "amedas"
+    if payload[-1:].isdigit():
+        return "temperature"
+    return None
+
+
+def _empty_result() -> dict:
+    return {
+        "lines": 0,
+        "sessions": 0,
+        "other": 0,
+        "types": {
+            name: {"session": [], "epoch": [], **{column: [] for column in columns}}
+            for name, columns in COLUMNS.items()
+        },
+    }
+
+
+def parse_lines(data, utc_offset_sec: int = TIME_UTC_OFFSET_SEC) -> dict:
+    """1行ずつ正規表現で変換する（NumPyがない場合）
+
+    Args:
+        utc_offset_sec (int): ログの時刻の時差（UTCより進んでいる秒数）
+
+    Returns:
+        dict: {"lines": 行数, "sessions": "new session"の数, "other": 測定値以外の行数,
+               "types": {"amedas": {"session": list, "epoch": list, "temperature_c": list, ...}}}
+    """
+    result = _empty_result()
+    session = 0
+    if isinstance(data, bytes):
+        lines = data.split(b"\n")
+    else:
+        data.seek(0)
+        lines = iter(data.readline, b"")
+    for line in lines:
+        line = line.rstrip(b"\r\n")
+        if not line:
+            continue
+        result["lines"] += 1
+        if line == SESSION_MARKER:
+            session += 1
+            continue
+        match = LINE.match(line)
+        name = classify(match.group(7)) if match else None
+        values = NUMBER.findall(match.group(7)) if name else ()
+        if name is None or len(values) != len(COLUMNS[name]):
+            result["other"] += 1
+            continue
+        columns = result["types"][name]
+        columns["session"].append(session)
+        columns["epoch"].append(
+            calendar.timegm(tuple(int(v) for v in match.groups()[:6])) - utc_offset_sec
+        )
+        for column, value in zip(COLUMNS[name], values):
+            columns[column].append(float(value))
+    result["sessions"] = session
+    return result
+
+
+def parse_numpy(data, utc_offset_sec: int = TIME_UTC_OFFSET_SEC) -> dict:
+    """行の区切り・時刻・数値をNumPyでまとめて変換する
+
+    Args:
+        utc_offset_sec (int): ログの時刻の時差（UTCより進んでいる秒数）
+
+    Returns:
+        dict: parse_lines()と同じ形（列はndarray）
+    """
+    import numpy as np
+
+    if not len(data):
+        return _empty_result()
+    buf = np.frombuffer(data, dtype=np.uint8)
+    if buf[-1] != ord("\n"):  # 書き込み途中の最後の行
+        buf = np.append(buf, np.uint8(ord("\n")))
+    ends = np.flatnonzero(buf == ord("\n"))
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    ends = ends - (buf[np.maximum(ends - 1, 0)] == ord("\r"))
+    lengths = ends - starts
+
+    marker = _match(buf, starts, lengths, SESSION_MARKER, exact=True)
+    session = np.cumsum(marker)
+    stamped = np.flatnonzero(lengths > PREFIX_SIZE)
+    stamped = stamped[
+        (buf[starts[stamped]] == ord("["))
+        & (buf[starts[stamped] + PREFIX_SIZE - 2] == ord("]"))
+    ]
+    begin = starts[stamped] + PREFIX_SIZE
+    end = ends[stamped]
+    first = buf[begin]
+    last = buf[end - 1]
+    numeric = ((first >= ord("0")) & (first <= ord("9"))) | (first == ord("-"))
+    distance = _match(buf, begin, end - begin, DISTANCE_PREFIX) & (last == ord(")"))
+    kinds = {  # 種別ごとの(行, 数値の始まり)
+        "amedas": (numeric & (last == ord("%")), 0),
+        "distance": (distance, len(DISTANCE_PREFIX)),  # "left"のeを数値に含めない
+        "temperature": (numeric & (last >= ord("0")) & (last <= ord("9")), 0),
+    }
+
+    result = _empty_result()
+    result["lines"] = int(np.count_nonzero(lengths))
+    result["sessions"] = int(session[-1]) if len(session) else 0
+    parsed = 0
+    for name, (selected, skip) in kinds.items():
+        index = np.flatnonzero(selected)
+        lines = stamped[index]
+        values = _numbers(buf, begin[index] + skip, end[index], len(COLUMNS[name]))
+        ok = ~np.isnan(values[:, 0]) if len(values) else np.zeros(0, bool)
+        columns = result["types"][name]
+        columns["session"] = session[lines[ok]]
+        columns["epoch"] = _epoch(buf, starts[lines[ok]]) - utc_offset_sec
+        for i, column in enumerate(COLUMNS[name]):
+            columns[column] = values[ok, i]
+        parsed += int(np.count_nonzero(ok))
+    result["other"] = result["lines"] - int(np.count_nonzero(marker)) - parsed
+    return result
+
+
+def _match(buf, starts, lengths, prefix: bytes, exact: bool = False):
+    """各行がprefixから始まるか（exact=Trueの場合は一致するか）"""
+    import numpy as np
+
+    result = (lengths == len(prefix)) if exact else (lengths >= len(prefix))
+    candidates = np.flatnonzero(result)
+    for i, byte in enumerate(prefix):
+        candidates = candidates[buf[starts[candidates] + i] == byte]
+    result[:] = False
+    result[candidates] = True
+    return result
+
+
+def _epoch(buf, starts):
+    """行頭の[YYYY-MM-DD HH:MM:SS]をUNIX時刻に換算する"""
+    import numpy as np
+
+    if not len(starts):
+        return np.zeros(0, np.int64)
+    # 行頭の20バイトずつの表（添字の配列を作らずに取り出す）
+    windows = np.lib.stride_tricks.sliding_window_view(buf, PREFIX_SIZE - 2)
+    # 各桁に掛ける重み（列: 年、月、日、時、分、秒。区切り文字の重みは0）
+    weights = np.zeros((PREFIX_SIZE - 2, 6), np.float32)
+    for column, (offset, count) in enumerate(_STAMP_FIELDS):
+        for i in range(count):
+            weights[offset + i, column] = 10 ** (count - 1 - i)
+    fields = windows[starts].astype(np.float32) @ weights - ord("0") * weights.sum(axis=0)
+    year, month, day, hour, minute, second = fields.astype(np.int64).T
+    # 1970-01-01からの日数（グレゴリオ暦、3月始まりの年で数える）
+    year = year - (month <= 2)
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    days = era * 146097 + day_of_era - 719468
+    return days * 86400 + hour * 3600 + minute * 60 + second
+
+
+# [YYYY-MM-DD HH:MM:SS]の年、月、日、時、分、秒の(位置, 桁数)
+_STAMP_FIELDS = ((1, 4), (6, 2), (9, 2), (12, 2), (15, 2), (18, 2))
+
+# 数値に使う文字（数字・小数点・符号・指数）以外を空白にする表
+_NUMERIC = bytes(
+    byte if chr(byte) in "0123456789.-+e" else ord(" ") for byte in range(256)
+)
+
+
+def _numbers(buf, begin, end, count: int):
+    """行ごとの[begin, end)からcount個の数値を取り出す
+
+    Returns:
+        ndarray: (行数, count)。数値の個数が合わない行はNaN
+    """
+    import numpy as np
+
+    table = np.frombuffer(_NUMERIC, dtype=np.uint8)
+    result = np.full((len(begin), count), np.nan)
+    for chunk in range(0, len(begin), CHUNK_LINES):
+        b = begin[chunk:chunk + CHUNK_LINES]
+        e = end[chunk:chunk + CHUNK_LINES]
+        # 範囲内のバイトだけを残す（行末の改行を区切りとして含める）
+        low, high = b[0], e[-1] + 1
+        runs = np.empty(2 * len(b), np.int64)
+        runs[0::2] = b - np.concatenate(([low], e[:-1] + 1))  # 前の行との間
+        runs[1::2] = e + 1 - b
+        inside = np.repeat(np.tile(np.array([False, True]), len(b)), runs)
+        text = table.take(buf[low:high][inside]).tobytes()
+        # 崩れた行があると、NumPyのバージョンによって途中で止まるか例外になる
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            try:
+                values = np.fromstring(text, dtype=np.float64, sep=" ")
+            except ValueError:
+                values = ()
+        if len(values) == len(b) * count:
+            result[chunk:chunk + len(b)] = values.reshape(-1, count)
+            continue
+        for i, (start, stop) in enumerate(zip(b, e)):  # 崩れた行を探す
+            numbers = NUMBER.findall(buf[start:stop].tobytes())
+            if len(numbers) == count:
+                result[chunk + i] = [float(number) for number in numbers]
+    return result
+
+
+def parse(data, utc_offset_sec: int = TIME_UTC_OFFSET_SEC) -> dict:
+    """NumPyがあればparse_numpy()、なければparse_lines()で変換する"""
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return parse_lines(data, utc_offset_sec)
+    return parse_numpy(data, utc_offset_sec)
+
+
+def resample(result: dict, seconds: int) -> list:
+    """セッション・種別・seconds秒ごとに集計する
+
+    Returns:
+        list: {"type", "session", "epoch", "count", "<列>_mean", "<列>_min", "<列>_max"}のリスト
+    """
+    rows = {}
+    for name, columns in result["types"].items():
+        for i in range(len(columns["epoch"])):
+            epoch = int(columns["epoch"][i])
+            key = (name, int(columns["session"][i]), epoch - epoch % seconds)
+            row = rows.get(key)
+            if row is None:
+                row = rows[key] = {"count": 0}
+                for column in COLUMNS[name]:
+                    row[column] = [0.0, float("inf"), float("-inf")]
+            row["count"] += 1
+            for column in COLUMNS[name]:
+                value = float(columns[column][i])
+                total = row[column]
+                total[0] += value
+                total[1] = min(total[1], value)
+                total[2] = max(total[2], value)
+    output = []
+    for (name, session, epoch), row in sorted(rows.items(), key=lambda x: x[0][1:] + x[0][:1]):
+        record = {"type": name, "session": session, "epoch": epoch, "count": row["count"]}
+        for column in COLUMNS[name]:
+            total, low, high = row[column]
+            record[f"{column}_mean"] = total / row["count"]
+            record[f"{column}_min"] = low
+            record[f"{column}_max"] = high
+        output.append(record)
+    return output
+
+
+def resample_numpy(result: dict, seconds: int) -> list:
+    """resample()と同じ集計をNumPyで行う"""
+    import numpy as np
+
+    output = []
+    for name, columns in result["types"].items():
+        if not len(columns["epoch"]):
+            continue
+        epoch = np.asarray(columns["epoch"]) // seconds * seconds
+        keys, inverse, counts = np.unique(
+            np.stack([np.asarray(columns["session"]), epoch], axis=1),
+            axis=0, return_inverse=True, return_counts=True,
+        )
+        inverse = inverse.reshape(-1)
+        aggregated = {}
+        for column in COLUMNS[name]:
+            values = np.asarray(columns[column], dtype=np.float64)
+            low = np.full(len(keys), np.inf)
+            high = np.full(len(keys), -np.inf)
+            np.minimum.at(low, inverse, values)
+            np.maximum.at(high, inverse, values)
+            aggregated[column] = (np.bincount(inverse, values) / counts, low, high)
+        for i, (session, start) in enumerate(keys.tolist()):
+            record = {"type": name, "session": session, "epoch": start, "count": int(counts[i])}
+            for column, (mean, low, high) in aggregated.items():
+                record[f"{column}_mean"] = float(mean[i])
+                record[f"{column}_min"] = float(low[i])
+                record[f"{column}_max"] = float(high[i])
+            output.append(record)
+    output.sort(key=lambda record: (record["session"], record["epoch"], record["type"]))
+    return output
+
+
+def iter_rows(result: dict):
+    """測定値を1件ずつ{"type", "session", "epoch", 列: 値}として返す（種別ごとの順）"""
+    for name, columns in result["types"].items():
+        for i in range(len(columns["epoch"])):
+            row = {"type": name, "session": int(columns["session"][i])}
+            row["epoch"] = int(columns["epoch"][i])
+            for column in COLUMNS[name]:
+                row[column] = float(columns[column][i])
+            yield row
+
+
+def write_csv(rows, out, aggregated: bool = False) -> int:
+    """CSVに書き出す（その種別にない列は空欄にする）"""
+    columns = ["type", "session", "epoch"] + (["count"] if aggregated else [])
+    for names in COLUMNS.values():
+        for column in names:
+            for field in ((f"{column}_mean", f"{column}_min", f"{column}_max")
+                          if aggregated else (column,)):
+                if field not in columns:
+                    columns.append(field)
+    writer = csv.DictWriter(out, fieldnames=columns)
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def summarize(result: dict) -> dict:
+    return {
+        "lines": result["lines"],
+        "sessions": result["sessions"],
+        "records": {name: len(columns["epoch"]) for name, columns in result["types"].items()},
+        "other_lines": result["other"],
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="log.txt、またはlog.idxとlog.N.txtがあるディレクトリ")
+    parser.add_argument("--csv", help="CSVの出力先（-で標準出力）")
+    parser.add_argument("--npz", help="NumPyのnpzの出力先")
+    parser.add_argument("--resample", type=int, help="この秒数ごとの平均・最小・最大にする")
+    parser.add_argument(
+        "--utc-offset", type=int, default=TIME_UTC_OFFSET_SEC,
+        help=f"ログの時刻の時差[s]（既定は{TIME_UTC_OFFSET_SEC}、UTCのログは0）",
+    )
+    parser.add_argument("--summary", action="store_true")
+    args = parser.parse_args(argv)
+
+    result = parse(load(args.path), args.utc_offset)
+    if args.resample:
+        try:
+            rows = resample_numpy(result, args.resample)
+        except ImportError:
+            rows = resample(result, args.resample)
+    else:
+        rows = iter_rows(result)
+    if args.csv:
+        if args.csv == "-":
+            write_csv(rows, sys.stdout, aggregated=bool(args.resample))
+        else:
+            with open(args.csv, "w", newline="", encoding="utf-8") as f:
+                write_csv(rows, f, aggregated=bool(args.resample))
+    if args.npz:
+        import numpy as np
+
+        if args.resample:
+            keys = dict.fromkeys(key for row in rows for key in row)
+            arrays = {key: np.array([row.get(key, np.nan) for row in rows]) for key in keys}
+        else:
+            arrays = {
+                f"{name}_{column}": np.asarray(values)
+                for name, columns in result["types"].items()
+                for column, values in columns.items()
+            }
+        np.savez_compressed(args.npz, **arrays)
+    if args.summary or not (args.csv or args.npz):
+        print(summarize(result))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
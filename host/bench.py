@@ -0,0 +1,1096 @@
+"""エントリーポイントのベンチマーク
+
+host.simの上でエントリーポイントを仮想時間で実行し、次の値を計測する
+
+- ループの反復回数/秒（仮想時間 = 実機での見積もり、実時間 = ホストでの処理量）
+- ステージ（デバイスのメソッド）ごとの仮想時間のレイテンシ
+- ステージごとのメモリ確保量（--alloc指定時、tracemallocのピーク値）
+- robot_car: 正面に障害物が現れてからモーターの指令が変わるまでの反応時間
+- --core1: 測定をcore1（ホストではスレッド）で行うモード（ACQUISITION_ON_CORE1）で計測する
+- --profile: 実機と同じsrc.util.profileのヒストグラム（p50/p95/最大値）も表示する
+- --scenario webhook: Slack送信の遅延・失敗・Wi-Fi切断を注入したときの
+  POST回数、退避件数、制御ループの最大遅れ
+- --scenario wifi: Wi-Fiにつながるまで待つ場合と、バックグラウンドで接続する場合の最初の測定までの時間
+- --scenario telemetry: 測定値をテキストとバイナリで記録したときの容量と処理時間
+- --scenario logstore: テキストログを上限の何倍も書き込んだときの容量と書き出しの時間
+- --scenario analyze: 合成したテキストログをhost.analyzeで変換する行数/秒
+- --scenario amedas: BME280の値を文字列経由で読む場合と整数のまま読む場合の比較
+- --scenario distance: 3回測定して中央値をとる場合と、1回測定してフィルタする場合の比較
+- --scenario time: タイムスタンプ1回あたりの処理時間とメモリ確保量
+- --scenario ntp: 水晶のずれを注入したときのタイムスタンプの誤差と、時刻合わせで制御ループが止まる時間
+- --scenario button: ボタンをループで読む場合と、割り込みで記録する場合の取りこぼしと遅れ
+
+Examples:
+    $ python -m host.bench --seconds 60
+    $ python -m host.bench --entry robot_car --json result.json
+    $ python -m host.bench --baseline result.json  # 悪化していれば終了コード1
+"""
+from array import array
+import argparse
+import functools
+import importlib
+import inspect
+import json
+import sys
+import time
+import tracemalloc
+
+from host import sim
+
+ENTRIES = {
+    "robot_car": {
+        "loop": "src.util.sweep:SweepPlanner.record_decision",  # 1回の判断を1ループとする
+        "reaction": True,
+        "stages": [
+            "src.device:TemperatureSensor.measure",
+            "src.device:ServoMotor.set_angle",
+            "src.device:ServoMotor.set_angle_async",
+            "src.device:UltrasonicSensor.measure",
+            "src.device:UltrasonicSensor.measure_async",
+            "src.device:MotorDriver.forward",
+            "src.device:MotorDriver.backward",
+            "src.device:MotorDriver.left",
+            "src.device:MotorDriver.right",
+            "src.device:MotorDriver.stop",
+            "src.util.logging:CustomLogging.write",
+        ],
+    },
+    "temperature_humidity_pressure": {
+        "loop": "src.device:AMeDAS.measure_async",
+        "core1_loop": "src.device:AMeDAS.measure",  # --core1のとき
+        "stages": [
+            "src.device:AMeDAS.measure",
+            "src.device:AMeDAS.measure_async",
+            "src.device:Display.print",
+            "src.util.logging:CustomLogging.write",
+        ],
+    },
+}
+
+
+REACTION_PERIOD_US = 5000000
+REACTION_CLEAR_US = 3000000
+
+
+def reaction_scene(angle: float, t_us: int) -> float:
+    """5秒周期で、3秒間は何もなく、その後2秒間だけ正面15cmに障害物が現れる"""
+    if t_us % REACTION_PERIOD_US < REACTION_CLEAR_US or abs(angle) > 30:
+        return 200.0
+    return 15.0
+
+
+def measure_reaction(seconds: float, core1: bool = False) -> dict:
+    """障害物が現れてから左モーターが前進以外の指令に変わるまでの時間を計測する"""
+    from host.sim.peripherals import World
+
+    simulation = sim.install(world=World(scene=reaction_scene))
+    if core1:
+        _enable_core1()
+    board = simulation.board
+    reactions = []
+    state = {"appeared_us": None}
+
+    def on_motor(_level):
+        appeared_us = state["appeared_us"]
+        forward = board.pin(19).level == 1 and board.pin(18).level == 0
+        if appeared_us is not None and not forward:
+            reactions.append(simulation.clock.now_us - appeared_us)
+            state["appeared_us"] = None
+
+    def appear(at_us):
+        def callback():
+            forward = board.pin(19).level == 1 and board.pin(18).level == 0
+            state["appeared_us"] = at_us if forward else None
+        return callback
+
+    at_us = REACTION_CLEAR_US
+    while at_us < seconds * 1000000:
+        simulation.clock.schedule(at_us, appear(at_us))
+        at_us += REACTION_PERIOD_US
+    for num in (18, 19):
+        board.pin(num).listeners.append(on_motor)
+    sim.run_entry("robot_car", seconds)
+    reactions.sort()
+    return {
+        "count": len(reactions),
+        "p50_ms": reactions[len(reactions) // 2] / 1000 if reactions else None,
+        "max_ms": reactions[-1] / 1000 if reactions else None,
+    }
+
+
+def measure_webhook(seconds: float) -> dict:
+    """Webhookの送信が制御ループを止めないかを計測する
+
+    - 100msごとにログを書き、10ms周期のタスクの遅れを記録する
+    - 模擬サーバーは300msの遅延と20%の失敗を返し、途中の20秒間はWi-Fiが切れる
+    """
+    from host.sim.http import WebhookStandIn
+    from host.sim.peripherals import World
+
+    world = World()
+    world.pico_w = True
+    simulation = sim.install(world=world)
+    simulation.set_wifi(True)
+    server = WebhookStandIn(simulation.clock, world, latency_ms=300, fail_rate=0.2)
+    simulation.http_servers[("hooks.slack.com", 443)] = server
+    clock = simulation.clock
+    clock.schedule(20000000, lambda: simulation.set_wifi(False))
+    clock.schedule(40000000, lambda: simulation.set_wifi(True))
+
+    import uasyncio
+    from src.util.logging import CustomLogging
+
+    logger = CustomLogging(console=False, slack=True)
+    stall = {"max_us": 0, "messages": 0}
+
+    async def produce():
+        while True:
+            logger.write(f"message {stall['messages']}")
+            stall["messages"] += 1
+            await uasyncio.sleep_ms(100)
+
+    async def control():
+        while True:
+            expected = clock.now_us + 10000
+            await uasyncio.sleep_ms(10)
+            stall["max_us"] = max(stall["max_us"], clock.now_us - expected)
+
+    async def main():
+        await uasyncio.gather(produce(), control(), logger.run())
+
+    clock.deadline_us = int(seconds * 1000000)
+    with simulation.flash:
+        try:
+            uasyncio.run(main())
+        except sim.SimulationStop:
+            pass
+    return {
+        "messages": stall["messages"],
+        "control_max_delay_ms": stall["max_us"] / 1000,
+        "sender": dict(logger.webhook.stats),
+        "queued": len(logger.webhook.queue),
+        "server": dict(server.stats),
+    }
+
+
+def measure_wifi(seconds: float) -> dict:
+    """Wi-Fiにつながるまでの時間が、最初の測定までの時間に影響するかを比べる
+
+    - temperature_humidity_pressureをWi-Fi付きのファームウェアとして実行する
+    - アクセスポイントが最初からある・30秒後に現れる・ない場合について、
+      以前のやり方（prepare_wifi()でつながるまで待つ）と、WifiSupervisorの
+      最初の測定・接続までの時間、測定回数を比べる
+    - 以前のやり方は、つながった場合はその時刻から測定を始めるものとして見積もる
+    """
+    from host.sim.peripherals import World
+
+    result = {}
+    for name, available_s in (("available", 0), ("after 30s", 30), ("never", None)):
+        world = World()
+        world.pico_w = True
+        world.wifi_available = available_s == 0
+        simulation = sim.install(world=world)
+        clock = simulation.clock
+        if available_s:
+            clock.schedule(
+                available_s * 1000000, lambda: setattr(world, "wifi_available", True)
+            )
+        import uasyncio
+        from src.errors import WifiConnectionTimeoutError
+        from src.util.wifi import prepare_wifi
+
+        try:
+            uasyncio.run(prepare_wifi())
+            blocking = {"ready_s": clock.now_us / 1000000}
+        except WifiConnectionTimeoutError as e:
+            blocking = {"error_s": clock.now_us / 1000000, "error": str(e)}
+
+        simulation = sim.install(world=world)
+        clock = simulation.clock
+        world.wifi_available = available_s == 0
+        if available_s:
+            clock.schedule(
+                available_s * 1000000, lambda: setattr(world, "wifi_available", True)
+            )
+        import src.device
+
+        measured = []
+        original = src.device.AMeDAS.measure_async
+
+        async def measure_async(self, *args, **kwargs):
+            measured.append(clock.now_us)
+            return await original(self, *args, **kwargs)
+
+        src.device.AMeDAS.measure_async = measure_async
+        namespace = sim.run_entry("temperature_humidity_pressure", seconds)
+        wifi = namespace["wifi"]
+        result[name] = {
+            "prepare_wifi (before)": blocking,
+            "supervisor": {
+                "first_measurement_s": measured[0] / 1000000 if measured else None,
+                "measurements": len(measured),
+                "connected": wifi.connected,
+                "stats": dict(wifi.stats),
+            },
+        }
+    return result
+
+
+def measure_telemetry(seconds: float) -> dict:
+    """測定値をテキストとバイナリで記録したときの容量と処理時間を比べる
+
+    - 10Hzでseconds秒分の測定値（AMeDAS, 距離, 温度を順に）を記録する
+    """
+    simulation = sim.install()
+    import os
+    import src.const
+    from src.dataclasses import Distance
+    from src.device import AMeDAS
+    from src.util.logging import CustomLogging
+
+    amedas = AMeDAS(num_sda=12, num_scl=13)
+    samples = [
+        amedas.measure(),
+        Distance(left=52.93479, front=120.58510900000002, right=79.128089),
+        25.171843274328957,
+    ]
+    count = int(seconds * 10)
+    result = {"samples": count}
+    for name, telemetry in (("text", False), ("binary", True)):
+        logger = CustomLogging(console=False, telemetry=telemetry)
+        tracemalloc.start()
+        started_ns = time.perf_counter_ns()
+        for index in range(count):
+            logger.write(samples[index % 3])
+        elapsed_ns = time.perf_counter_ns() - started_ns
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        logger.flush()
+        if telemetry:
+            paths = [src.const.TELEMETRY_FILE_PATH]
+        else:
+            paths = [path for _, _, path in logger._store.segments()]
+        size = sum(os.path.getsize(path) for path in paths)
+        result[name] = {
+            "bytes": size,
+            "bytes_per_sample": size / count,
+            "host_us_per_sample": elapsed_ns / count / 1000,
+            "alloc_peak_bytes": peak,
+        }
+        for path in paths + [src.const.LOG_INDEX_FILE_PATH]:
+            if os.path.exists(path):
+                os.remove(path)
+    del simulation
+    return result
+
+
+def measure_logstore(seconds: float) -> dict:
+    """テキストログを上限の何倍も書き込んだときの容量と書き出しの時間を計測する
+
+    - 1秒に10行（温度のログ）をseconds * 100秒分書き込む
+      （既定の60秒で約3.3MB、LOG_TOTAL_BYTESの約25倍）
+    - 書き出しとセグメントの切り替えはlogger.run()のタスクが行う
+    - 書き出し1回ごとの仮想時間を、最初の1割と最後の1割で比べる
+    - write()1回の最大時間も記録する（書き出し・切り替えが入らなければ0）
+    """
+    simulation = sim.install()
+    clock = simulation.clock
+    import os
+    import uasyncio
+    import src.const
+    from src.util.logging import CustomLogging
+
+    logger = CustomLogging(console=False)
+    store = logger._store
+    flush_us = []
+    original = logger._flush_file
+
+    def flush_file():
+        started_us = clock.now_us
+        pending = logger._length
+        original()
+        if pending:
+            flush_us.append(clock.now_us - started_us)
+
+    logger._flush_file = flush_file
+    lines = int(seconds * 1000)
+    written = 0
+    write_max_us = 0
+
+    async def main():
+        nonlocal written, write_max_us
+        uasyncio.create_task(logger.run())
+        for index in range(lines):
+            message = f"temperature: {20 + index % 100 / 10:.1f}C, loop {index}"
+            started_us = clock.now_us
+            logger.write(message)
+            write_max_us = max(write_max_us, clock.now_us - started_us)
+            written += len(message) + 22
+            await uasyncio.sleep_ms(100)
+        logger.flush()
+
+    with simulation.flash:
+        uasyncio.run(main())
+
+    def summary(values):
+        values = sorted(values)
+        return {
+            "flushes": len(values),
+            "p50_ms": values[len(values) // 2] / 1000,
+            "max_ms": values[-1] / 1000,
+        }
+
+    tenth = max(len(flush_us) // 10, 1)
+    paths = [path for _, _, path in store.segments()]
+    result = {
+        "lines": lines,
+        "bytes_written": written,
+        "bytes_on_flash": sum(os.path.getsize(path) for path in paths),
+        "limit_bytes": store.slots * store.segment_bytes,
+        "segments": len(paths),
+        "rotations": store.rotations,
+        "write_max_ms": write_max_us / 1000,
+        "first_flushes": summary(flush_us[:tenth]),
+        "last_flushes": summary(flush_us[-tenth:]),
+        "flash": dict(simulation.flash.stats),
+    }
+    for path in paths + [src.const.LOG_INDEX_FILE_PATH]:
+        os.remove(path)
+    return result
+
+
+def measure_analyze(seconds: float) -> dict:
+    """合成したテキストログをhost.analyzeで変換する速さを比べる
+
+    - seconds * 10000行のログ（5000行ごとに"new session"）を作る。
+      AMeDASMeasurement・Distance・温度・その他の行を順に並べ、値はsrcのクラスで整形する
+    - 1行ずつTime.from_stringとfloatで変換する場合（以前のやり方）、
+      parse_lines（正規表現）、parse_numpy（NumPyがある場合）の行数/秒を比べる
+    """
+    import calendar
+    import os
+    import random
+    import tempfile
+
+    sim.install()
+    from host import analyze
+    from src.dataclasses import Distance
+    from src.device import AMeDASMeasurement
+    from src.util.time import Time
+
+    rng = random.Random(0)
+    lines = int(seconds * 10000)
+    fd, path = tempfile.mkstemp(prefix="pico-log-", suffix=".txt")
+    epoch = 1700000000
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        for index in range(lines):
+            if index % 5000 == 0:
+                f.write("\n\nnew session\n")
+            epoch += rng.randint(0, 2)
+            stamp = time.strftime("[%Y-%m-%d %H:%M:%S] ", time.gmtime(epoch))
+            kind = index % 4
+            if kind == 0:
+                message = AMeDASMeasurement(
+                    rng.randint(-500, 3500), rng.randint(98000, 104000) * 256,
+                    rng.randint(20, 90) * 1024,
+                )
+            elif kind == 1:
+                message = Distance(*(rng.uniform(2, 400) for _ in range(3)))
+            elif kind == 2:
+                message = 27 - (rng.random() * 3.3 - 0.706) / 0.001721
+            else:
+                message = "UltrasonicSensorTimeoutError"
+            f.write(f"{stamp}{message}\n")
+
+    def from_string(data):  # 以前のやり方: 1行ずつ時刻と値を変換する
+        records = 0
+        for line in iter(data.readline, b""):
+            line = line.decode("utf-8")
+            if not line.startswith("["):
+                continue
+            now = Time.from_string(line[1:20])
+            calendar.timegm((now.year, now.month, now.day, now.hour, now.minute, now.second))
+            try:
+                float(line[22:])
+            except ValueError:
+                continue
+            records += 1
+        return records
+
+    candidates = {"Time.from_string (before)": from_string, "parse_lines": analyze.parse_lines}
+    try:
+        import numpy  # noqa: F401
+
+        candidates["parse_numpy"] = analyze.parse_numpy
+    except ImportError:
+        pass
+    result = {"lines": lines, "bytes": os.path.getsize(path)}
+    for name, parse in candidates.items():
+        data = analyze.load(path)
+        started_ns = time.perf_counter_ns()
+        parsed = parse(data)
+        elapsed_ns = time.perf_counter_ns() - started_ns
+        result[name] = {"lines_per_sec": lines / (elapsed_ns / 1e9)}
+        if isinstance(parsed, dict):
+            result[name]["summary"] = analyze.summarize(parsed)
+        del data, parsed
+    os.remove(path)
+    return result
+
+
+def measure_time(seconds: float) -> dict:
+    """タイムスタンプの取得にかかる時間とメモリ確保量を計測する
+
+    - 100Hzで呼び出す想定で、1回ごとに仮想時計を10ms進める
+    - メモリ確保量は1回の呼び出し中のtracemallocのピーク値の平均
+    """
+    simulation = sim.install()
+    import utime
+    from src.util.time import Time, monotonic_ms, now_epoch_ms
+
+    def rebuild():  # 以前の実装: 毎回localtime()からTimeを作って整形する
+        now = utime.localtime()
+        return (
+            f"{now[0]:04d}-{now[1]:02d}-{now[2]:02d} "
+            + f"{now[3]:02d}:{now[4]:02d}:{now[5]:02d}"
+        )
+
+    calls = int(seconds * 100)
+    candidates = {
+        "rebuild (before)": rebuild,
+        "Time.now_string": Time.now_string,
+        "str(Time.now())": lambda: str(Time.now()),
+        "monotonic_ms": monotonic_ms,
+        "utime.ticks_ms": utime.ticks_ms,
+        "utime.time (RTC)": utime.time,
+        "now_epoch_ms": now_epoch_ms,
+    }
+    result = {"calls": calls}
+    for name, func in candidates.items():
+        elapsed_ns = 0
+        tracemalloc.start()
+        allocated = 0
+        for _ in range(calls):
+            simulation.clock.advance(10000)
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            started_ns = time.perf_counter_ns()
+            func()
+            elapsed_ns += time.perf_counter_ns() - started_ns
+            allocated += tracemalloc.get_traced_memory()[1] - base
+        tracemalloc.stop()
+        result[name] = {
+            "host_ns_per_call": elapsed_ns / calls,
+            "alloc_bytes_per_call": allocated / calls,
+        }
+    return result
+
+
+def measure_ntp(seconds: float, drift_ppm: float = 50) -> dict:
+    """水晶がdrift_ppmだけ速いときの、タイムスタンプの誤差を比べる
+
+    - 仮想時間でseconds * 360秒（60秒なら6時間）動かし、1分ごとに
+      タイムスタンプとNTPサーバーの時刻（Simulation.utc_epoch()）の差を記録する
+    - 以前のやり方: 起動時にntp_sync()を1回だけ呼び、utime.time()（RTC）を使う
+    - TimeSync: バックグラウンドで定期的に合わせ、now_epoch_ms()を使う。
+      ずれの速さの見積もりを無効にした場合も比べる
+    - 10ms周期の制御ループの最大遅れも記録する（時刻合わせで止まらないか）
+    """
+    from host.sim.peripherals import World
+
+    duration_s = int(seconds * 360)
+
+    def install():
+        world = World()
+        world.pico_w = True
+        world.clock_drift_ppm = drift_ppm
+        simulation = sim.install(world=world)
+        simulation.set_wifi(True)
+        return simulation
+
+    def summary(errors_ms: list) -> dict:
+        worst = max(abs(e) for e in errors_ms)
+        return {
+            "samples": len(errors_ms),
+            "max_abs_error_ms": round(worst, 1),
+            "mean_abs_error_ms": round(sum(abs(e) for e in errors_ms) / len(errors_ms), 1),
+            "final_error_ms": round(errors_ms[-1], 1),
+        }
+
+    result = {"drift_ppm": drift_ppm, "virtual_s": duration_s}
+
+    simulation = install()
+    clock = simulation.clock
+    import utime
+    from src.util.time import ntp_sync
+
+    started_us = clock.now_us
+    ntp_sync()
+    blocked_ms = (clock.now_us - started_us) / 1000
+    errors = []
+    for _ in range(duration_s // 60):
+        clock.advance(60000000)
+        errors.append(utime.time() * 1000 - simulation.utc_epoch() * 1000)
+    result["ntp_sync once (before)"] = dict(summary(errors), blocked_ms=blocked_ms)
+
+    for name, estimate in (("TimeSync", True), ("TimeSync without drift estimate", False)):
+        simulation = install()
+        clock = simulation.clock
+        import uasyncio
+        import src.util.time as timekeeping
+
+        if not estimate:
+            timekeeping.TIME_DRIFT_MAX_PPM = 0
+        timesync = timekeeping.TimeSync()
+        errors = []
+        lateness = [0]
+
+        async def control():
+            while True:
+                expected_us = clock.now_us + 10000
+                await uasyncio.sleep_ms(10)
+                lateness[0] = max(lateness[0], clock.now_us - expected_us)
+
+        async def main():
+            uasyncio.create_task(timesync.run())
+            uasyncio.create_task(control())
+            for _ in range(duration_s // 60):
+                await uasyncio.sleep(60)
+                errors.append(timekeeping.now_epoch_ms() - simulation.utc_epoch() * 1000)
+
+        uasyncio.run(main())
+        result[name] = dict(
+            summary(errors),
+            control_lateness_max_ms=lateness[0] / 1000,
+            stats=dict(timesync.stats),
+        )
+    return result
+
+
+def measure_amedas(seconds: float) -> dict:
+    """BME280の値を文字列経由で読む場合と整数のまま読む場合を比べる
+
+    - 10Hzでseconds秒分を測定し、測定と文字列化（表示・記録）にかかる
+      ホストの処理時間とメモリ確保量を比べる
+    - どちらもI2Cの読み出しは1回で同じなので、ドライバの読み出しは
+      一度測定した値を返すものに置き換え、変換の差だけを計測する
+    """
+    sim.install()
+    from src.device import AMeDAS
+
+    amedas = AMeDAS(num_sda=12, num_scl=13)
+    fixed = amedas.bme.read_compensated_data()
+
+    def read_fixed(result=None):
+        if result:
+            result[0], result[1], result[2] = fixed
+            return result
+        return array("i", fixed)
+
+    amedas.bme.read_compensated_data = read_fixed
+
+    def parse_values():  # 以前の実装: valuesの文字列から単位を除いてfloatにする
+        temperature, pressure, humidity = amedas.bme.values
+        return float(pressure[:-3]), float(temperature[:-1]), float(humidity[:-1])
+
+    reused = amedas.measure()
+    candidates = {
+        "values (before)": parse_values,
+        "measure": amedas.measure,
+        "measure(result)": lambda: amedas.measure(reused),
+        "measure + str": lambda: str(amedas.measure()),
+    }
+    count = int(seconds * 10)
+    result = {"samples": count}
+    for name, func in candidates.items():
+        tracemalloc.start()
+        allocated = 0
+        started_ns = time.perf_counter_ns()
+        for _ in range(count):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            func()
+            allocated += tracemalloc.get_traced_memory()[1] - base
+        elapsed_ns = time.perf_counter_ns() - started_ns
+        tracemalloc.stop()
+        result[name] = {
+            "host_us_per_sample": elapsed_ns / count / 1000,
+            "alloc_bytes_per_sample": allocated / count,
+        }
+    return result
+
+
+def measure_distance(seconds: float) -> dict:
+    """1角度あたり3回測定して中央値をとる場合と、1回測定してフィルタする場合を比べる
+
+    - 5%の確率で誤った距離（マルチパス）を返し、障害物が6秒周期で前後する
+    - スイープの速さと、真の距離との誤差を比べる
+    """
+    import math
+    from host.sim.peripherals import World
+
+    def scene(angle, t_us):
+        return 100.0 + 50.0 * math.sin(t_us / 1000000 * 2 * math.pi / 6) + angle / 2
+
+    result = {}
+    for name in ("median3", "single", "filtered"):
+        world = World(scene=scene)
+        world.echo_noise_cm = 1.0
+        world.echo_spike_rate = 0.05
+        simulation = sim.install(world=world)
+        from src.device import ServoMotor, UltrasonicSensor
+        from src.util.filter import DistanceFilter
+
+        servo = ServoMotor(num_pwm=1)
+        sensor = UltrasonicSensor(num_trigger=14, num_echo=15)
+        sensor.set_temperature(world.ambient_c)
+        filters = {angle: DistanceFilter() for angle in (-60, 0, 60)}
+        errors = []
+        sweeps = 0
+        while simulation.clock.now_us < seconds * 1000000:
+            for angle in (-60, 0, 60):
+                servo.set_angle(angle)
+                if name == "median3":
+                    distance = sensor.measure()
+                else:
+                    distance = sensor._measure_once()
+                    if name == "filtered":
+                        distance = filters[angle].update(distance)
+                errors.append(abs(distance - scene(angle, simulation.clock.now_us)))
+            sweeps += 1
+        errors.sort()
+        result[name] = {
+            "sweeps_per_s": sweeps / (simulation.clock.now_us / 1000000),
+            "pings": simulation.ultrasonic.pings,
+            "error_cm_p50": errors[len(errors) // 2],
+            "error_cm_p95": errors[int(len(errors) * 0.95)],
+            "outliers_over_20cm": sum(e > 20 for e in errors),
+            "readings": len(errors),
+        }
+    return result
+
+
+def measure_button(seconds: float) -> dict:
+    """ボタンをループで読む場合と、割り込みで記録する場合を比べる
+
+    - 平均1秒おきに30~300msだけボタンを押し、押した直後と離した直後に
+      2ms以内のチャタリングを入れる
+    - ループで読む場合は100msごとにis_push()を読む（他の処理をしているループを想定）
+    - 検知した回数、押してから検知するまでの遅れ、ピンを読んだ回数を比べる
+    """
+    import random
+
+    num_in = 16
+    result = {}
+    for name in ("polling", "irq"):
+        simulation = sim.install()
+        clock = simulation.clock
+        board = simulation.board
+        rng = random.Random(0)
+        presses = []
+        at_us = 0
+        while at_us < seconds * 1000000:
+            at_us += int(rng.expovariate(1.0) * 1000000) + 400000
+            duration_us = rng.randint(30000, 300000)
+            presses.append(at_us)
+            for start_us, level in ((at_us, 1), (at_us + duration_us, 0)):
+                for i in range(3):  # チャタリング
+                    bounce_us = start_us + rng.randint(0, 2000)
+                    board.schedule_drive(num_in, 1 - level, bounce_us)
+                    board.schedule_drive(num_in, level, bounce_us + 100)
+                board.schedule_drive(num_in, level, start_us + 2200)
+
+        import uasyncio
+        from src.device import Button
+
+        button = Button(num_in=num_in)
+        detected = []
+
+        async def poll():
+            pushed = False
+            while True:
+                if button.is_push() and not pushed:
+                    detected.append(clock.now_us)
+                pushed = button.is_push()
+                await uasyncio.sleep_ms(100)
+
+        async def wait():
+            while True:
+                level, _ = await button.wait_for_event()
+                if level:
+                    detected.append(clock.now_us)
+
+        clock.deadline_us = int(seconds * 1000000)
+        try:
+            uasyncio.run(poll() if name == "polling" else wait())
+        except sim.SimulationStop:
+            pass
+        presses = [t for t in presses if t + 400000 < clock.deadline_us]
+        delays = []
+        for press_us in presses:
+            later = [t for t in detected if press_us <= t < press_us + 400000]
+            if later:
+                delays.append(later[0] - press_us)
+        delays.sort()
+        result[name] = {
+            "presses": len(presses),
+            "detected": len(detected),
+            "missed": len(presses) - len(delays),
+            "delay_ms_p50": delays[len(delays) // 2] / 1000 if delays else None,
+            "delay_ms_max": delays[-1] / 1000 if delays else None,
+            "pin_reads": board.stats["pin_reads"],
+            "irqs": board.stats["irqs"],
+            "dropped": button.dropped,
+        }
+    return result
+
+
+SCENARIOS = {
+    "amedas": measure_amedas,
+    "analyze": measure_analyze,
+    "button": measure_button,
+    "distance": measure_distance,
+    "logstore": measure_logstore,
+    "ntp": measure_ntp,
+    "webhook": measure_webhook,
+    "wifi": measure_wifi,
+    "telemetry": measure_telemetry,
+    "time": measure_time,
+}
+
+
+class Stage:
+    """1つのステージ（メソッド）の計測結果"""
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.virtual_us = []
+        self.wall_ns = []
+        self.alloc_bytes = []
+
+    def summary(self) -> dict:
+        def percentile(values, q):
+            if not values:
+                return 0
+            values = sorted(values)
+            return values[min(len(values) - 1, int(len(values) * q))]
+
+        calls = len(self.virtual_us)
+        return {
+            "calls": calls,
+            "virtual_us_mean": sum(self.virtual_us) / calls if calls else 0,
+            "virtual_us_p50": percentile(self.virtual_us, 0.5),
+            "virtual_us_p95": percentile(self.virtual_us, 0.95),
+            "virtual_us_max": max(self.virtual_us, default=0),
+            "wall_us_mean": sum(self.wall_ns) / calls / 1000 if calls else 0,
+            "alloc_bytes_mean": (
+                sum(self.alloc_bytes) / len(self.alloc_bytes)
+                if self.alloc_bytes else None
+            ),
+        }
+
+
+def _resolve(spec: str):
+    module_name, qualname = spec.split(":")
+    class_name, method_name = qualname.split(".")
+    try:
+        module = importlib.import_module(module_name)
+    except ImportError:
+        return None, None, None
+    cls = getattr(module, class_name, None)
+    if cls is None or method_name not in cls.__dict__:
+        return None, None, None
+    return cls, method_name, cls.__dict__[method_name]
+
+
+def instrument(spec: str, track_alloc: bool):
+    """クラスのメソッドを計測用のラッパーに差し替える
+
+    - 計測するメソッド同士が入れ子にならない前提でtracemallocのピークを使う
+
+    Returns:
+        tuple: (Stage, 元に戻す関数)。メソッドが存在しなければ(None, None)
+    """
+    cls, method_name, original = _resolve(spec)
+    if cls is None:
+        return None, None
+    stage = Stage(spec.split(":")[1])
+    clock = sim.current().clock
+
+    def start():
+        if track_alloc:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        else:
+            base = 0
+        return clock.now_us, time.perf_counter_ns(), base
+
+    def stop(started):
+        virtual_us, wall_ns, base = started
+        stage.virtual_us.append(clock.now_us - virtual_us)
+        stage.wall_ns.append(time.perf_counter_ns() - wall_ns)
+        if track_alloc:
+            stage.alloc_bytes.append(tracemalloc.get_traced_memory()[1] - base)
+
+    if inspect.iscoroutinefunction(original):
+        @functools.wraps(original)
+        async def wrapper(*args, **kwargs):
+            started = start()
+            try:
+                return await original(*args, **kwargs)
+            finally:
+                stop(started)
+    else:
+        @functools.wraps(original)
+        def wrapper(*args, **kwargs):
+            started = start()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                stop(started)
+
+    setattr(cls, method_name, wrapper)
+    return stage, lambda: setattr(cls, method_name, original)
+
+
+def _enable_core1() -> None:
+    """測定をcore1で行うモード（ACQUISITION_ON_CORE1）にする"""
+    import src.const
+
+    src.const.ACQUISITION_ON_CORE1 = True
+
+
+def _enable_profile() -> None:
+    """src.util.profileの計測（PROFILE_ENABLED）を有効にする
+
+    - デコレータはsrc.deviceなどを読み込むときに適用されるので、読み込む前に呼び出す
+    """
+    import src.const
+
+    src.const.PROFILE_ENABLED = True
+
+
+def _job_stats(jobs: list) -> dict:
+    return {
+        job.name: {
+            "period_ms": job.period_ms,
+            "runs": job.runs,
+            "jitter_max_ms": job.jitter_max_ms,
+            "duration_max_ms": job.duration_max_ms,
+            "overruns": job.overruns,
+            "skipped": job.skipped,
+        }
+        for job in jobs
+    }
+
+
+def run(
+    entry: str,
+    seconds: float,
+    track_alloc: bool = False,
+    world=None,
+    core1: bool = False,
+    profile: bool = False,
+) -> dict:
+    """1つのエントリーポイントを計測する
+
+    Args:
+        core1 (bool): 測定をcore1（ホストではスレッド）で行うか
+        profile (bool): 実機と同じsrc.util.profileのヒストグラムも集計するか
+
+    Returns:
+        dict: 計測結果
+    """
+    config = ENTRIES[entry]
+    simulation = sim.install(world=world)
+    if core1:
+        _enable_core1()
+    if profile:
+        _enable_profile()
+    loop_spec = config["loop"]
+    if core1:
+        loop_spec = config.get("core1_loop", loop_spec)
+    stages = {}
+    restores = []
+    for spec in dict.fromkeys([loop_spec] + config["stages"]):
+        stage, restore = instrument(spec, track_alloc)
+        if stage is not None:
+            stages[spec] = stage
+            restores.append(restore)
+
+    if track_alloc:
+        tracemalloc.start()
+    started_ns = time.perf_counter_ns()
+    namespace = {}
+    try:
+        namespace = sim.run_entry(entry, seconds)
+    finally:
+        wall_s = (time.perf_counter_ns() - started_ns) / 1000000000
+        if track_alloc:
+            tracemalloc.stop()
+        for restore in restores:
+            restore()
+
+    virtual_s = simulation.clock.now_us / 1000000
+    loop = stages.get(loop_spec)
+    iterations = len(loop.virtual_us) if loop else 0
+    result = {
+        "entry": entry + (" (core1)" if core1 else ""),
+        "iterations": iterations,
+        "virtual_s": virtual_s,
+        "wall_s": wall_s,
+        "iterations_per_s": iterations / virtual_s if virtual_s else 0,
+        "host_iterations_per_s": iterations / wall_s if wall_s else 0,
+        "stages": {
+            stage.name: stage.summary() for stage in stages.values()
+        },
+        "devices": {
+            "pings": simulation.ultrasonic.pings,
+            "servo_moves": simulation.servo.moves,
+            "adc_reads": simulation.chip_temperature.reads,
+            "bme280_measurements": simulation.bme280.measurements,
+            "i2c": {
+                bus_id: dict(bus.stats)
+                for bus_id, bus in simulation.board.buses.items()
+            },
+            "lcd": dict(simulation.lcd.stats),
+            "flash": dict(simulation.flash.stats),
+        },
+    }
+    planner = namespace.get("planner")
+    if planner is not None:
+        result["planner"] = planner.stats()
+    scheduler = namespace.get("scheduler")
+    if scheduler is not None:
+        result["scheduler"] = _job_stats(scheduler.jobs)
+    acquisition = namespace.get("acquisition")
+    if acquisition is not None:
+        result["core1"] = _job_stats(acquisition.jobs)
+        result["core1"]["errors"] = acquisition.errors
+        readings = namespace["readings"]
+        result["core1"]["published"] = readings.published
+        result["core1"]["overwritten"] = readings.overwritten
+    if profile:
+        from src.util.profile import summaries
+
+        result["profile"] = summaries()
+    if config.get("reaction"):
+        result["reaction"] = measure_reaction(seconds, core1=core1)
+    return result
+
+
+def report(result: dict) -> str:
+    lines = [
+        f"== {result['entry']}",
+        f"iterations: {result['iterations']} in {result['virtual_s']:.1f}s "
+        + f"(virtual {result['iterations_per_s']:.3f}/s, "
+        + f"host {result['host_iterations_per_s']:.1f}/s)",
+        f"{'stage':<36}{'calls':>7}{'mean us':>11}{'p50 us':>11}"
+        + f"{'p95 us':>11}{'max us':>11}{'host us':>10}{'alloc B':>10}",
+    ]
+    for name, s in result["stages"].items():
+        alloc = "-" if s["alloc_bytes_mean"] is None else f"{s['alloc_bytes_mean']:.0f}"
+        lines.append(
+            f"{name:<36}{s['calls']:>7}{s['virtual_us_mean']:>11.0f}"
+            + f"{s['virtual_us_p50']:>11}{s['virtual_us_p95']:>11}"
+            + f"{s['virtual_us_max']:>11}{s['wall_us_mean']:>10.1f}{alloc:>10}"
+        )
+    if "planner" in result:
+        lines.append(f"planner: {json.dumps(result['planner'])}")
+    if "scheduler" in result:
+        lines.append(f"scheduler: {json.dumps(result['scheduler'])}")
+    if "core1" in result:
+        lines.append(f"core1: {json.dumps(result['core1'])}")
+    for name, summary in result.get("profile", {}).items():
+        lines.append(
+            f"profile {name:<28}{summary['count']:>7}{summary['mean_us']:>11}"
+            + f"{summary['p50_us']:>11}{summary['p95_us']:>11}{summary['max_us']:>11}"
+        )
+    if "reaction" in result:
+        lines.append(f"reaction: {json.dumps(result['reaction'])}")
+    lines.append(f"devices: {json.dumps(result['devices'])}")
+    return "\n".join(lines)
+
+
+def compare(results: list, baseline: list, tolerance: float) -> list:
+    """ベースラインと比べて悪化した項目を返す"""
+    regressions = []
+    previous = {r["entry"]: r for r in baseline}
+    for result in results:
+        base = previous.get(result["entry"])
+        if base is None:
+            continue
+        if result["iterations_per_s"] < base["iterations_per_s"] * (1 - tolerance):
+            regressions.append(
+                f"{result['entry']}: iterations/s "
+                + f"{base['iterations_per_s']:.3f} -> {result['iterations_per_s']:.3f}"
+            )
+        reaction = result.get("reaction") or {}
+        base_reaction = base.get("reaction") or {}
+        if reaction.get("p50_ms") and base_reaction.get("p50_ms"):
+            if reaction["p50_ms"] > base_reaction["p50_ms"] * (1 + tolerance):
+                regressions.append(
+                    f"{result['entry']}: reaction p50 "
+                    + f"{base_reaction['p50_ms']}ms -> {reaction['p50_ms']}ms"
+                )
+        for name, stage in result["stages"].items():
+            base_stage = base["stages"].get(name)
+            if not base_stage or not stage["calls"]:
+                continue
+            limit = base_stage["virtual_us_p50"] * (1 + tolerance)
+            if stage["virtual_us_p50"] > limit:
+                regressions.append(
+                    f"{result['entry']}: {name} p50 "
+                    + f"{base_stage['virtual_us_p50']}us -> {stage['virtual_us_p50']}us"
+                )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entry", choices=sorted(ENTRIES), action="append")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append")
+    parser.add_argument("--seconds", type=float, default=60, help="仮想時間（秒）")
+    parser.add_argument("--alloc", action="store_true", help="メモリ確保量も計測する")
+    parser.add_argument(
+        "--core1", action="store_true", help="測定をcore1（ホストではスレッド）で行う"
+    )
+    parser.add_argument(
+        "--profile", action="store_true", help="src.util.profileのヒストグラムも表示する"
+    )
+    parser.add_argument("--json", help="結果をJSONで保存する")
+    parser.add_argument("--baseline", help="比較するJSONファイル")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    if args.scenario:
+        for scenario in args.scenario:
+            print(f"== {scenario}")
+            print(json.dumps(SCENARIOS[scenario](args.seconds), indent=2))
+        return 0
+
+    results = []
+    for entry in args.entry or list(ENTRIES):
+        result = run(
+            entry,
+            args.seconds,
+            track_alloc=args.alloc,
+            core1=args.core1,
+            profile=args.profile,
+        )
+        print(report(result))
+        results.append(result)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
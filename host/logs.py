@@ -0,0 +1,120 @@
+"""セグメントに分けたテキストログ（src/util/logstore.py）を読むツール
+
+- Picoから索引（log.idx）とセグメント（log.N.txt）を同じディレクトリにコピーして使う
+- 索引の通し番号でセグメントを並べるので、最新のログは最新のセグメントから
+  後ろ向きに読むだけでよい（ログ全体を読まない）
+
+Examples:
+    $ mpremote cp :log.idx ":log.*.txt" logs/
+    $ python -m host.logs logs --tail 50
+    $ python -m host.logs logs --cat > log.txt
+    $ python -m host.logs logs --summary
+"""
+import argparse
+import os
+import struct
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from src.const import (  # noqa: E402
+    LOG_INDEX_FILE_PATH,
+    LOG_INDEX_HEADER_FORMAT,
+    LOG_INDEX_MAGIC,
+    LOG_INDEX_SLOT_FORMAT,
+    LOG_SEGMENT_PATH_FORMAT,
+)
+
+HEADER = struct.Struct(LOG_INDEX_HEADER_FORMAT)
+SLOT = struct.Struct(LOG_INDEX_SLOT_FORMAT)
+UNUSED = 0xFFFFFFFF
+
+
+def read_index(directory: str) -> dict:
+    """索引を読み、使用中のセグメントを古い順に返す
+
+    Returns:
+        dict: {"segment_bytes": int, "sequence": int,
+               "segments": [(通し番号, 開始時のUNIX時刻, パス), ...]}
+    """
+    with open(os.path.join(directory, os.path.basename(LOG_INDEX_FILE_PATH)), "rb") as f:
+        data = f.read()
+    magic, version, slots, _, segment_bytes, sequence = HEADER.unpack_from(data)
+    if magic != LOG_INDEX_MAGIC:
+        raise ValueError(f"not a log index: {magic!r}")
+    segments = []
+    for slot in range(slots):
+        seq, started = SLOT.unpack_from(data, HEADER.size + SLOT.size * slot)
+        if seq != UNUSED:
+            name = os.path.basename(LOG_SEGMENT_PATH_FORMAT.format(slot))
+            segments.append((seq, started, os.path.join(directory, name)))
+    segments.sort()
+    return {"segment_bytes": segment_bytes, "sequence": sequence, "segments": segments}
+
+
+def _read(path: str) -> bytes:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:  # コピーし忘れた・空のセグメント
+        return b""
+
+
+def iter_segments(directory: str, newest_first: bool = False):
+    """セグメントの中身を順に返す
+
+    Yields:
+        tuple: (通し番号, 開始時のUNIX時刻, 中身のbytes)
+    """
+    segments = read_index(directory)["segments"]
+    if newest_first:
+        segments = segments[::-1]
+    for seq, started, path in segments:
+        yield seq, started, _read(path)
+
+
+def tail(directory: str, count: int) -> list:
+    """最新のcount行を返す（必要な分のセグメントだけを読む）"""
+    lines = []
+    for _, _, data in iter_segments(directory, newest_first=True):
+        lines[:0] = data.decode("utf-8", "replace").splitlines()
+        if len(lines) >= count:
+            break
+    return lines[-count:] if count else []
+
+
+def summarize(directory: str) -> dict:
+    index = read_index(directory)
+    sizes = [os.path.getsize(p) if os.path.exists(p) else 0 for _, _, p in index["segments"]]
+    return {
+        "segments": len(index["segments"]),
+        "oldest_sequence": index["segments"][0][0] if index["segments"] else None,
+        "newest_sequence": index["sequence"],
+        "segment_bytes": index["segment_bytes"],
+        "bytes": sum(sizes),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory", help="log.idxとlog.N.txtがあるディレクトリ")
+    parser.add_argument("--tail", type=int, help="最新のN行を表示する")
+    parser.add_argument("--cat", action="store_true", help="すべてのログを古い順に表示する")
+    parser.add_argument("--summary", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.tail is not None:
+        for line in tail(args.directory, args.tail):
+            print(line)
+    if args.cat:
+        for _, _, data in iter_segments(args.directory):
+            sys.stdout.write(data.decode("utf-8", "replace"))
+    if args.summary or not (args.tail is not None or args.cat):
+        print(summarize(args.directory))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""machine/utimeなどをCPython上で模擬するシミュレーター
+
+`install()`を呼ぶと`host/sim/lib`がsys.pathの先頭に追加され、
+`src/`以下のコードやエントリーポイントがそのままCPythonで動くようになる。
+時間は仮想時計で進むので、sleepで実際に待つことはない。
+
+Examples:
+    >>> from host import sim
+    >>> simulation = sim.install()
+    >>> namespace = sim.run_entry("temperature_humidity_pressure", seconds=60)
+    >>> simulation.lcd.lines()
+    ['1013.24hPa, 22.0', '2C, 45.07%      ']
+"""
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+
+from host.sim.board import Board
+from host.sim.clock import SimulationStop, VirtualClock  # noqa: F401
+from host.sim.flash import Flash
+from host.sim.peripherals import (
+    BME280Device,
+    HCSR04,
+    LCD1602Device,
+    OnDieTemperature,
+    SG90,
+    World,
+)
+
+LIB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lib")
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+RP2_BOOT_EPOCH = 1609459200  # 起動直後のRTC(2021-01-01 00:00:00)
+LIB_MODULES = (
+    "machine", "utime", "ntptime", "network", "micropython", "uasyncio",
+    "urequests", "usocket", "bme280", "lcd_api", "machine_i2c_lcd",
+)
+
+_current = None
+
+
+class Simulation:
+    """シミュレーション1回分の状態（仮想時計、ボード、接続されたデバイス）
+
+    - 配線はエントリーポイントと同じピン番号を既定値とする
+
+    Args:
+        world (World): 外界の設定
+        flash_dir (str): フラッシュ（"/"）の代わりに使うディレクトリ
+    """
+    def __init__(
+        self,
+        world: World = None,
+        flash_dir: str = None,
+        num_servo_pwm: int = 1,
+        num_trigger: int = 14,
+        num_echo: int = 15,
+        i2c_id: int = 0,
+    ) -> None:
+        self.world = world or World()
+        self.flash_dir = flash_dir or tempfile.mkdtemp(prefix="pico-flash-")
+        self.clock = VirtualClock(epoch_s=RP2_BOOT_EPOCH)
+        self.utc_epoch_s = int(time.time())  # now_us == 0 のときの正しいUNIX時刻
+        self.board = Board(self.clock, self.world)
+        self.flash = Flash(self.clock, self.flash_dir)
+        self.network = {"active": False, "status": 0, "connected_at": None}
+        self.http_servers = {}  # (ホスト, ポート) -> WebhookStandIn など
+
+        self.servo = SG90(self.board, num_servo_pwm)
+        self.ultrasonic = HCSR04(self.board, num_trigger, num_echo, self.servo)
+        self.chip_temperature = OnDieTemperature(self.world)
+        self.board.adc[4] = self.chip_temperature
+        bus = self.board.i2c_bus(i2c_id)
+        self.bme280 = BME280Device(self.clock, self.world)
+        self.lcd = LCD1602Device(self.clock)
+        bus.attach(0x76, self.bme280)
+        bus.attach(0x27, self.lcd)
+
+    def set_wifi(self, connected: bool) -> None:
+        """Wi-Fiの接続状態を直ちに切り替える（切断・復帰の注入用）"""
+        self.world.wifi_available = connected
+        self.network["status"] = 3 if connected else 0
+        if connected:
+            self.network["connected_at"] = self.clock.now_us
+
+    def utc_epoch(self) -> float:
+        """NTPサーバーが返す正しいUNIX時刻
+
+        - 仮想時計（Picoの水晶）はWorld.clock_drift_ppmだけ速く進むものとする
+        """
+        elapsed_s = self.clock.now_us / 1000000
+        return self.utc_epoch_s + elapsed_s * (1 - self.world.clock_drift_ppm / 1000000)
+
+    def flash_path(self, path: str) -> str:
+        """デバイス上の絶対パスをホスト上のパスに変換する"""
+        return os.path.join(self.flash_dir, path.lstrip("/"))
+
+
+def current() -> Simulation:
+    """実行中のシミュレーションを返す"""
+    if _current is None:
+        raise RuntimeError("host.sim.install() を先に呼び出してください")
+    return _current
+
+
+def _purge_modules() -> None:
+    """ソフトリセット相当として、src以下と模擬モジュールを読み込み直させる"""
+    for name in list(sys.modules):
+        if name == "src" or name.startswith("src.") or name in LIB_MODULES:
+            del sys.modules[name]
+
+
+def _install_secret() -> None:
+    """src/secret.pyがなければsrc/secret.pub.pyを代わりに読み込む"""
+    if os.path.exists(os.path.join(REPO_DIR, "src", "secret.py")):
+        return
+    spec = importlib.util.spec_from_file_location(
+        "src.secret", os.path.join(REPO_DIR, "src", "secret.pub.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    sys.modules["src.secret"] = module
+
+
+def _install_thread() -> None:
+    """_threadをhost/sim/lib/_thread.pyに差し替える
+
+    - _threadはCPythonの組み込みモジュールなので、sys.pathより先に見つかってしまう
+    """
+    spec = importlib.util.spec_from_file_location(
+        "_thread", os.path.join(LIB_DIR, "_thread.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    sys.modules["_thread"] = module
+
+
+def _redirect_flash(simulation: Simulation) -> None:
+    """src.constのうち"/"から始まるパスをflash_dir以下に付け替える"""
+    import src.const
+
+    for name in dir(src.const):
+        value = getattr(src.const, name)
+        if isinstance(value, str) and value.startswith("/"):
+            setattr(src.const, name, simulation.flash_path(value))
+
+
+def install(world: World = None, flash_dir: str = None, **wiring) -> Simulation:
+    """シミュレーターを有効にする
+
+    - 呼び出すたびに新しいSimulationを作り、src以下を読み込み直す
+
+    Returns:
+        Simulation: 新しいシミュレーション
+    """
+    global _current
+    for path in (REPO_DIR, LIB_DIR):
+        if path in sys.path:
+            sys.path.remove(path)
+        sys.path.insert(0, path)
+    _purge_modules()
+    _current = Simulation(world=world, flash_dir=flash_dir, **wiring)
+    if not _current.world.pico_w:  # Wi-Fiのないファームウェアにはurequestsがない
+        sys.modules["urequests"] = None
+    _install_secret()
+    _install_thread()
+    _redirect_flash(_current)
+    return _current
+
+
+def run_entry(name: str, seconds: float) -> dict:
+    """エントリーポイントを仮想時間でseconds秒だけ実行する
+
+    - 締め切りに達するとSimulationStopで抜け出す。
+      エントリーポイントのfinally節はそのまま実行される
+    - 実行中はopen()を差し替え、フラッシュへの書き込みコストを仮想時計に計上する
+    - エントリーポイントが_threadで開始したスレッドは、終了するまで待つ
+
+    Args:
+        name (str): エントリーポイント名（例: "robot_car"）
+        seconds (float): 実行する仮想時間（秒）
+
+    Returns:
+        dict: エントリーポイントのグローバル変数
+    """
+    simulation = current()
+    simulation.clock.deadline_us = simulation.clock.now_us + int(seconds * 1000000)
+    path = os.path.join(REPO_DIR, f"{name}.py")
+    with open(path, encoding="utf-8") as f:
+        code = compile(f.read(), path, "exec")
+    namespace = {"__name__": "__main__", "__file__": path}
+    with simulation.flash:
+        try:
+            exec(code, namespace)
+        except SimulationStop:
+            pass
+        finally:
+            simulation.clock.stop_threads()
+    return namespace
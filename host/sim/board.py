@@ -0,0 +1,183 @@
+IRQ_FALLING = 4
+IRQ_RISING = 8
+
+ENODEV = 19  # I2Cで応答がない場合のerrno（MicroPythonはEIO/ENODEVを返す）
+
+
+class PinState:
+    """GPIOピン1本分の状態
+
+    - listeners: ソフトウェアからの出力を受け取る外部デバイスの関数
+    - irq: Pin.irq()で登録されたハンドラ（handler, trigger, pin）
+    """
+    def __init__(self, num: int) -> None:
+        self.num = num
+        self.level = 0
+        self.mode = None
+        self.pull = None
+        self.irq = None
+        self.listeners = []
+
+
+class I2CDevice:
+    """I2Cバスに接続する擬似デバイスの基底クラス
+
+    - レジスタ型のデバイスはread_mem/write_memを実装する
+    - ストリーム型のデバイスはread/writeを実装する
+    """
+    def read_mem(self, reg: int, nbytes: int) -> bytes:
+        raise OSError(ENODEV)
+
+    def write_mem(self, reg: int, data: bytes) -> None:
+        raise OSError(ENODEV)
+
+    def read(self, nbytes: int) -> bytes:
+        raise OSError(ENODEV)
+
+    def write(self, data: bytes) -> None:
+        if len(data) == 0:
+            return
+        self.write_mem(data[0], bytes(data[1:]))
+
+
+class I2CBus:
+    """I2Cバス1本分の擬似実装
+
+    - 転送したバイト数と周波数から所要時間を計算して仮想時計を進める
+    - 統計値（トランザクション数、バイト数、スキャン回数）を記録する
+    """
+    TRANSACTION_OVERHEAD_US = 15  # start/stopとドライバのオーバーヘッド
+
+    def __init__(self, board: "Board", bus_id: int) -> None:
+        self.board = board
+        self.bus_id = bus_id
+        self.devices = {}
+        self.stats = {"transactions": 0, "bytes": 0, "scans": 0, "inits": 0}
+
+    def attach(self, addr: int, device: I2CDevice) -> None:
+        self.devices[addr] = device
+
+    def _charge(self, nbytes: int, freq: int) -> None:
+        # 1バイト = 8bit + ACK。アドレスバイトも含める
+        self.stats["transactions"] += 1
+        self.stats["bytes"] += nbytes
+        bits = (nbytes + 1) * 9
+        self.board.clock.advance(
+            self.TRANSACTION_OVERHEAD_US + bits * 1000000 // freq
+        )
+
+    def _device(self, addr: int) -> I2CDevice:
+        try:
+            return self.devices[addr]
+        except KeyError:
+            raise OSError(ENODEV)
+
+    def scan(self, freq: int) -> list:
+        self.stats["scans"] += 1
+        for _ in range(0x08, 0x78):  # 予約アドレスを除く全アドレスを叩く
+            self._charge(0, freq)
+        return sorted(self.devices)
+
+    def write(self, addr: int, data, freq: int) -> None:
+        self._charge(len(data), freq)
+        self._device(addr).write(bytes(data))
+
+    def read(self, addr: int, nbytes: int, freq: int) -> bytes:
+        self._charge(nbytes, freq)
+        return self._device(addr).read(nbytes)
+
+    def write_mem(self, addr: int, reg: int, data, freq: int) -> None:
+        self._charge(len(data) + 1, freq)
+        self._device(addr).write_mem(reg, bytes(data))
+
+    def read_mem(self, addr: int, reg: int, nbytes: int, freq: int) -> bytes:
+        self._charge(nbytes + 2, freq)  # レジスタアドレスの書き込み + repeated start
+        return self._device(addr).read_mem(reg, nbytes)
+
+
+class Board:
+    """Raspberry Pi Picoの擬似ボード
+
+    - ピン、PWM、ADC、I2Cバスの状態を保持する
+    - call_cost_us: インタプリタでピンを1回読むのにかかる時間の見積もり
+    """
+    def __init__(self, clock, world, call_cost_us: int = 10) -> None:
+        self.clock = clock
+        self.world = world
+        self.call_cost_us = call_cost_us
+        self.pins = {}
+        self.pwm = {}
+        self.pwm_listeners = {}
+        self.adc = {}
+        self.buses = {}
+        self.irq_enabled = True
+        self._pending_irqs = []
+        self.stats = {"pin_reads": 0, "pin_writes": 0, "irqs": 0}
+
+    def pin(self, num: int) -> PinState:
+        if num not in self.pins:
+            self.pins[num] = PinState(num)
+        return self.pins[num]
+
+    def read_pin(self, num: int) -> int:
+        """ソフトウェアからピンを読む（呼び出しコストで時計を進める）"""
+        self.stats["pin_reads"] += 1
+        self.clock.advance(self.call_cost_us)
+        return self.pin(num).level
+
+    def write_pin(self, num: int, level: int) -> None:
+        """ソフトウェアからピンに出力する"""
+        self.stats["pin_writes"] += 1
+        state = self.pin(num)
+        state.level = 1 if level else 0
+        for listener in state.listeners:
+            listener(state.level)
+
+    def drive_pin(self, num: int, level: int) -> None:
+        """外部デバイスがピンの電位を変える（割り込みを発生させる）"""
+        state = self.pin(num)
+        level = 1 if level else 0
+        if state.level == level:
+            return
+        state.level = level
+        if state.irq is None:
+            return
+        handler, trigger, pin = state.irq
+        edge = IRQ_RISING if level else IRQ_FALLING
+        if handler is None or not trigger & edge:
+            return
+        if self.irq_enabled:
+            self.stats["irqs"] += 1
+            handler(pin)
+        else:
+            self._pending_irqs.append((handler, pin))
+
+    def schedule_drive(self, num: int, level: int, at_us: int) -> None:
+        """指定した時刻にピンの電位を変えるよう予約する"""
+        self.clock.schedule(at_us, lambda: self.drive_pin(num, level))
+
+    def set_irq_enabled(self, enabled: bool) -> None:
+        self.irq_enabled = enabled
+        if not enabled:
+            return
+        pending, self._pending_irqs = self._pending_irqs, []
+        for handler, pin in pending:
+            self.stats["irqs"] += 1
+            handler(pin)
+
+    def set_pwm(self, num: int, freq=None, duty=None) -> None:
+        state = self.pwm.setdefault(num, {"freq": 0, "duty": 0})
+        if freq is not None:
+            state["freq"] = freq
+        if duty is not None:
+            state["duty"] = duty
+        for listener in self.pwm_listeners.get(num, []):
+            listener(state["freq"], state["duty"])
+
+    def on_pwm(self, num: int, listener) -> None:
+        self.pwm_listeners.setdefault(num, []).append(listener)
+
+    def i2c_bus(self, bus_id: int) -> I2CBus:
+        if bus_id not in self.buses:
+            self.buses[bus_id] = I2CBus(self, bus_id)
+        return self.buses[bus_id]
@@ -0,0 +1,236 @@
+import heapq
+import threading
+
+
+TICKS_PERIOD = 1 << 30  # MicroPython(rp2)のticks_*の周期
+TICKS_MAX = TICKS_PERIOD - 1
+TICKS_HALF_PERIOD = TICKS_PERIOD // 2
+
+
+class SimulationStop(BaseException):
+    """シミュレーションの終了を表す例外
+
+    - エントリーポイントの`except Exception`で握りつぶされないよう
+      BaseExceptionを継承する
+    """
+    pass
+
+
+class VirtualClock:
+    """仮想時計
+
+    - 時刻はμs単位の整数で保持し、sleepなどで明示的に進める
+    - 未来の時刻に予約されたイベント（エコーの立ち上がりなど）は、
+      時計がその時刻を通過するときに時刻順に実行する
+    - イベント（割り込みハンドラなど）の実行中は時計を進めない
+    - 複数のスレッド（_thread.start_new_thread）がある場合は、一度に1つのスレッドだけを
+      動かし、時計を進めようとしたときに、次に起きる時刻が最も早いスレッドに交代する
+      （同じ時刻なら先に待ち始めたスレッドから。実行結果は毎回同じになる）
+
+    Examples:
+        >>> clock = VirtualClock()
+        >>> clock.schedule(100, lambda: print("fired"))
+        >>> clock.advance(150)
+        fired
+        >>> clock.now_us
+        150
+    """
+    def __init__(self, epoch_s: int = 0) -> None:
+        self.now_us = 0
+        self.epoch_s = epoch_s  # now_us == 0 のときのUNIX時刻（RTCの値）
+        self.deadline_us = None
+        self.stopped = False
+        self._events = []
+        self._seq = 0
+        self._dispatching = False
+        self._lock = threading.RLock()
+        self._turn = threading.Condition(self._lock)
+        # スレッドごとの[起きる時刻, 待ち始めた順番, 割り込めるか]（動いているスレッドはNone）
+        self._threads = {}
+        self._runner = None
+        self._shutdown = False
+        self._stopped_threads = set()
+
+    def schedule(self, at_us: int, callback) -> None:
+        """指定した時刻にcallbackを実行するよう予約する
+
+        Args:
+            at_us (int): 実行する時刻（μs）
+            callback (callable): 引数なしで呼び出される関数
+        """
+        with self._lock:
+            self._seq += 1
+            heapq.heappush(self._events, (at_us, self._seq, callback))
+
+    def next_event_us(self):
+        """次に予約されているイベントの時刻を返す（なければNone）"""
+        with self._lock:
+            return self._events[0][0] if self._events else None
+
+    def advance(self, delta_us: int) -> None:
+        """時計をdelta_usだけ進める"""
+        self.advance_to(self.now_us + max(0, int(delta_us)))
+
+    def advance_to(self, target_us: int, interruptible: bool = False) -> None:
+        """時計をtarget_usまで進め、その間のイベントを実行する
+
+        Args:
+            target_us (int): 進める時刻（μs）
+            interruptible (bool): 他のスレッドがinterrupt()したら、その時刻で戻るか
+
+        Raises:
+            SimulationStop: 締め切り時刻を過ぎた場合（スレッドごとに一度だけ送出する）
+        """
+        with self._lock:
+            if self._dispatching:
+                return
+            if (
+                self.deadline_us is not None
+                and threading.get_ident() not in self._stopped_threads
+            ):  # 締め切りを越えて進めない（他のスレッドが先に止まっても同じ時刻で止める）
+                target_us = min(target_us, max(self.deadline_us, self.now_us))
+            if self._threads:
+                target_us = self._wait_turn(target_us, interruptible)
+            while self._events and self._events[0][0] <= target_us:
+                at_us, _, callback = heapq.heappop(self._events)
+                self.now_us = max(self.now_us, at_us)
+                self._dispatching = True
+                try:
+                    callback()
+                finally:
+                    self._dispatching = False
+            self.now_us = max(self.now_us, target_us)
+            if (
+                self.deadline_us is not None
+                and self.now_us >= self.deadline_us
+                and threading.get_ident() not in self._stopped_threads
+            ):
+                self.stopped = True
+                self._stopped_threads.add(threading.get_ident())
+                raise SimulationStop(f"reached {self.now_us}us")
+
+    def add_thread(self, parent: int) -> None:
+        """呼び出したスレッドを登録する（新しいスレッドの最初に呼び出す）
+
+        - 現在の時刻に起きるスレッドとして登録し、順番が来るまで待つ
+
+        Args:
+            parent (int): スレッドを開始したスレッドのident
+        """
+        me = threading.get_ident()
+        with self._lock:
+            if not self._threads:
+                self._threads[parent] = None
+                self._runner = parent
+            self._seq += 1
+            self._threads[me] = [self.now_us, self._seq, False]
+            self._turn.notify_all()  # 登録し終えたことを親スレッドに知らせる
+            while self._runner != me and not self._shutdown:
+                self._turn.wait()
+            self._threads[me] = None
+
+    def wait_registered(self, count: int) -> None:
+        """count個のスレッドが登録されるまで待つ（親スレッドで呼び出す）"""
+        with self._lock:
+            while len(self._threads) < count:
+                self._turn.wait()
+
+    def thread_count(self) -> int:
+        """登録されているスレッドの数を返す"""
+        with self._lock:
+            return len(self._threads)
+
+    def remove_thread(self) -> None:
+        """呼び出したスレッドの登録を解除し、次のスレッドに交代する"""
+        with self._lock:
+            self._threads.pop(threading.get_ident(), None)
+            if len(self._threads) == 1 and None in self._threads.values():
+                self._threads.clear()  # 動いているスレッドだけになった
+            elif self._threads:
+                self._pass_turn()
+            self._turn.notify_all()
+
+    def interrupt(self, ident: int) -> None:
+        """interruptible=Trueで待っているスレッドを現在の時刻に起こす
+
+        - 他のスレッドからイベントループのタスクを起こしたときに使う
+        """
+        with self._lock:
+            entry = self._threads.get(ident)
+            if entry is not None and entry[2] and entry[0] > self.now_us:
+                entry[0] = self.now_us
+
+    def others_waiting(self) -> bool:
+        """呼び出したスレッドの他に、時計を待っているスレッドがあるかを返す"""
+        with self._lock:
+            return len(self._threads) > 1
+
+    def stop_threads(self) -> None:
+        """他のスレッドにSimulationStopを送出させ、すべて終わるまで待つ"""
+        me = threading.get_ident()
+        with self._lock:
+            if not self._threads:
+                return
+            self._shutdown = True
+            self._threads.pop(me, None)
+            self._turn.notify_all()
+            while self._threads:
+                self._turn.wait()
+            self._shutdown = False
+
+    def _wait_turn(self, target_us: int, interruptible: bool) -> int:
+        """起きる時刻を登録し、自分の順番が来るまで待つ
+
+        Returns:
+            int: 実際に進める時刻（interrupt()された場合は早まる）
+        """
+        me = threading.get_ident()
+        if me not in self._threads:
+            return target_us
+        self._seq += 1
+        entry = [target_us, self._seq, interruptible]
+        self._threads[me] = entry
+        self._pass_turn()
+        while self._runner != me and not self._shutdown:
+            self._turn.wait()
+        if self._shutdown and me not in self._stopped_threads:
+            self._threads[me] = None
+            self._stopped_threads.add(me)
+            raise SimulationStop("stopped by another thread")
+        if len(self._threads) == 1:
+            self._threads.clear()  # 他のスレッドが終わった
+        elif me in self._threads:
+            self._threads[me] = None
+        return entry[0]
+
+    def _pass_turn(self) -> None:
+        """起きる時刻が最も早いスレッドに交代する"""
+        waiting = [
+            (entry[0], entry[1], ident)
+            for ident, entry in self._threads.items()
+            if entry is not None
+        ]
+        if len(waiting) < len(self._threads):
+            return  # まだ動いているスレッドがある
+        self._runner = min(waiting)[2]
+        self._turn.notify_all()
+
+    def ticks_us(self) -> int:
+        return self.now_us & TICKS_MAX
+
+    def ticks_ms(self) -> int:
+        return (self.now_us // 1000) & TICKS_MAX
+
+    def epoch(self) -> float:
+        """現在のUNIX時刻（秒）を返す"""
+        return self.epoch_s + self.now_us / 1000000
+
+
+def ticks_diff(ticks1: int, ticks2: int) -> int:
+    """MicroPythonと同じ折り返しを考慮したticksの差を返す"""
+    return ((ticks1 - ticks2 + TICKS_HALF_PERIOD) & TICKS_MAX) - TICKS_HALF_PERIOD
+
+
+def ticks_add(ticks: int, delta: int) -> int:
+    """MicroPythonと同じ折り返しを考慮してticksに加算する"""
+    return (ticks + delta) & TICKS_MAX
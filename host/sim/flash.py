@@ -0,0 +1,95 @@
+import builtins
+import os
+
+
+class FlashFile:
+    """フラッシュ上のファイル（書き込み量に応じて仮想時計を進める）"""
+    def __init__(self, flash: "Flash", f, size: int) -> None:
+        self._flash = flash
+        self._f = f
+        self._size = size
+        self._pending = 0
+
+    def write(self, data) -> int:
+        self._pending += len(data.encode("utf-8") if isinstance(data, str) else data)
+        return self._f.write(data)
+
+    def flush(self) -> None:
+        self._flash.commit(self._size, self._pending)
+        self._size += self._pending
+        self._pending = 0
+        self._f.flush()
+
+    def close(self) -> None:
+        if not self._f.closed:
+            self.flush()
+            self._flash.charge(self._flash.CLOSE_US)
+        self._f.close()
+
+    def __enter__(self) -> "FlashFile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+    def __iter__(self):
+        return iter(self._f)
+
+
+class Flash:
+    """LittleFS on QSPIフラッシュの書き込みコストを模擬する
+
+    - open/closeにメタデータ更新のコストがかかる
+    - 256バイトのページ書き込みと、4KBブロックを新しく使うときの消去にコストがかかる
+    """
+    OPEN_US = 1500
+    CLOSE_US = 3000
+    PAGE_SIZE = 256
+    PAGE_PROGRAM_US = 500
+    BLOCK_SIZE = 4096
+    BLOCK_ERASE_US = 45000
+
+    def __init__(self, clock, root: str) -> None:
+        self.clock = clock
+        self.root = os.path.abspath(root)
+        self.stats = {"opens": 0, "bytes": 0, "pages": 0, "erases": 0}
+        self._original_open = None
+
+    def charge(self, us: int) -> None:
+        self.clock.advance(us)
+
+    def commit(self, offset: int, nbytes: int) -> None:
+        if nbytes <= 0:
+            return
+        pages = (offset + nbytes - 1) // self.PAGE_SIZE - offset // self.PAGE_SIZE + 1
+        erases = (
+            (offset + nbytes - 1) // self.BLOCK_SIZE
+            - (offset - 1) // self.BLOCK_SIZE
+            if offset else (nbytes - 1) // self.BLOCK_SIZE + 1
+        )
+        self.stats["bytes"] += nbytes
+        self.stats["pages"] += pages
+        self.stats["erases"] += erases
+        self.charge(pages * self.PAGE_PROGRAM_US + erases * self.BLOCK_ERASE_US)
+
+    def open(self, file, mode="r", *args, **kwargs):
+        f = self._original_open(file, mode, *args, **kwargs)
+        if not isinstance(file, str) or not os.path.abspath(file).startswith(self.root):
+            return f
+        self.stats["opens"] += 1
+        self.charge(self.OPEN_US)
+        if not any(flag in mode for flag in "wa+"):
+            return f
+        size = f.tell() if "a" in mode else 0
+        return FlashFile(self, f, size)
+
+    def __enter__(self) -> "Flash":
+        self._original_open = builtins.open
+        builtins.open = self.open
+        return self
+
+    def __exit__(self, *exc) -> None:
+        builtins.open = self._original_open
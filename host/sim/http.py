@@ -0,0 +1,86 @@
+class WebhookStandIn:
+    """Webhook(Slack)の代わりに応答するHTTPサーバーの模擬実装
+
+    - HTTP/1.1のkeep-aliveに対応し、リクエスト数・接続数・メッセージ数を数える
+    - 応答の遅延、500エラー、接続の切断を注入できる
+
+    Args:
+        latency_ms (int): リクエストを受け取ってから応答するまでの時間
+        fail_rate (float): 500を返す確率
+        reset_rate (float): 応答せずに接続を切る確率
+    """
+    def __init__(self, clock, world, latency_ms: int = 80, fail_rate: float = 0.0,
+                 reset_rate: float = 0.0, connect_ms: int = 150) -> None:
+        self.clock = clock
+        self.random = world.random
+        self.latency_ms = latency_ms
+        self.fail_rate = fail_rate
+        self.reset_rate = reset_rate
+        self.connect_ms = connect_ms
+        self.stats = {"connections": 0, "requests": 0, "failures": 0, "resets": 0}
+        self.bodies = []
+
+    def connect(self) -> "ServerConnection":
+        self.stats["connections"] += 1
+        return ServerConnection(self)
+
+    def handle(self, body: bytes) -> tuple:
+        """リクエストを処理する
+
+        Returns:
+            tuple: (ステータスコード, 切断するか)
+        """
+        self.stats["requests"] += 1
+        if self.random.random() < self.reset_rate:
+            self.stats["resets"] += 1
+            return None, True
+        if self.random.random() < self.fail_rate:
+            self.stats["failures"] += 1
+            return 500, False
+        self.bodies.append(body)
+        return 200, False
+
+
+class ServerConnection:
+    """1本のTCP接続（クライアントが書いた分を解析し、遅延付きで応答を返す）"""
+    def __init__(self, server: WebhookStandIn) -> None:
+        self.server = server
+        self.inbox = b""
+        self.outbox = b""
+        self.ready_at_us = 0
+        self.closed = False
+
+    def receive(self, data: bytes) -> None:
+        if self.closed:
+            raise OSError(104)  # ECONNRESET
+        self.inbox += data
+        while b"\r\n\r\n" in self.inbox:
+            head, _, rest = self.inbox.partition(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n")[1:]:
+                name, _, value = line.partition(b":")
+                if name.strip().lower() == b"content-length":
+                    length = int(value)
+            if len(rest) < length:
+                return
+            body, self.inbox = rest[:length], rest[length:]
+            status, reset = self.server.handle(body)
+            self.ready_at_us = self.server.clock.now_us + self.server.latency_ms * 1000
+            if reset:
+                self.closed = True
+                return
+            text = b"ok" if status == 200 else b"error"
+            self.outbox += (
+                b"HTTP/1.1 %d %s\r\nContent-Type: text/plain\r\n"
+                b"Content-Length: %d\r\n\r\n%s"
+            ) % (status, b"OK" if status == 200 else b"Internal Server Error",
+                 len(text), text)
+
+    def take(self, nbytes: int = -1) -> bytes:
+        """応答のうち受信済みの分を取り出す"""
+        if self.server.clock.now_us < self.ready_at_us:
+            return b""
+        if nbytes < 0:
+            nbytes = len(self.outbox)
+        data, self.outbox = self.outbox[:nbytes], self.outbox[nbytes:]
+        return data
@@ -0,0 +1,82 @@
+"""_threadモジュールの模擬実装（CPythonのスレッドで動かす）
+
+- start_new_threadで開始したスレッドは仮想時計に登録され、時計を進めるときに
+  交代で動く（一度に動くのは1つだけなので、2つのコアを順番に実行するのと同じ）
+- ロックを取れなかった場合は、試した分だけ時計を進めて他のスレッドに順番を譲る
+  （ロックを持ったまま時計を待っているスレッドがあっても止まらない）
+- CPythonの組み込みモジュールと同じ名前なので、host.sim.install()が
+  sys.modulesに登録する
+"""
+import sys
+import threading
+import traceback
+
+from host.sim import current
+from host.sim.clock import SimulationStop
+
+LOCK_RETRY_US = 1  # ロックを1回試すのにかかる時間
+
+get_ident = threading.get_ident
+
+
+class LockType:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+
+    def acquire(self, waitflag=1, timeout=-1) -> bool:
+        while not self._lock.acquire(False):
+            current().clock.advance(LOCK_RETRY_US)
+            if not waitflag:
+                return False
+        return True
+
+    def release(self) -> None:
+        self._lock.release()
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+def allocate_lock() -> LockType:
+    return LockType()
+
+
+def start_new_thread(function, args, kwargs=None) -> int:
+    clock = current().clock
+    parent = get_ident()
+    count = max(clock.thread_count(), 1) + 1
+
+    def run():
+        clock.add_thread(parent)
+        try:
+            function(*args, **(kwargs or {}))
+        except (SimulationStop, SystemExit):
+            pass
+        except BaseException:  # noqa: B902  MicroPythonと同じく表示して終了する
+            traceback.print_exc(file=sys.stderr)
+        finally:
+            clock.remove_thread()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    clock.wait_registered(count)
+    return thread.ident
+
+
+def exit() -> None:
+    raise SystemExit
+
+
+def stack_size(size=None) -> int:
+    return 0
+
+
+def __getattr__(name):
+    # CPythonの標準ライブラリが後から_threadを読み込んでも動くようにする
+    return getattr(threading._thread, name)
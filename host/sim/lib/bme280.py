@@ -0,0 +1,89 @@
+"""micropython-bme280のホスト用実装
+
+- 実機と同じAPI（read_raw_data, read_compensated_data, values）を持つ
+- 毎回forcedモードで測定し、データレジスタを一括で読み出す
+"""
+import struct
+from array import array
+
+import utime
+from host.sim.peripherals import bme280_compensate
+
+BME280_I2CADDR = 0x76
+
+BME280_OSAMPLE_1 = 1
+BME280_OSAMPLE_2 = 2
+BME280_OSAMPLE_4 = 3
+BME280_OSAMPLE_8 = 4
+BME280_OSAMPLE_16 = 5
+
+BME280_REGISTER_CONTROL_HUM = 0xF2
+BME280_REGISTER_CONTROL = 0xF4
+
+
+class BME280:
+    def __init__(self, mode=BME280_OSAMPLE_1, address=BME280_I2CADDR, i2c=None, **kwargs):
+        if mode not in (BME280_OSAMPLE_1, BME280_OSAMPLE_2, BME280_OSAMPLE_4,
+                        BME280_OSAMPLE_8, BME280_OSAMPLE_16):
+            raise ValueError(f"Unexpected mode value {mode}.")
+        if i2c is None:
+            raise ValueError("An I2C object is required.")
+        self._mode = mode
+        self.address = address
+        self.i2c = i2c
+
+        dig_88_a1 = self.i2c.readfrom_mem(self.address, 0x88, 26)
+        dig_e1_e7 = self.i2c.readfrom_mem(self.address, 0xE1, 7)
+        (self.dig_T1, self.dig_T2, self.dig_T3, self.dig_P1, self.dig_P2,
+         self.dig_P3, self.dig_P4, self.dig_P5, self.dig_P6, self.dig_P7,
+         self.dig_P8, self.dig_P9, _, self.dig_H1) = struct.unpack(
+            "<HhhHhhhhhhhhBB", dig_88_a1)
+        self.dig_H2, self.dig_H3 = struct.unpack("<hB", dig_e1_e7[:3])
+        e4_sign = struct.unpack_from("<b", dig_e1_e7, 3)[0]
+        self.dig_H4 = (e4_sign << 4) | (dig_e1_e7[4] & 0xF)
+        e6_sign = struct.unpack_from("<b", dig_e1_e7, 5)[0]
+        self.dig_H5 = (e6_sign << 4) | (dig_e1_e7[4] >> 4)
+        self.dig_H6 = struct.unpack_from("<b", dig_e1_e7, 6)[0]
+
+        self.i2c.writeto_mem(self.address, BME280_REGISTER_CONTROL, bytearray([0x3F]))
+        self._l1_barray = bytearray(1)
+        self._l8_barray = bytearray(8)
+        self._l3_resultarray = array("i", [0, 0, 0])
+
+    def read_raw_data(self, result) -> None:
+        self._l1_barray[0] = self._mode
+        self.i2c.writeto_mem(self.address, BME280_REGISTER_CONTROL_HUM, self._l1_barray)
+        self._l1_barray[0] = self._mode << 5 | self._mode << 2 | 1
+        self.i2c.writeto_mem(self.address, BME280_REGISTER_CONTROL, self._l1_barray)
+
+        sleep_time = 1250 + 2300 * (1 << self._mode)
+        sleep_time = sleep_time + 2300 * (1 << self._mode) + 575
+        sleep_time = sleep_time + 2300 * (1 << self._mode) + 575
+        utime.sleep_us(sleep_time)
+
+        self.i2c.readfrom_mem_into(self.address, 0xF7, self._l8_barray)
+        readout = self._l8_barray
+        result[0] = ((readout[3] << 16) | (readout[4] << 8) | readout[5]) >> 4
+        result[1] = ((readout[0] << 16) | (readout[1] << 8) | readout[2]) >> 4
+        result[2] = (readout[6] << 8) | readout[7]
+
+    def read_compensated_data(self, result=None):
+        self.read_raw_data(self._l3_resultarray)
+        temp, pressure, humidity = bme280_compensate(self, *self._l3_resultarray)
+        if result:
+            result[0] = temp
+            result[1] = pressure
+            result[2] = humidity
+            return result
+        return array("i", (temp, pressure, humidity))
+
+    @property
+    def values(self) -> tuple:
+        t, p, h = self.read_compensated_data()
+        p = p // 256
+        pi = p // 100
+        pd = p - pi * 100
+        hi = h // 1024
+        hd = h * 100 // 1024 - hi * 100
+        return ("{}C".format(t / 100), "{}.{:02d}hPa".format(pi, pd),
+                "{}.{:02d}%".format(hi, hd))
@@ -0,0 +1,228 @@
+"""machineモジュールの模擬実装（host.simの仮想ボードに接続する）"""
+from host.sim import current
+from host.sim.board import IRQ_FALLING, IRQ_RISING
+
+I2C_SDA_PINS = {0: (0, 4, 8, 12, 16, 20), 1: (2, 6, 10, 14, 18, 26)}
+I2C_SCL_PINS = {0: (1, 5, 9, 13, 17, 21), 1: (3, 7, 11, 15, 19, 27)}
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    ALT = 3
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = IRQ_FALLING
+    IRQ_RISING = IRQ_RISING
+
+    def __init__(self, id, mode=-1, pull=-1, *, value=None) -> None:
+        self._id = id
+        self._board = current().board
+        self._state = self._board.pin(id)
+        self.init(mode, pull, value=value)
+
+    def init(self, mode=-1, pull=-1, *, value=None) -> None:
+        if mode != -1:
+            self._state.mode = mode
+        if pull != -1:
+            self._state.pull = pull
+        if value is not None:
+            self.value(value)
+
+    def value(self, x=None):
+        if x is None:
+            return self._board.read_pin(self._id)
+        self._board.write_pin(self._id, x)
+
+    __call__ = value
+
+    def on(self) -> None:
+        self.value(1)
+
+    def off(self) -> None:
+        self.value(0)
+
+    high = on
+    low = off
+
+    def toggle(self) -> None:
+        self.value(0 if self._state.level else 1)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        self._state.irq = (handler, trigger, self)
+        return self
+
+    def __repr__(self) -> str:
+        return f"Pin(GPIO{self._id})"
+
+
+class PWM:
+    def __init__(self, dest, *, freq=None, duty_u16=None) -> None:
+        self._board = current().board
+        self._num = dest._id
+        self._freq = 0
+        self._duty = 0
+        if freq is not None:
+            self.freq(freq)
+        if duty_u16 is not None:
+            self.duty_u16(duty_u16)
+
+    def freq(self, value=None):
+        if value is None:
+            return self._freq
+        self._freq = value
+        self._board.set_pwm(self._num, freq=value)
+
+    def duty_u16(self, value=None):
+        if value is None:
+            return self._duty
+        self._duty = value
+        self._board.set_pwm(self._num, duty=value)
+
+    def duty_ns(self, value=None):
+        if value is None:
+            return self._duty * 1000000000 // 65535 // max(self._freq, 1)
+        self.duty_u16(value * max(self._freq, 1) * 65535 // 1000000000)
+
+    def deinit(self) -> None:
+        self.duty_u16(0)
+
+
+class Timer:
+    """仮想タイマー（コールバックは仮想時計のイベントとして実行する）"""
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, *, mode=PERIODIC, period=-1, freq=-1, callback=None) -> None:
+        self._clock = current().clock
+        self._generation = 0  # init()・deinit()のたびに進め、古い予約を無効にする
+        if period >= 0 or freq > 0:
+            self.init(mode=mode, period=period, freq=freq, callback=callback)
+
+    def init(self, *, mode=PERIODIC, period=-1, freq=-1, callback=None) -> None:
+        self._generation += 1
+        period_us = 1000000 // freq if freq > 0 else max(0, period) * 1000
+        self._mode = mode
+        self._period_us = period_us
+        self._callback = callback
+        self._start(self._generation, self._clock.now_us + period_us)
+
+    def deinit(self) -> None:
+        self._generation += 1
+
+    def _start(self, generation: int, at_us: int) -> None:
+        def fire():
+            if generation != self._generation:
+                return
+            if self._mode == Timer.PERIODIC:
+                self._start(generation, at_us + max(1, self._period_us))
+            if self._callback is not None:
+                self._callback(self)
+
+        self._clock.schedule(at_us, fire)
+
+
+class ADC:
+    CORE_TEMP = 4
+
+    def __init__(self, id) -> None:
+        simulation = current()
+        if isinstance(id, Pin):
+            id = id._id - 26
+        self._board = simulation.board
+        self._source = simulation.board.adc.get(id)
+
+    def read_u16(self) -> int:
+        self._board.clock.advance(self._board.call_cost_us)
+        if self._source is None:
+            return 0
+        return self._source.read_u16()
+
+
+class I2C:
+    def __init__(self, id=0, *, scl=None, sda=None, freq=400000, timeout=50000) -> None:
+        if sda is not None and sda._id not in I2C_SDA_PINS[id]:
+            raise ValueError("bad SDA pin")
+        if scl is not None and scl._id not in I2C_SCL_PINS[id]:
+            raise ValueError("bad SCL pin")
+        self._bus = current().board.i2c_bus(id)
+        self._bus.stats["inits"] += 1
+        self._freq = freq
+
+    def scan(self) -> list:
+        return self._bus.scan(self._freq)
+
+    def writeto(self, addr, buf, stop=True) -> int:
+        self._bus.write(addr, buf, self._freq)
+        return len(buf)
+
+    def readfrom(self, addr, nbytes, stop=True) -> bytes:
+        return self._bus.read(addr, nbytes, self._freq)
+
+    def readfrom_into(self, addr, buf, stop=True) -> None:
+        buf[:] = self._bus.read(addr, len(buf), self._freq)
+
+    def readfrom_mem(self, addr, memaddr, nbytes, *, addrsize=8) -> bytes:
+        return self._bus.read_mem(addr, memaddr, nbytes, self._freq)
+
+    def readfrom_mem_into(self, addr, memaddr, buf, *, addrsize=8) -> None:
+        buf[:] = self._bus.read_mem(addr, memaddr, len(buf), self._freq)
+
+    def writeto_mem(self, addr, memaddr, buf, *, addrsize=8) -> None:
+        self._bus.write_mem(addr, memaddr, buf, self._freq)
+
+
+def _wait_for_change(clock, limit_us: int) -> None:
+    """次のイベントまたはlimit_usまで時計を進める"""
+    next_us = clock.next_event_us()
+    if next_us is None or next_us > limit_us:
+        next_us = limit_us
+    clock.advance_to(max(next_us, clock.now_us + 1))
+
+
+def time_pulse_us(pin: Pin, pulse_level: int, timeout_us: int = 1000000) -> int:
+    clock = pin._board.clock
+    state = pin._state
+    start_us = clock.now_us
+    while state.level != pulse_level:
+        if clock.now_us - start_us >= timeout_us:
+            return -2
+        _wait_for_change(clock, start_us + timeout_us)
+    start_us = clock.now_us
+    while state.level == pulse_level:
+        if clock.now_us - start_us >= timeout_us:
+            return -1
+        _wait_for_change(clock, start_us + timeout_us)
+    return clock.now_us - start_us
+
+
+def disable_irq() -> bool:
+    board = current().board
+    state = board.irq_enabled
+    board.set_irq_enabled(False)
+    return state
+
+
+def enable_irq(state: bool = True) -> None:
+    current().board.set_irq_enabled(state)
+
+
+def freq() -> int:
+    return 125000000
+
+
+def unique_id() -> bytes:
+    return b"\xe6\x60\x58\x38\x83\x3a\x2c\x2f"
+
+
+def idle() -> None:
+    current().clock.advance(1)
+
+
+def lightsleep(time_ms: int = 0) -> None:
+    current().clock.advance(time_ms * 1000)
+
+
+def reset() -> None:
+    raise SystemExit("machine.reset()")
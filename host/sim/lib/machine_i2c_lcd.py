@@ -0,0 +1,74 @@
+"""python_lcdのmachine_i2c_lcd.pyのホスト用実装（PCF8574経由の4bit接続）
+
+- 実機のドライバは命令ごとにgc.collect()を呼ぶので、その時間を仮想時計に計上する
+"""
+import utime
+from host.sim import current
+from lcd_api import LcdApi
+
+MASK_RS = 0x01
+MASK_RW = 0x02
+MASK_E = 0x04
+SHIFT_BACKLIGHT = 3
+SHIFT_DATA = 4
+GC_COLLECT_US = 600
+
+
+class I2cLcd(LcdApi):
+    def __init__(self, i2c, i2c_addr, num_lines, num_columns) -> None:
+        self.i2c = i2c
+        self.i2c_addr = i2c_addr
+        self.i2c.writeto(self.i2c_addr, bytes([0]))
+        utime.sleep_ms(20)
+        self.hal_write_init_nibble(self.LCD_FUNCTION_RESET)
+        utime.sleep_ms(5)
+        self.hal_write_init_nibble(self.LCD_FUNCTION_RESET)
+        utime.sleep_ms(1)
+        self.hal_write_init_nibble(self.LCD_FUNCTION_RESET)
+        utime.sleep_ms(1)
+        self.hal_write_init_nibble(self.LCD_FUNCTION)
+        utime.sleep_ms(1)
+        LcdApi.__init__(self, num_lines, num_columns)
+        cmd = self.LCD_FUNCTION
+        if num_lines > 1:
+            cmd |= self.LCD_FUNCTION_2LINES
+        self.hal_write_command(cmd)
+
+    def _gc_collect(self) -> None:
+        current().clock.advance(GC_COLLECT_US)
+
+    def hal_write_init_nibble(self, nibble) -> None:
+        byte = ((nibble >> 4) & 0x0F) << SHIFT_DATA
+        self.i2c.writeto(self.i2c_addr, bytes([byte | MASK_E]))
+        self.i2c.writeto(self.i2c_addr, bytes([byte]))
+        self._gc_collect()
+
+    def hal_backlight_on(self) -> None:
+        self.i2c.writeto(self.i2c_addr, bytes([1 << SHIFT_BACKLIGHT]))
+        self._gc_collect()
+
+    def hal_backlight_off(self) -> None:
+        self.i2c.writeto(self.i2c_addr, bytes([0]))
+        self._gc_collect()
+
+    def hal_write_command(self, cmd) -> None:
+        byte = (self.backlight << SHIFT_BACKLIGHT) | (((cmd >> 4) & 0x0F) << SHIFT_DATA)
+        self.i2c.writeto(self.i2c_addr, bytes([byte | MASK_E]))
+        self.i2c.writeto(self.i2c_addr, bytes([byte]))
+        byte = (self.backlight << SHIFT_BACKLIGHT) | ((cmd & 0x0F) << SHIFT_DATA)
+        self.i2c.writeto(self.i2c_addr, bytes([byte | MASK_E]))
+        self.i2c.writeto(self.i2c_addr, bytes([byte]))
+        if cmd <= 3:
+            utime.sleep_ms(5)  # clear/homeは最大4.1ms待つ必要がある
+        self._gc_collect()
+
+    def hal_write_data(self, data) -> None:
+        byte = (MASK_RS | (self.backlight << SHIFT_BACKLIGHT)
+                | (((data >> 4) & 0x0F) << SHIFT_DATA))
+        self.i2c.writeto(self.i2c_addr, bytes([byte | MASK_E]))
+        self.i2c.writeto(self.i2c_addr, bytes([byte]))
+        byte = (MASK_RS | (self.backlight << SHIFT_BACKLIGHT)
+                | ((data & 0x0F) << SHIFT_DATA))
+        self.i2c.writeto(self.i2c_addr, bytes([byte | MASK_E]))
+        self.i2c.writeto(self.i2c_addr, bytes([byte]))
+        self._gc_collect()
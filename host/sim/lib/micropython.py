@@ -0,0 +1,39 @@
+"""micropythonモジュールの模擬実装"""
+from host.sim import current
+
+
+def const(value):
+    return value
+
+
+def native(f):
+    return f
+
+
+def viper(f):
+    return f
+
+
+def alloc_emergency_exception_buf(size: int) -> None:
+    pass
+
+
+def schedule(func, arg) -> None:
+    clock = current().clock
+    clock.schedule(clock.now_us, lambda: func(arg))
+
+
+def heap_lock() -> int:
+    return 0
+
+
+def heap_unlock() -> int:
+    return 0
+
+
+def mem_info(verbose=None) -> None:
+    pass
+
+
+def opt_level(level=None):
+    return 0
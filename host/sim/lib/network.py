@@ -0,0 +1,60 @@
+"""networkモジュールの模擬実装（World.wifi_availableで接続可否を決める）"""
+from host.sim import current
+
+STA_IF = 0
+AP_IF = 1
+
+STAT_IDLE = 0
+STAT_CONNECTING = 1
+STAT_WRONG_PASSWORD = -3
+STAT_NO_AP_FOUND = -2
+STAT_CONNECT_FAIL = -1
+STAT_GOT_IP = 3
+
+
+class WLAN:
+    def __init__(self, interface=STA_IF) -> None:
+        self._simulation = current()
+        self._state = self._simulation.network
+
+    def active(self, is_active=None):
+        if is_active is None:
+            return self._state["active"]
+        self._state["active"] = bool(is_active)
+
+    def connect(self, ssid=None, key=None, *, bssid=None) -> None:
+        simulation = self._simulation
+        state = self._state
+        state["status"] = STAT_CONNECTING
+        state["attempt"] = state.get("attempt", 0) + 1
+        attempt = state["attempt"]
+
+        def finish():
+            if state["attempt"] != attempt or state["status"] != STAT_CONNECTING:
+                return
+            if simulation.world.wifi_available:
+                state["status"] = STAT_GOT_IP
+                state["connected_at"] = simulation.clock.now_us
+            else:
+                state["status"] = STAT_NO_AP_FOUND
+
+        simulation.clock.schedule(
+            simulation.clock.now_us + simulation.world.wifi_connect_ms * 1000, finish
+        )
+
+    def disconnect(self) -> None:
+        self._state["status"] = STAT_IDLE
+
+    def status(self, param=None):
+        if param == "rssi":
+            return -55
+        return self._state["status"]
+
+    def isconnected(self) -> bool:
+        return self._state["status"] == STAT_GOT_IP
+
+    def ifconfig(self) -> tuple:
+        return ("192.168.0.10", "255.255.255.0", "192.168.0.1", "192.168.0.1")
+
+    def config(self, *args, **kwargs):
+        return None
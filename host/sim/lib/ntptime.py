@@ -0,0 +1,23 @@
+"""ntptimeモジュールの模擬実装
+
+- Wi-Fiに接続していなければOSErrorを送出する
+- 接続していればSimulation.utc_epoch()の時刻（秒未満は切り捨て）をRTCに設定する
+"""
+from host.sim import current
+
+host = "pool.ntp.org"
+timeout = 1
+
+
+def time() -> int:
+    simulation = current()
+    if simulation.network["status"] != 3:
+        raise OSError(-2)  # getaddrinfoの失敗
+    simulation.clock.advance(simulation.world.ntp_rtt_ms * 1000)
+    return int(simulation.utc_epoch())
+
+
+def settime() -> None:
+    simulation = current()
+    t = time()
+    simulation.clock.epoch_s = t - simulation.clock.now_us // 1000000
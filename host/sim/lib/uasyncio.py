@@ -0,0 +1,383 @@
+"""uasyncioモジュールの模擬実装（仮想時計で動くイベントループ）
+
+- 実行できるタスクがなくなると、次に起きるタスクまたは次のイベント
+  （割り込みなど）の時刻まで仮想時計を進める
+- 対応するAPI: run, create_task, sleep, sleep_ms, gather, wait_for,
+  wait_for_ms, Event, ThreadSafeFlag, Lock, current_task, open_connection
+- open_connectionはSimulation.http_serversに登録した模擬サーバーに接続する
+- 他のスレッド（_thread）がThreadSafeFlagなどでタスクを起こした場合は、
+  その時刻でイベントループに戻る
+"""
+import heapq
+import threading
+from collections import deque
+
+from host.sim import current
+
+
+class CancelledError(BaseException):
+    pass
+
+
+class TimeoutError(Exception):
+    pass
+
+
+class _Yield:
+    def __init__(self, command) -> None:
+        self.command = command
+
+    def __await__(self):
+        return (yield self.command)
+
+
+class Task:
+    def __init__(self, coro) -> None:
+        self.coro = coro
+        self.done_ = False
+        self.result = None
+        self.exception = None
+        self.waiters = []
+        self.token = 0
+
+    def done(self) -> bool:
+        return self.done_
+
+    def cancel(self) -> bool:
+        if self.done_:
+            return False
+        _loop.resume(self, exc=CancelledError())
+        return True
+
+    def __await__(self):
+        if not self.done_:
+            yield ("wait", self, None)
+        if self.exception is not None:
+            raise self.exception
+        return self.result
+
+
+IDLE_WAIT_US = 1000000  # 他のスレッドに起こされるのを待つ間、一度に進める時間
+
+
+class Loop:
+    def __init__(self) -> None:
+        self.clock = current().clock
+        self.thread = threading.get_ident()
+        self.ready = deque()
+        self.sleeping = []
+        self.seq = 0
+        self.current = None
+
+    def resume(self, task: Task, value=None, exc=None) -> None:
+        """タスクを実行待ちにする（待機中の予約は無効にする）"""
+        task.token += 1
+        self.ready.append((task, task.token, value, exc))
+        if threading.get_ident() != self.thread:
+            self.clock.interrupt(self.thread)
+
+    def _sleep(self, task: Task, wake_us: int, exc=None) -> None:
+        self.seq += 1
+        heapq.heappush(self.sleeping, (wake_us, self.seq, task, task.token, exc))
+
+    def _finish(self, task: Task, result=None, exception=None) -> None:
+        task.done_ = True
+        task.result = result
+        task.exception = exception
+        waiters, task.waiters = task.waiters, []
+        for waiter in waiters:
+            self.resume(waiter)
+
+    def _step(self, task: Task, value, exc) -> None:
+        self.current = task
+        try:
+            if exc is not None:
+                command = task.coro.throw(exc)
+            else:
+                command = task.coro.send(value)
+        except StopIteration as e:
+            self._finish(task, result=e.value)
+            return
+        except BaseException as e:  # noqa: B902
+            if not isinstance(e, (Exception, CancelledError)):
+                raise
+            self._finish(task, exception=e)
+            return
+        finally:
+            self.current = None
+
+        if command is None:
+            self.resume(task)
+            return
+        kind = command[0]
+        if kind == "sleep":
+            task.token += 1
+            self._sleep(task, command[1])
+        elif kind == "wait":
+            _, waitable, timeout_us = command
+            task.token += 1
+            waitable.waiters.append(task)
+            if timeout_us is not None:
+                self._sleep(task, self.clock.now_us + timeout_us, TimeoutError())
+
+    def run_until_complete(self, main: Task):
+        while not main.done_:
+            if self.ready:
+                task, token, value, exc = self.ready.popleft()
+                if task.done_ or token != task.token:
+                    continue
+                self._step(task, value, exc)
+                continue
+            next_event = self.clock.next_event_us()
+            if self.sleeping:
+                wake_us = self.sleeping[0][0]
+                if next_event is not None and next_event < wake_us:
+                    self.clock.advance_to(next_event, interruptible=True)
+                    continue
+                self.clock.advance_to(wake_us, interruptible=True)
+                while self.sleeping and self.sleeping[0][0] <= self.clock.now_us:
+                    _, _, task, token, exc = heapq.heappop(self.sleeping)
+                    if not task.done_ and token == task.token:
+                        self.resume(task, exc=exc)
+            elif next_event is not None:
+                self.clock.advance_to(next_event, interruptible=True)
+            elif self.clock.others_waiting():
+                self.clock.advance_to(
+                    self.clock.now_us + IDLE_WAIT_US, interruptible=True
+                )
+            else:
+                raise RuntimeError("deadlock: no runnable tasks")
+        if main.exception is not None:
+            raise main.exception
+        return main.result
+
+
+_loop = None
+
+
+def get_event_loop() -> Loop:
+    global _loop
+    if _loop is None:
+        _loop = Loop()
+    return _loop
+
+
+def new_event_loop() -> Loop:
+    global _loop
+    _loop = Loop()
+    return _loop
+
+
+def create_task(coro) -> Task:
+    task = Task(coro)
+    get_event_loop().resume(task)
+    return task
+
+
+def current_task() -> Task:
+    return get_event_loop().current
+
+
+def run(coro):
+    loop = new_event_loop()
+    return loop.run_until_complete(create_task(coro))
+
+
+async def sleep_ms(ms) -> None:
+    clock = current().clock
+    await _Yield(("sleep", clock.now_us + int(ms * 1000)))
+
+
+async def sleep(seconds) -> None:
+    await sleep_ms(seconds * 1000)
+
+
+async def wait_for_ms(awaitable, timeout_ms):
+    task = awaitable if isinstance(awaitable, Task) else create_task(awaitable)
+    if not task.done_:
+        try:
+            await _Yield(("wait", task, int(timeout_ms * 1000)))
+        except TimeoutError:
+            waiter = current_task()
+            if waiter in task.waiters:
+                task.waiters.remove(waiter)
+            task.cancel()
+            raise
+    if task.exception is not None:
+        raise task.exception
+    return task.result
+
+
+async def wait_for(awaitable, timeout):
+    if timeout is None:
+        return await awaitable
+    return await wait_for_ms(awaitable, timeout * 1000)
+
+
+class _Gather:
+    """子タスクのどれかが終わるたびに待ち手を起こす"""
+    def __init__(self, tasks) -> None:
+        self.tasks = tasks
+        self.waiters = []
+
+    def __await__(self):
+        waiter = current_task()
+        for task in self.tasks:
+            if not task.done_:
+                task.waiters.append(waiter)
+        try:
+            yield ("wait", self, None)
+        finally:
+            for task in self.tasks:
+                if waiter in task.waiters:
+                    task.waiters.remove(waiter)
+
+
+async def gather(*awaitables, return_exceptions=False):
+    tasks = [a if isinstance(a, Task) else create_task(a) for a in awaitables]
+    while True:
+        if not return_exceptions:
+            for task in tasks:
+                if task.done_ and task.exception is not None:
+                    raise task.exception
+        if all(task.done_ for task in tasks):
+            break
+        await _Gather(tasks)
+    return [
+        task.exception if task.exception is not None else task.result
+        for task in tasks
+    ]
+
+
+class Event:
+    def __init__(self) -> None:
+        self.state = False
+        self.waiters = []
+
+    def is_set(self) -> bool:
+        return self.state
+
+    def set(self) -> None:
+        self.state = True
+        waiters, self.waiters = self.waiters, []
+        for task in waiters:
+            _loop.resume(task)
+
+    def clear(self) -> None:
+        self.state = False
+
+    async def wait(self) -> bool:
+        if not self.state:
+            await _Yield(("wait", self, None))
+        return True
+
+
+class ThreadSafeFlag(Event):
+    """割り込みハンドラからset()できるフラグ（wait()から戻るとクリアされる）"""
+    async def wait(self) -> None:
+        if not self.state:
+            await _Yield(("wait", self, None))
+        self.state = False
+
+
+class Lock:
+    def __init__(self) -> None:
+        self.state = False
+        self.waiters = []
+
+    def locked(self) -> bool:
+        return self.state
+
+    async def acquire(self) -> bool:
+        while self.state:
+            await _Yield(("wait", self, None))
+        self.state = True
+        return True
+
+    def release(self) -> None:
+        self.state = False
+        waiters, self.waiters = self.waiters, []
+        for task in waiters:
+            _loop.resume(task)
+
+    async def __aenter__(self) -> "Lock":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.release()
+
+
+class StreamReader:
+    def __init__(self, connection) -> None:
+        self._connection = connection
+        self._buffer = b""
+
+    async def _fill(self) -> bool:
+        """受信できるまで待つ（切断されていればFalse）"""
+        connection = self._connection
+        while True:
+            data = connection.take()
+            if data:
+                self._buffer += data
+                return True
+            if connection.closed:
+                return False
+            clock = current().clock
+            wait_us = max(connection.ready_at_us - clock.now_us, 1000)
+            await sleep_ms(wait_us / 1000)
+
+    async def readline(self) -> bytes:
+        while b"\n" not in self._buffer:
+            if not await self._fill():
+                data, self._buffer = self._buffer, b""
+                return data
+        line, _, self._buffer = self._buffer.partition(b"\n")
+        return line + b"\n"
+
+    async def read(self, n: int = -1) -> bytes:
+        if not self._buffer:
+            await self._fill()
+        if n < 0:
+            n = len(self._buffer)
+        data, self._buffer = self._buffer[:n], self._buffer[n:]
+        return data
+
+    async def readexactly(self, n: int) -> bytes:
+        while len(self._buffer) < n:
+            if not await self._fill():
+                raise EOFError
+        data, self._buffer = self._buffer[:n], self._buffer[n:]
+        return data
+
+
+class StreamWriter:
+    def __init__(self, connection) -> None:
+        self._connection = connection
+        self._pending = b""
+
+    def write(self, data) -> None:
+        self._pending += bytes(data)
+
+    async def drain(self) -> None:
+        data, self._pending = self._pending, b""
+        self._connection.receive(data)
+        await sleep_ms(0)
+
+    def close(self) -> None:
+        self._connection.closed = True
+
+    async def wait_closed(self) -> None:
+        pass
+
+
+async def open_connection(host, port, ssl=None, server_hostname=None):
+    simulation = current()
+    if simulation.network["status"] != 3:
+        raise OSError(-2)  # getaddrinfoの失敗
+    server = simulation.http_servers.get((host, port))
+    if server is None:
+        raise OSError(111)  # ECONNREFUSED
+    await sleep_ms(server.connect_ms)
+    connection = server.connect()
+    return StreamReader(connection), StreamWriter(connection)
@@ -0,0 +1,51 @@
+"""urequestsモジュールの模擬実装（Simulation.http_serversの模擬サーバーに送る）"""
+import json as _json
+
+from host.sim import current
+
+
+class Response:
+    def __init__(self, status_code: int, content: bytes) -> None:
+        self.status_code = status_code
+        self.content = content
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return _json.loads(self.content)
+
+    def close(self) -> None:
+        pass
+
+
+def request(method, url, data=None, json=None, headers=None) -> Response:
+    simulation = current()
+    if simulation.network["status"] != 3:
+        raise OSError(-2)
+    scheme, _, rest = url.partition("://")
+    host, _, path = rest.partition("/")
+    port = 443 if scheme == "https" else 80
+    if ":" in host:
+        host, port = host.split(":")
+        port = int(port)
+    server = simulation.http_servers.get((host, port))
+    if server is None:
+        raise OSError(111)
+    if json is not None:
+        data = _json.dumps(json)
+    body = data.encode("utf-8") if isinstance(data, str) else (data or b"")
+    simulation.clock.advance((server.connect_ms + server.latency_ms) * 1000)
+    status, reset = server.handle(body)
+    if reset:
+        raise OSError(104)
+    return Response(status, b"ok" if status == 200 else b"error")
+
+
+def get(url, **kwargs) -> Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs) -> Response:
+    return request("POST", url, **kwargs)
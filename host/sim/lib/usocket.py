@@ -0,0 +1,78 @@
+"""usocketモジュールの模擬実装（UDPのNTPサーバーだけを模擬する）
+
+- Wi-Fiに接続していなければOSErrorを送出する
+- sendto()で送ったNTPの問い合わせには、World.ntp_rtt_msの後に応答が届く。
+  応答の送信時刻は往復の中間のSimulation.utc_epoch()とする
+- ブロッキングしないソケットは、応答が届く前のrecv()でOSError(EAGAIN)を送出する
+"""
+import struct
+
+from host.sim import current
+
+AF_INET = 2
+SOCK_STREAM = 1
+SOCK_DGRAM = 2
+IPPROTO_UDP = 17
+EAGAIN = 11
+ETIMEDOUT = 110
+NTP_DELTA = 2208988800  # 1900-01-01から1970-01-01までの秒数
+
+
+def _check_network() -> None:
+    if current().network["status"] != 3:
+        raise OSError(-2)  # getaddrinfoの失敗
+
+
+def getaddrinfo(host, port, af=0, type=0, proto=0, flags=0) -> list:
+    _check_network()
+    return [(AF_INET, SOCK_DGRAM, IPPROTO_UDP, "", ("192.0.2.123", port))]
+
+
+class socket:
+    def __init__(self, af=AF_INET, type=SOCK_STREAM, proto=0) -> None:
+        self._simulation = current()
+        self._timeout_us = None
+        self._reply = None  # (届く時刻, 内容)
+
+    def settimeout(self, value) -> None:
+        self._timeout_us = None if value is None else int(value * 1000000)
+
+    def setblocking(self, flag) -> None:
+        self._timeout_us = None if flag else 0
+
+    def sendto(self, data, address) -> int:
+        _check_network()
+        simulation = self._simulation
+        rtt_us = simulation.world.ntp_rtt_ms * 1000
+        arrive_us = simulation.clock.now_us + rtt_us
+        # 往復の中間でサーバーが時刻を読んだものとする
+        epoch = simulation.utc_epoch() + rtt_us / 2000000
+        seconds = int(epoch)
+        fraction = int((epoch - seconds) * (1 << 32))
+        reply = bytearray(48)
+        reply[0] = 0x24  # LI=0, VN=4, Mode=4（サーバー）
+        reply[1] = 1  # stratum
+        struct.pack_into("!II", reply, 40, seconds + NTP_DELTA, fraction)
+        self._reply = (arrive_us, bytes(reply))
+        return len(data)
+
+    def recv(self, bufsize) -> bytes:
+        clock = self._simulation.clock
+        if self._reply is None or self._simulation.network["status"] != 3:
+            if self._timeout_us == 0:
+                raise OSError(EAGAIN)
+            clock.advance(self._timeout_us or 1000000)
+            raise OSError(ETIMEDOUT)
+        arrive_us, reply = self._reply
+        if clock.now_us < arrive_us:
+            if self._timeout_us == 0:
+                raise OSError(EAGAIN)
+            if self._timeout_us is not None and arrive_us - clock.now_us > self._timeout_us:
+                clock.advance(self._timeout_us)
+                raise OSError(ETIMEDOUT)
+            clock.advance_to(arrive_us)
+        self._reply = None
+        return reply[:bufsize]
+
+    def close(self) -> None:
+        self._reply = None
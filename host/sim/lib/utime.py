@@ -0,0 +1,53 @@
+"""utimeモジュールの模擬実装（host.simの仮想時計を使う）"""
+import calendar
+import time as _time
+
+from host.sim import current
+from host.sim.clock import ticks_add, ticks_diff  # noqa: F401
+
+
+def sleep(seconds) -> None:
+    current().clock.advance(int(seconds * 1000000))
+
+
+def sleep_ms(ms) -> None:
+    current().clock.advance(int(ms) * 1000)
+
+
+def sleep_us(us) -> None:
+    current().clock.advance(int(us))
+
+
+def ticks_ms() -> int:
+    return current().clock.ticks_ms()
+
+
+def ticks_us() -> int:
+    return current().clock.ticks_us()
+
+
+def ticks_cpu() -> int:
+    return current().clock.ticks_us()
+
+
+def time() -> int:
+    return int(current().clock.epoch())
+
+
+def time_ns() -> int:
+    return int(current().clock.epoch() * 1000000000)
+
+
+def localtime(secs=None) -> tuple:
+    if secs is None:
+        secs = time()
+    t = _time.gmtime(secs)
+    return (t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour, t.tm_min, t.tm_sec,
+            t.tm_wday, t.tm_yday)
+
+
+gmtime = localtime
+
+
+def mktime(t) -> int:
+    return calendar.timegm(tuple(t[:6]) + (0, 0, 0))
@@ -0,0 +1,424 @@
+import math
+import random
+import struct
+
+from host.sim.board import I2CDevice
+
+
+def default_scene(angle: float, t_us: int) -> float:
+    """既定の障害物配置（角度と時刻から距離[cm]を返す）
+
+    - 正面の障害物は20cm/sで近づき、10cmまで来ると150cmに戻る
+    - 左右の壁は正面よりもゆっくり変化する
+    """
+    t = t_us / 1000000
+    front = 150 - (t * 20) % 140
+    left = 45 + 25 * math.sin(t / 7)
+    right = 60 + 20 * math.cos(t / 5)
+    if angle >= 0:
+        ratio = min(angle, 60) / 60
+        return front + (left - front) * ratio
+    ratio = min(-angle, 60) / 60
+    return front + (right - front) * ratio
+
+
+class World:
+    """シミュレーターの外界（障害物、気象、Wi-Fiの状態）
+
+    Args:
+        seed (int): ノイズの乱数シード
+        scene (callable): 角度[度]と時刻[μs]から距離[cm]を返す関数
+            Noneを返すとエコーが返ってこない
+    """
+    def __init__(self, seed: int = 0, scene=default_scene) -> None:
+        self.random = random.Random(seed)
+        self.scene = scene
+
+        self.ambient_c = 22.0
+        self.pressure_hpa = 1013.25
+        self.humidity = 45.0
+        self.chip_c = 25.0
+
+        self.adc_noise_lsb = 1.5  # 12bit ADCのノイズ（標準偏差）
+        self.adc_spike_rate = 0.0  # スパイクノイズの発生確率
+        self.echo_noise_cm = 0.3
+        self.echo_drop_rate = 0.0  # エコーが返ってこない確率
+        self.echo_spike_rate = 0.0  # 別の物体からの反射で誤った距離になる確率
+
+        self.pico_w = False  # TrueにするとWi-Fi付きのファームウェア(urequestsあり)になる
+        self.wifi_available = False
+        self.wifi_connect_ms = 3000
+        self.ntp_rtt_ms = 30
+        self.clock_drift_ppm = 0.0  # Picoの水晶がNTPサーバーの時刻より速く進む割合
+
+    def distance_cm(self, angle: float, t_us: int):
+        distance = self.scene(angle, t_us)
+        if distance is None or self.random.random() < self.echo_drop_rate:
+            return None
+        if self.random.random() < self.echo_spike_rate:
+            return self.random.uniform(2.0, 400.0)
+        return max(2.0, distance + self.random.gauss(0, self.echo_noise_cm))
+
+    def speed_of_sound(self) -> float:
+        """気温から音速[m/s]を計算する"""
+        return 331.3 + 0.606 * self.ambient_c
+
+    def weather(self, t_us: int) -> tuple:
+        """気温[℃]、気圧[hPa]、湿度[%]をゆっくり変化させて返す"""
+        t = t_us / 1000000
+        return (
+            self.ambient_c + 0.5 * math.sin(t / 600),
+            self.pressure_hpa - 0.8 * math.sin(t / 3600),
+            self.humidity + 3 * math.sin(t / 900),
+        )
+
+
+class SG90:
+    """サーボモーター(SG90)の動きを模擬する
+
+    - 0.1s/60度（4.8V）の速度で目標角度に向かって回転する
+    """
+    SPEED_DEG_PER_US = 60 / 100000
+    PERIOD_MS = 20
+
+    def __init__(self, board, num_pwm: int) -> None:
+        self.clock = board.clock
+        self.moves = 0
+        self._from_angle = 0.0
+        self._target = 0.0
+        self._since_us = 0
+        board.on_pwm(num_pwm, self._on_pwm)
+
+    def _on_pwm(self, freq: int, duty: int) -> None:
+        if not freq or not duty:
+            return
+        duty_ms = duty / 65535 * (1000 / freq)
+        target = (duty_ms - 0.5) / 1.9 * 180 - 90
+        if target == self._target:
+            return
+        self._from_angle = self.angle()
+        self._target = target
+        self._since_us = self.clock.now_us
+        self.moves += 1
+
+    def angle(self) -> float:
+        """現在の（実際の）角度を返す"""
+        travelled = (self.clock.now_us - self._since_us) * self.SPEED_DEG_PER_US
+        delta = self._target - self._from_angle
+        if abs(delta) <= travelled:
+            return self._target
+        return self._from_angle + math.copysign(travelled, delta)
+
+
+class HCSR04:
+    """超音波センサー(HC-SR04)のエコーのタイミングを模擬する
+
+    - TRIGが10μs以上HIGHになった後の立ち下がりで測定を開始する
+    - 8パルスの送信後にECHOをHIGHにし、往復時間だけHIGHを保つ
+    - エコーが返ってこない場合は38ms後にLOWに戻る
+    """
+    BURST_US = 460
+    NO_ECHO_US = 38000
+    MIN_TRIGGER_US = 10
+
+    def __init__(self, board, num_trigger: int, num_echo: int, servo=None) -> None:
+        self.board = board
+        self.clock = board.clock
+        self.world = board.world
+        self.num_echo = num_echo
+        self.servo = servo
+        self.pings = 0
+        self.last_distance_cm = None
+        self._trigger_since = None
+        self._busy_until = 0
+        board.pin(num_trigger).listeners.append(self._on_trigger)
+
+    def _on_trigger(self, level: int) -> None:
+        now = self.clock.now_us
+        if level:
+            self._trigger_since = now
+            return
+        since, self._trigger_since = self._trigger_since, None
+        if since is None or now - since < self.MIN_TRIGGER_US:
+            return
+        if now < self._busy_until:
+            return
+        self.pings += 1
+        angle = self.servo.angle() if self.servo else 0
+        distance = self.world.distance_cm(angle, now)
+        self.last_distance_cm = distance
+        if distance is None:
+            width_us = self.NO_ECHO_US
+        else:
+            width_us = int(2 * distance / 100 / self.world.speed_of_sound() * 1000000)
+        start_us = now + self.BURST_US
+        self._busy_until = start_us + width_us
+        self.board.schedule_drive(self.num_echo, 1, start_us)
+        self.board.schedule_drive(self.num_echo, 0, start_us + width_us)
+
+
+class OnDieTemperature:
+    """RP2040の内蔵温度センサ(ADC4)を模擬する
+
+    - 12bitで量子化した値を16bitに拡張して返す（read_u16と同じ）
+    """
+    def __init__(self, world) -> None:
+        self.world = world
+        self.reads = 0
+
+    def read_u16(self) -> int:
+        self.reads += 1
+        world = self.world
+        temperature = world.chip_c
+        if world.random.random() < world.adc_spike_rate:
+            temperature += world.random.choice((-1, 1)) * 30
+        volt = 0.706 - (temperature - 27) * 0.001721
+        raw = round(volt / 3.3 * 4095 + world.random.gauss(0, world.adc_noise_lsb))
+        raw = min(max(raw, 0), 4095)
+        return (raw << 4) | (raw >> 8)
+
+
+class BME280Calibration:
+    """BME280の補正係数（実機から読み出した典型値）"""
+    dig_T1, dig_T2, dig_T3 = 27504, 26435, -1000
+    dig_P1, dig_P2, dig_P3 = 36477, -10685, 3024
+    dig_P4, dig_P5, dig_P6 = 2855, 140, -7
+    dig_P7, dig_P8, dig_P9 = 15500, -14600, 6000
+    dig_H1, dig_H2, dig_H3 = 75, 359, 0
+    dig_H4, dig_H5, dig_H6 = 335, 50, 30
+
+
+def bme280_compensate(calib, raw_temp: int, raw_press: int, raw_hum: int) -> tuple:
+    """データシートの整数演算で補正値を計算する
+
+    Returns:
+        tuple: (温度[0.01℃], 気圧[Pa/256], 湿度[%/1024])
+    """
+    var1 = ((raw_temp >> 3) - (calib.dig_T1 << 1)) * (calib.dig_T2 >> 11)
+    var2 = (((((raw_temp >> 4) - calib.dig_T1)
+              * ((raw_temp >> 4) - calib.dig_T1)) >> 12) * calib.dig_T3) >> 14
+    t_fine = var1 + var2
+    temp = (t_fine * 5 + 128) >> 8
+
+    var1 = t_fine - 128000
+    var2 = var1 * var1 * calib.dig_P6
+    var2 = var2 + ((var1 * calib.dig_P5) << 17)
+    var2 = var2 + (calib.dig_P4 << 35)
+    var1 = ((var1 * var1 * calib.dig_P3) >> 8) + ((var1 * calib.dig_P2) << 12)
+    var1 = (((1 << 47) + var1) * calib.dig_P1) >> 33
+    if var1 == 0:
+        pressure = 0
+    else:
+        p = 1048576 - raw_press
+        p = (((p << 31) - var2) * 3125) // var1
+        var1 = (calib.dig_P9 * (p >> 13) * (p >> 13)) >> 25
+        var2 = (calib.dig_P8 * p) >> 19
+        pressure = ((p + var1 + var2) >> 8) + (calib.dig_P7 << 4)
+
+    h = t_fine - 76800
+    h = ((((raw_hum << 14) - (calib.dig_H4 << 20) - (calib.dig_H5 * h)) + 16384)
+         >> 15) * (((((((h * calib.dig_H6) >> 10)
+                      * (((h * calib.dig_H3) >> 11) + 32768)) >> 10) + 2097152)
+                    * calib.dig_H2 + 8192) >> 14)
+    h = h - (((((h >> 15) * (h >> 15)) >> 7) * calib.dig_H1) >> 4)
+    h = min(max(h, 0), 419430400)
+    return temp, pressure, h >> 12
+
+
+def _search(lo: int, hi: int, key, target, increasing: bool = True) -> int:
+    """単調な関数keyについて、key(x)がtargetに最も近いxを二分探索する"""
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if (key(mid) < target) == increasing:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+class BME280Device(I2CDevice):
+    """温湿度・気圧センサ(BME280)のレジスタを模擬する
+
+    - 補正係数、chip id、ctrl_hum/ctrl_meas/status/データレジスタを持つ
+    - forcedモードの書き込みで測定を開始し、測定時間後にデータを更新して
+      sleepモードに戻る
+    """
+    CHIP_ID = 0x60
+    REG_ID = 0xD0
+    REG_CTRL_HUM = 0xF2
+    REG_STATUS = 0xF3
+    REG_CTRL_MEAS = 0xF4
+    REG_DATA = 0xF7
+
+    def __init__(self, clock, world, calib=BME280Calibration) -> None:
+        self.clock = clock
+        self.world = world
+        self.calib = calib
+        self.regs = bytearray(256)
+        self.measurements = 0
+        self._measuring = False
+        self._write_calibration()
+        self.regs[self.REG_ID] = self.CHIP_ID
+        self._latch()
+
+    def _write_calibration(self) -> None:
+        c = self.calib
+        struct.pack_into(
+            "<HhhHhhhhhhhh", self.regs, 0x88,
+            c.dig_T1, c.dig_T2, c.dig_T3, c.dig_P1, c.dig_P2, c.dig_P3,
+            c.dig_P4, c.dig_P5, c.dig_P6, c.dig_P7, c.dig_P8, c.dig_P9,
+        )
+        self.regs[0xA1] = c.dig_H1
+        struct.pack_into("<hB", self.regs, 0xE1, c.dig_H2, c.dig_H3)
+        self.regs[0xE4] = (c.dig_H4 >> 4) & 0xFF
+        self.regs[0xE5] = ((c.dig_H5 & 0x0F) << 4) | (c.dig_H4 & 0x0F)
+        self.regs[0xE6] = (c.dig_H5 >> 4) & 0xFF
+        struct.pack_into("<b", self.regs, 0xE7, c.dig_H6)
+
+    def _latch(self) -> None:
+        """外界の値に対応する生データをデータレジスタに書き込む"""
+        self.measurements += 1
+        temperature, pressure, humidity = self.world.weather(self.clock.now_us)
+        calib = self.calib
+        raw_temp = _search(
+            0, (1 << 20) - 1,
+            lambda x: bme280_compensate(calib, x, 0, 0)[0], temperature * 100,
+        )
+        raw_press = _search(
+            0, (1 << 20) - 1,
+            lambda x: bme280_compensate(calib, raw_temp, x, 0)[1],
+            pressure * 100 * 256, increasing=False,
+        )
+        raw_hum = _search(
+            0, (1 << 16) - 1,
+            lambda x: bme280_compensate(calib, raw_temp, raw_press, x)[2],
+            humidity * 1024,
+        )
+        data = (
+            raw_press >> 12, (raw_press >> 4) & 0xFF, (raw_press & 0x0F) << 4,
+            raw_temp >> 12, (raw_temp >> 4) & 0xFF, (raw_temp & 0x0F) << 4,
+            raw_hum >> 8, raw_hum & 0xFF,
+        )
+        self.regs[self.REG_DATA:self.REG_DATA + 8] = bytes(data)
+
+    def _measure_time_us(self, ctrl_meas: int) -> int:
+        def count(code):
+            return 1 << (code - 1) if code else 0
+        osrs_t = count(ctrl_meas >> 5)
+        osrs_p = count((ctrl_meas >> 2) & 0x07)
+        osrs_h = count(self.regs[self.REG_CTRL_HUM] & 0x07)
+        return int(1250 + 2300 * osrs_t + 2300 * osrs_p + 575 + 2300 * osrs_h + 575)
+
+    def _finish(self) -> None:
+        self._latch()
+        self._measuring = False
+        self.regs[self.REG_STATUS] = 0
+        self.regs[self.REG_CTRL_MEAS] &= 0xFC  # sleepモードに戻る
+
+    def write_mem(self, reg: int, data: bytes) -> None:
+        for offset, value in enumerate(data):
+            self.regs[reg + offset] = value
+        if reg <= self.REG_CTRL_MEAS < reg + len(data):
+            mode = self.regs[self.REG_CTRL_MEAS] & 0x03
+            if mode in (1, 2) and not self._measuring:
+                self._measuring = True
+                self.regs[self.REG_STATUS] = 0x08
+                self.clock.schedule(
+                    self.clock.now_us
+                    + self._measure_time_us(self.regs[self.REG_CTRL_MEAS]),
+                    self._finish,
+                )
+
+    def read_mem(self, reg: int, nbytes: int) -> bytes:
+        if (
+            reg <= self.REG_DATA < reg + nbytes
+            and self.regs[self.REG_CTRL_MEAS] & 0x03 == 0x03
+        ):  # normalモードでは常に新しい値が読める
+            self._latch()
+        return bytes(self.regs[reg:reg + nbytes])
+
+
+class LCD1602Device(I2CDevice):
+    """I2Cバックパック(PCF8574)付きのLCD(HD44780)を模擬する
+
+    - Eの立ち下がりでニブルを取り込み、4bitモードでは2ニブルで1バイトとする
+    - clear/homeは1.52ms、その他の命令は37μsのビジー時間を持つ
+    """
+    MASK_RS = 0x01
+    MASK_E = 0x04
+    SHIFT_DATA = 4
+    CLEAR_US = 1520
+    COMMAND_US = 37
+
+    def __init__(self, clock, num_lines: int = 2, num_columns: int = 16) -> None:
+        self.clock = clock
+        self.num_lines = num_lines
+        self.num_columns = num_columns
+        self.ddram = bytearray(b" " * 0x80)
+        self.addr = 0
+        self.four_bit = False
+        self.stats = {
+            "commands": 0, "data": 0, "clears": 0, "busy_violations": 0,
+        }
+        self._port = 0
+        self._nibble = None
+        self._busy_until = 0
+
+    def write(self, data: bytes) -> None:
+        for port in data:
+            if self._port & self.MASK_E and not port & self.MASK_E:
+                self._strobe(self._port)
+            self._port = port
+
+    def read(self, nbytes: int) -> bytes:
+        return bytes([self._port] * nbytes)
+
+    def _strobe(self, port: int) -> None:
+        nibble = port >> self.SHIFT_DATA
+        rs = port & self.MASK_RS
+        if not self.four_bit:
+            self._execute(rs, nibble << 4)
+            return
+        if self._nibble is None:
+            self._nibble = nibble
+            return
+        value, self._nibble = (self._nibble << 4) | nibble, None
+        self._execute(rs, value)
+
+    def _execute(self, rs: int, value: int) -> None:
+        now = self.clock.now_us
+        if now < self._busy_until:
+            self.stats["busy_violations"] += 1
+        if rs:
+            self.stats["data"] += 1
+            self.ddram[self.addr] = value
+            self.addr = (self.addr + 1) & 0x7F
+            if self.addr == 0x28:
+                self.addr = 0x40
+            elif self.addr == 0x68:
+                self.addr = 0
+            self._busy_until = now + self.COMMAND_US
+            return
+        self.stats["commands"] += 1
+        busy_us = self.COMMAND_US
+        if value == 0x01:
+            self.stats["clears"] += 1
+            self.ddram[:] = b" " * 0x80
+            self.addr = 0
+            busy_us = self.CLEAR_US
+        elif value & 0xFE == 0x02:
+            self.addr = 0
+            busy_us = self.CLEAR_US
+        elif value & 0xE0 == 0x20:
+            self.four_bit = not value & 0x10
+        elif value & 0x80:
+            self.addr = value & 0x7F
+        self._busy_until = now + busy_us
+
+    def lines(self) -> list:
+        """表示されている文字列を行ごとに返す"""
+        starts = (0x00, 0x40, self.num_columns, 0x40 + self.num_columns)
+        return [
+            bytes(self.ddram[start:start + self.num_columns]).decode()
+            for start in starts[:self.num_lines]
+        ]
@@ -0,0 +1,170 @@
+"""バイナリのテレメトリ（src/util/telemetry.py）をデコードするツール
+
+- ファイルは固定長のレコードの並びなので、先頭から順に読むだけでよい
+- NumPyがあればメモリマップで一括変換し、なければstructで逐次変換する
+
+Examples:
+    $ python -m host.telemetry telemetry.bin --csv telemetry.csv
+    $ python -m host.telemetry telemetry.bin --npz telemetry.npz  # NumPyが必要
+    $ python -m host.telemetry telemetry.bin --summary
+"""
+import argparse
+import csv
+import os
+import struct
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from src.const import (  # noqa: E402
+    TELEMETRY_HEADER_FORMAT,
+    TELEMETRY_MAGIC,
+    TELEMETRY_RECORD_FORMAT,
+    TELEMETRY_TAG_AMEDAS,
+    TELEMETRY_TAG_DISTANCE,
+    TELEMETRY_TAG_TEMPERATURE,
+)
+
+HEADER_SIZE = struct.calcsize(TELEMETRY_HEADER_FORMAT)
+RECORD = struct.Struct(TELEMETRY_RECORD_FORMAT)
+
+# 種別ごとの名前と、値0~2の(列名, 割る数, 足す数)
+TYPES = {
+    TELEMETRY_TAG_AMEDAS: ("amedas", (
+        ("temperature_c", 100, 0),
+        ("pressure_hpa", 10, 0),
+        ("humidity", 100, 0),
+    )),
+    TELEMETRY_TAG_DISTANCE: ("distance", (
+        ("left_cm", 10, 0),
+        ("front_cm", 10, 0),
+        ("right_cm", 10, 0),
+    )),
+    TELEMETRY_TAG_TEMPERATURE: ("temperature", (
+        ("temperature_c", 100, 0),
+    )),
+}
+
+def read_header(f) -> int:
+    """ヘッダを検証し、レコード長を返す"""
+    header = f.read(HEADER_SIZE)
+    magic, version, record_size, _ = struct.unpack(TELEMETRY_HEADER_FORMAT, header)
+    if magic != TELEMETRY_MAGIC:
+        raise ValueError(f"not a telemetry file: {magic!r}")
+    if record_size != RECORD.size:
+        raise ValueError(f"unsupported record size {record_size} (version {version})")
+    return record_size
+
+
+def iter_records(path: str, chunk_records: int = 4096):
+    """レコードを1件ずつ返す（ファイル全体を読み込まない）
+
+    Yields:
+        tuple: (種別名, UNIX時刻, ticks_ms下位16bit, 通し番号, {列名: 値})
+    """
+    with open(path, "rb") as f:
+        read_header(f)
+        while True:
+            chunk = f.read(RECORD.size * chunk_records)
+            if not chunk:
+                break
+            usable = len(chunk) - len(chunk) % RECORD.size  # 書き込み途中の末尾は捨てる
+            for tag, _, ticks, epoch, v0, v1, v2, seq in RECORD.iter_unpack(chunk[:usable]):
+                name, fields = TYPES.get(tag, (f"tag{tag}", ()))
+                values = {
+                    column: (raw + offset) / scale
+                    for (column, scale, offset), raw in zip(fields, (v0, v1, v2))
+                }
+                yield name, epoch, ticks, seq, values
+
+
+def to_numpy(path: str) -> dict:
+    """種別ごとに列の配列へ変換する（NumPyのメモリマップを使う）
+
+    Returns:
+        dict: {"amedas": {"epoch": ndarray, "temperature_c": ndarray, ...}, ...}
+    """
+    import numpy as np
+
+    with open(path, "rb") as f:
+        read_header(f)
+    dtype = np.dtype([
+        ("tag", "u1"), ("flags", "u1"), ("ticks", "<u2"), ("epoch", "<u4"),
+        ("v0", "<i2"), ("v1", "<i2"), ("v2", "<i2"), ("seq", "<u2"),
+    ])
+    count = (os.path.getsize(path) - HEADER_SIZE) // dtype.itemsize
+    records = np.memmap(path, dtype=dtype, mode="r", offset=HEADER_SIZE, shape=(count,))
+    result = {}
+    for tag, (name, fields) in TYPES.items():
+        selected = records[records["tag"] == tag]
+        columns = {
+            "epoch": selected["epoch"].astype(np.int64),
+            "ticks": selected["ticks"].astype(np.int64),
+            "seq": selected["seq"].astype(np.int64),
+        }
+        for index, (column, scale, offset) in enumerate(fields):
+            columns[column] = (selected[f"v{index}"].astype(np.float64) + offset) / scale
+        result[name] = columns
+    return result
+
+
+def write_csv(path: str, out) -> int:
+    """CSVに書き出す（その種別にない列は空欄にする）"""
+    columns = ["type", "epoch", "ticks", "seq"]
+    for _, fields in TYPES.values():
+        for column, _, _ in fields:
+            if column not in columns:
+                columns.append(column)
+    writer = csv.DictWriter(out, fieldnames=columns)
+    writer.writeheader()
+    count = 0
+    for name, epoch, ticks, seq, values in iter_records(path):
+        writer.writerow({"type": name, "epoch": epoch, "ticks": ticks, "seq": seq, **values})
+        count += 1
+    return count
+
+
+def summarize(path: str) -> dict:
+    counts = {}
+    lost = 0
+    previous = None
+    for name, _, _, seq, _ in iter_records(path):
+        counts[name] = counts.get(name, 0) + 1
+        if previous is not None and seq != (previous + 1) & 0xFFFF:
+            lost += 1  # 通し番号の飛び（セッションの切れ目を含む）
+        previous = seq
+    return {"records": counts, "gaps": lost, "bytes": os.path.getsize(path)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--csv", help="CSVの出力先（-で標準出力）")
+    parser.add_argument("--npz", help="NumPyのnpzの出力先")
+    parser.add_argument("--summary", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.csv:
+        if args.csv == "-":
+            write_csv(args.path, sys.stdout)
+        else:
+            with open(args.csv, "w", newline="", encoding="utf-8") as f:
+                write_csv(args.path, f)
+    if args.npz:
+        import numpy as np
+
+        arrays = {
+            f"{name}_{column}": values
+            for name, columns in to_numpy(args.path).items()
+            for column, values in columns.items()
+        }
+        np.savez_compressed(args.npz, **arrays)
+    if args.summary or not (args.csv or args.npz):
+        print(summarize(args.path))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,22 @@
+"""host.simの上でsrc/の処理を確かめるテスト
+
+- テストごとにsim.install()でシミュレーターを作り直す（src/以下も読み込み直される）
+- そのためsrc/のモジュールはテストの中でimportする
+
+Examples:
+    $ python -m pytest -q host/tests
+"""
+import pytest
+
+from host import sim
+from host.sim.peripherals import World
+
+
+@pytest.fixture
+def world() -> World:
+    return World()
+
+
+@pytest.fixture
+def simulation(world, tmp_path):
+    return sim.install(world=world, flash_dir=str(tmp_path))
@@ -0,0 +1,92 @@
+def test_full_buffer_overwrites_oldest(simulation):
+    from src.util.acquisition import ReadingBuffer
+
+    buffer = ReadingBuffer(capacity=4)
+    for value in range(6):
+        buffer.publish(3, value)
+    assert buffer.published == 6
+    assert buffer.overwritten == 2
+    assert [buffer.read()[2] for _ in range(4)] == [2, 3, 4, 5]
+    assert buffer.read() is None
+    buffer.publish(3, 6, 7, 8, flags=1)
+    assert buffer.read()[:5] == (3, 1, 6, 7, 8)
+
+
+def test_publish_from_core1_wakes_core0(simulation):
+    import uasyncio
+    from src.util.acquisition import Acquisition, ReadingBuffer
+
+    clock = simulation.clock
+    buffer = ReadingBuffer()
+    acquisition = Acquisition()
+    acquisition.every(50, lambda: buffer.publish(3, clock.now_us // 1000))
+    acquisition.start()
+
+    async def consume():
+        delays = []
+        while len(delays) < 5:
+            await buffer.wait()
+            reading = buffer.read()
+            delays.append(clock.now_us // 1000 - reading[2])
+        return delays
+
+    try:
+        delays = uasyncio.run(consume())
+    finally:
+        assert acquisition.stop()
+    assert max(delays) <= 1  # ポーリングせず、書き込んだらすぐに起きる
+    assert buffer.overwritten == 0
+
+
+def test_stop_waits_for_running_job(simulation):
+    import utime
+    from src.const import ACQUISITION_STOP_TIMEOUT_MS
+    from src.util.acquisition import Acquisition
+
+    clock = simulation.clock
+    acquisition = Acquisition()
+    acquisition.every(0, lambda: utime.sleep_ms(300))
+    acquisition.start()
+    utime.sleep_ms(100)
+    started_us = clock.now_us
+    assert acquisition.stop()
+    assert clock.now_us - started_us <= ACQUISITION_STOP_TIMEOUT_MS * 1000
+    assert not acquisition.running
+    assert acquisition.jobs[0].runs >= 1
+
+
+def test_stop_gives_up_after_timeout(simulation):
+    import utime
+    from src.const import ACQUISITION_STOP_TIMEOUT_MS
+    from src.util.acquisition import Acquisition
+
+    clock = simulation.clock
+    acquisition = Acquisition()
+    acquisition.every(0, lambda: utime.sleep_ms(ACQUISITION_STOP_TIMEOUT_MS * 3))
+    acquisition.start()
+    utime.sleep_ms(10)
+    started_us = clock.now_us
+    assert not acquisition.stop()
+    assert clock.now_us - started_us == ACQUISITION_STOP_TIMEOUT_MS * 1000
+    assert acquisition.stop(timeout_ms=ACQUISITION_STOP_TIMEOUT_MS * 3)
+
+
+def test_errors_are_counted_and_loop_continues(simulation):
+    import utime
+    from src.util.acquisition import Acquisition
+
+    acquisition = Acquisition()
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) % 2:
+            raise OSError(5)
+
+    acquisition.every(100, flaky)
+    acquisition.start()
+    utime.sleep_ms(950)
+    assert acquisition.stop()
+    assert len(calls) == 10
+    assert acquisition.errors == 5
+    assert isinstance(acquisition.last_error, OSError)
@@ -0,0 +1,28 @@
+import pytest
+
+
+def _log_line(payload: str) -> tuple:
+    from src.util.time import Time, now_epoch_ms
+
+    return f"[{Time.now_string()}] {payload}\n".encode(), now_epoch_ms() // 1000
+
+
+@pytest.mark.parametrize("parser", ["parse_lines", "parse_numpy"])
+def test_epoch_matches_telemetry_clock(simulation, parser):
+    if parser == "parse_numpy":
+        pytest.importorskip("numpy")
+    from host import analyze
+
+    data, epoch = _log_line("22.5")
+    columns = getattr(analyze, parser)(data)["types"]["temperature"]
+    assert list(columns["epoch"]) == [epoch]
+    assert list(columns["temperature_c"]) == [22.5]
+
+
+def test_utc_offset_zero_reads_utc_log(simulation):
+    from host import analyze
+    from src.const import TIME_UTC_OFFSET_SEC
+
+    data, epoch = _log_line("22.5")
+    result = analyze.parse_lines(data, utc_offset_sec=0)
+    assert list(result["types"]["temperature"]["epoch"]) == [epoch + TIME_UTC_OFFSET_SEC]
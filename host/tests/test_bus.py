@@ -0,0 +1,70 @@
+import pytest
+
+
+def _bus():
+    from src.bus import get_bus
+
+    return get_bus(0, num_sda=12, num_scl=13)
+
+
+def test_same_pins_share_one_bus(simulation):
+    from src.bus import get_bus
+
+    assert get_bus(0, num_sda=12, num_scl=13) is _bus()
+
+
+def test_nested_with_keeps_lock_until_outermost_exit(simulation):
+    bus = _bus()
+    with bus:
+        with bus:
+            bus.readfrom_mem(0x76, 0xD0, 1)  # 転送ごとのwithも入れ子になる
+            assert bus._lock.locked()
+        assert bus._lock.locked()
+    assert not bus._lock.locked()
+    assert bus.transactions == 1
+
+
+def test_timeout_while_other_thread_holds_lock(simulation):
+    import _thread
+    import utime
+    from src.const import I2C_LOCK_TIMEOUT_MS
+    from src.errors import I2CBusTimeoutError
+
+    clock = simulation.clock
+    bus = _bus()
+    released = []
+
+    def hold():
+        with bus:
+            utime.sleep_ms(I2C_LOCK_TIMEOUT_MS * 3)
+        released.append(clock.now_us)
+
+    _thread.start_new_thread(hold, ())
+    utime.sleep_ms(1)  # 別のスレッドがロックを取るまで待つ
+    started_us = clock.now_us
+    with pytest.raises(I2CBusTimeoutError):
+        bus.readfrom_mem(0x76, 0xD0, 1)
+    assert clock.now_us - started_us == pytest.approx(I2C_LOCK_TIMEOUT_MS * 1000, abs=10)
+    assert bus.lock_timeouts == 1
+    assert bus.transactions == 0
+
+    utime.sleep_ms(I2C_LOCK_TIMEOUT_MS * 3)
+    assert released
+    assert bus.readfrom_mem(0x76, 0xD0, 1) == b"\x60"  # 解放されたら使える
+    assert bus.transactions == 1
+
+
+def test_scan_is_cached_and_require_checks_address(simulation):
+    from src.errors import ConnectionError
+
+    bus = _bus()
+    stats = simulation.board.i2c_bus(0).stats
+    bus.require(0x76)
+    bus.require(0x27)
+    assert sorted(bus.scan()) == [0x27, 0x76]
+    assert stats["scans"] == 1
+    with pytest.raises(ConnectionError):
+        bus.require(0x3C)
+    assert stats["scans"] == 1
+    bus.scan(refresh=True)
+    assert stats["scans"] == 2
@@ -0,0 +1,74 @@
+import random
+
+COLUMNS = 16
+
+
+def _display():
+    from src.device import Display
+
+    return Display(num_sda=12, num_scl=13)
+
+
+def _print_screen(value: str) -> list:
+    """Display.print()と同じ規則で2行の画面を作る"""
+    lines = [[" "] * COLUMNS for _ in range(2)]
+    line, x = 0, 0
+    for char in value:
+        if char == "\n":
+            line, x = line + 1, 0
+        elif x < COLUMNS:
+            lines[line][x] = char
+            x += 1
+            if x == COLUMNS:
+                line, x = line + 1, 0
+        if line >= 2:
+            break
+    return lines
+
+
+def test_random_updates_match_lcd(simulation):
+    rng = random.Random(0)
+    display = _display()
+    lcd = simulation.lcd
+    expected = [[" "] * COLUMNS for _ in range(2)]
+    alphabet = "ab- *.0123"
+    for _ in range(300):
+        operation = rng.choice(("print", "line", "cell", "cell"))
+        if operation == "print":
+            value = "".join(rng.choice(alphabet + "\n") for _ in range(rng.randint(0, 40)))
+            display.print(value)
+            expected = _print_screen(value)
+        elif operation == "line":
+            y = rng.randint(0, 1)
+            value = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 20)))
+            display.set_line(y, value)
+            expected[y] = list(value[:COLUMNS].ljust(COLUMNS))
+        else:
+            x, y, char = rng.randint(0, COLUMNS - 1), rng.randint(0, 1), rng.choice(alphabet)
+            display.set_cell(x, y, char)
+            expected[y][x] = char
+        assert lcd.lines() == ["".join(line) for line in expected]
+    assert lcd.stats["busy_violations"] == 0
+
+
+def test_write_continues_from_last_column_to_next_line(simulation):
+    display = _display()
+    lcd = simulation.lcd
+    display.print("A" * COLUMNS + "B")
+    assert lcd.lines() == ["A" * COLUMNS, "B" + " " * (COLUMNS - 1)]
+    # 1行目の最後の列と2行目の先頭だけが変わる
+    display.print("A" * (COLUMNS - 1) + "CD")
+    assert lcd.lines() == ["A" * (COLUMNS - 1) + "C", "D" + " " * (COLUMNS - 1)]
+
+
+def test_unchanged_text_sends_nothing(simulation):
+    display = _display()
+    lcd = simulation.lcd
+    display.print("22.01C\n1013.25hPa")
+    sent = lcd.stats["data"] + lcd.stats["commands"]
+    display.print("22.01C\n1013.25hPa")
+    display.set_line(0, "22.01C")
+    assert lcd.stats["data"] + lcd.stats["commands"] == sent
+    display.set_cell(4, 0, "2")  # 1文字だけ送る（カーソル移動と1文字）
+    assert lcd.stats["data"] + lcd.stats["commands"] == sent + 2
+    assert lcd.lines()[0].rstrip() == "22.02C"
@@ -0,0 +1,87 @@
+NUM_IN = 2
+
+
+def _button(simulation):
+    from src.device import Button
+
+    return Button(num_in=NUM_IN)
+
+
+def _drive(simulation, *changes):
+    """(ms, 電位)の順にピンを変える"""
+    for at_ms, level in changes:
+        simulation.board.schedule_drive(NUM_IN, level, at_ms * 1000)
+
+
+def _bounce(simulation, at_ms, level, count=3):
+    """at_msから2ms間チャタリングしてlevelに落ち着く"""
+    at_us = at_ms * 1000
+    for i in range(count):
+        simulation.board.schedule_drive(NUM_IN, level, at_us + i * 600)
+        simulation.board.schedule_drive(NUM_IN, 1 - level, at_us + i * 600 + 300)
+    simulation.board.schedule_drive(NUM_IN, level, at_us + 2000)
+
+
+def test_short_tap_reports_release_after_debounce(simulation):
+    from src.const import BUTTON_DEBOUNCE_MS
+
+    button = _button(simulation)
+    _drive(simulation, (1000, 1), (1005, 0))
+    simulation.clock.advance_to(2000000)
+    assert list(button.events()) == [(1, 1000), (0, 1000 + BUTTON_DEBOUNCE_MS)]
+
+
+def test_tap_then_press_reports_both(simulation):
+    from src.const import BUTTON_DEBOUNCE_MS
+
+    button = _button(simulation)
+    _drive(simulation, (1000, 1), (1005, 0), (1085, 1), (1135, 0))
+    simulation.clock.advance_to(2000000)
+    assert list(button.events()) == [
+        (1, 1000), (0, 1000 + BUTTON_DEBOUNCE_MS), (1, 1085), (0, 1135),
+    ]
+
+
+def test_events_call_does_not_swallow_press(simulation):
+    button = _button(simulation)
+    simulation.clock.advance_to(1000000)
+    assert list(button.events()) == []  # 消費側の呼び出しで無視する時間を始めない
+    _drive(simulation, (1005, 1), (1100, 0))
+    simulation.clock.advance_to(2000000)
+    assert list(button.events()) == [(1, 1005), (0, 1100)]
+
+
+def test_contact_bounce_reports_one_press(simulation):
+    button = _button(simulation)
+    _bounce(simulation, 1000, 1)
+    _bounce(simulation, 1200, 0)
+    simulation.clock.advance_to(2000000)
+    assert list(button.events()) == [(1, 1000), (0, 1200)]
+    assert button.is_push() == 0
+
+
+def test_back_to_back_presses(simulation):
+    button = _button(simulation)
+    for at_ms in range(1000, 1400, 100):
+        _bounce(simulation, at_ms, 1)
+        _bounce(simulation, at_ms + 50, 0)
+    simulation.clock.advance_to(2000000)
+    events = list(button.events())
+    assert [level for level, _ in events] == [1, 0] * 4
+    assert [t for _, t in events] == [
+        t for at_ms in range(1000, 1400, 100) for t in (at_ms, at_ms + 50)
+    ]
+    assert button.dropped == 0
+
+
+def test_wait_for_event_wakes_on_settled_edge(simulation):
+    import uasyncio
+    from src.const import BUTTON_DEBOUNCE_MS
+
+    button = _button(simulation)
+    _drive(simulation, (1000, 1), (1005, 0))
+
+    async def main():
+        return [await button.wait_for_event(timeout_ms=5000) for _ in range(3)]
+
+    assert uasyncio.run(main()) == [(1, 1000), (0, 1000 + BUTTON_DEBOUNCE_MS), None]
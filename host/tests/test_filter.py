@@ -0,0 +1,50 @@
+def _approach(simulation, front, start_cm: float, speed_cm_s: float, steps: int) -> float:
+    distance = start_cm
+    for _ in range(steps):
+        front.update(distance)
+        simulation.clock.advance(100000)
+        distance -= speed_cm_s / 10
+    return distance
+
+
+def test_fast_approach_then_outlier_does_not_go_negative(simulation):
+    from src.util.filter import DistanceFilter
+
+    front = DistanceFilter()
+    _approach(simulation, front, 100.0, 100.0, 8)
+    assert front.velocity < -90
+    simulation.clock.advance(700000)  # 予測は30cm - 100cm/s * 0.8s で負になる
+    estimate = front.update(380.0)  # 予測から大きく外れるので捨てられる
+    assert front.rejected == 1
+    assert estimate == 0.0
+    assert front.velocity == 0.0
+
+
+def test_accepted_measurement_is_clamped(simulation):
+    from src.util.filter import DistanceFilter
+
+    front = DistanceFilter()
+    _approach(simulation, front, 100.0, 100.0, 8)
+    simulation.clock.advance(300000)
+    assert 0.0 <= front.update(-3.0) <= front.max_distance
+
+
+def test_estimate_is_capped_at_max_distance(simulation):
+    from src.util.filter import DistanceFilter
+
+    front = DistanceFilter(max_distance=400)
+    _approach(simulation, front, 300.0, -100.0, 8)
+    simulation.clock.advance(1000000)
+    assert front.update(420.0) <= 400
+    assert front.update(1000.0) == 400
+
+
+def test_spike_is_rejected_once_then_accepted(simulation):
+    from src.util.filter import DistanceFilter
+
+    front = DistanceFilter()
+    assert front.update(120.0) == 120.0
+    simulation.clock.advance(100000)
+    assert abs(front.update(380.0) - 120.0) < 1
+    simulation.clock.advance(100000)
+    assert front.update(380.0) == 380.0  # 続けて外れたらやり直す
@@ -0,0 +1,41 @@
+import pytest
+
+
+def test_record_routes_values_to_channels(simulation):
+    from src.dataclasses import Distance
+    from src.device import AMeDASMeasurement
+    from src.util import history
+
+    assert history.record(AMeDASMeasurement(2150, round(1013.25 * 25600), 46080))
+    assert history.record(Distance(left=52.9, front=120.5, right=79.1))
+    assert history.record(25.17)
+    assert not history.record("text")
+    assert history.get_channel("temperature").latest() == 21.5
+    assert history.get_channel("pressure").latest() == pytest.approx(1013.3)
+    assert history.get_channel("humidity").latest() == 45.0
+    assert history.get_channel("distance_front").latest() == 120.5
+    assert history.get_channel("distance_right").latest() == 79.1
+    assert history.get_channel("chip_temperature").latest() == 25.17
+
+
+def test_aggregates_over_window(simulation):
+    from src.util import history
+
+    channel = history.get_channel("chip_temperature")
+    for value in (20.0, 25.0, 22.0, 21.0):
+        history.record(value)
+    assert channel.minimum() == 20.0
+    assert channel.maximum() == 25.0
+    assert channel.mean() == 22.0
+
+
+def test_minute_and_hour_averages(simulation):
+    from src.const import HISTORY_MINUTES
+    from src.util import history
+
+    channel = history.get_channel("distance_left")
+    for minute in range(62):  # 最後の1分はまだ締まっていない
+        channel.append(minute * 10, now_ms=minute * 60000)
+    assert channel.minutes.count == HISTORY_MINUTES
+    assert channel.hours.count == 1
+    assert channel.trend(30) == pytest.approx(30.0)
@@ -0,0 +1,45 @@
+import pytest
+
+
+def _run_for(coro, ms: int) -> None:
+    import uasyncio
+
+    with pytest.raises(uasyncio.TimeoutError):
+        uasyncio.run(uasyncio.wait_for_ms(coro, ms))
+
+
+def test_write_does_not_flush_on_line_threshold(simulation):
+    from src.const import LOG_FLUSH_CHECK_INTERVAL_MS
+    from src.util.logging import CustomLogging
+
+    logger = CustomLogging(console=False, buffer_lines=2)
+    for index in range(5):
+        logger.write(f"line {index}")
+    assert logger._store.size == 0  # write()の中では書き出さない
+    _run_for(logger.run(), LOG_FLUSH_CHECK_INTERVAL_MS + 100)
+    assert logger._length == 0
+    assert logger._store.size > 0
+
+
+def test_write_flushes_inline_only_when_buffer_is_full(simulation):
+    from src.util.logging import CustomLogging
+
+    logger = CustomLogging(console=False, buffer_bytes=512)
+    message = "x" * 100  # タイムスタンプを付けて約120バイト
+    for _ in range(3):
+        logger.write(message)
+    assert logger._store.size == 0
+    for _ in range(2):
+        logger.write(message)
+    assert 0 < logger._store.size <= 512
+
+
+def test_background_flush_runs_before_buffer_fills(simulation):
+    from src.const import LOG_FLUSH_CHECK_INTERVAL_MS
+    from src.util.logging import CustomLogging
+
+    logger = CustomLogging(console=False, buffer_bytes=1024)
+    for _ in range(10):
+        logger.write("y" * 40)  # 半分を超える
+    _run_for(logger.run(), LOG_FLUSH_CHECK_INTERVAL_MS + 100)
+    assert logger._length == 0
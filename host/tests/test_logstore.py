@@ -0,0 +1,65 @@
+import os
+
+
+def _store(segment_bytes=1024, total_bytes=4096):
+    from src.util.logstore import SegmentedLog
+
+    return SegmentedLog(segment_bytes=segment_bytes, total_bytes=total_bytes)
+
+
+def test_append_never_rotates(simulation):
+    store = _store()
+    for _ in range(30):
+        store.append(b"x" * 100)
+    assert store.rotations == 0
+    assert store.sequence == 0
+    assert store.full()
+
+
+def test_rotate_reuses_slots_and_bounds_total(simulation):
+    store = _store()
+    for _ in range(100):
+        if store.full(reserve=100):
+            store.rotate()
+        store.append(b"x" * 100)
+    paths = [path for _, _, path in store.segments()]
+    assert len(paths) == store.slots == 4
+    assert sum(os.path.getsize(path) for path in paths) <= 4096
+    assert [seq for seq, _, _ in store.segments()] == list(
+        range(store.sequence - 3, store.sequence + 1)
+    )
+
+
+def test_index_resumes_after_restart(simulation):
+    store = _store()
+    store.append(b"a" * 600)
+    store.rotate()
+    store.append(b"b" * 10)
+    resumed = _store()
+    assert resumed.sequence == 1
+    assert resumed.size == 10
+    assert resumed.segments() == store.segments()
+
+
+def test_changed_geometry_starts_over(simulation):
+    store = _store()
+    store.rotate()
+    assert _store(segment_bytes=2048).sequence == 0
+
+
+def test_logger_rotates_from_background_task(simulation):
+    import uasyncio
+    from src.const import LOG_FLUSH_CHECK_INTERVAL_MS
+    from src.util.logging import CustomLogging
+
+    logger = CustomLogging(console=False, buffer_bytes=512)
+    store = logger._store
+    store.append(b"z" * (store.segment_bytes - 100))
+    logger.write("hello")
+    assert store.rotations == 0
+    try:
+        uasyncio.run(uasyncio.wait_for_ms(logger.run(), LOG_FLUSH_CHECK_INTERVAL_MS + 100))
+    except uasyncio.TimeoutError:
+        pass
+    assert store.rotations == 1
+    assert store.size == 0
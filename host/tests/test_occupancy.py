@@ -0,0 +1,39 @@
+def test_hit_marks_cell_and_clears_cells_in_front(simulation):
+    from src.util.occupancy import OccupancyMap
+
+    occupancy = OccupancyMap()
+    occupancy.update(0, 35.0)
+    occupancy.update(0, 35.0)
+    assert occupancy.nearest(0, max_age_ms=1000) == 37.5
+
+
+def test_negative_distance_stays_in_its_row(simulation):
+    from src.util.occupancy import OccupancyMap
+
+    occupancy = OccupancyMap()
+    for angle in (-90, 0):
+        occupancy.update(angle, -12.0)
+        occupancy.update(angle, -12.0)
+    # 最も近いマスに障害物があるものとし、前の行（負のインデックスなら最後の行）には書かない
+    assert occupancy.nearest(-90, max_age_ms=1000) == 2.5
+    assert occupancy.nearest(0, max_age_ms=1000) == 2.5
+    last = occupancy.cells[(occupancy.rows - 1) * occupancy.columns:]
+    assert not any(last)
+    previous = occupancy.cells[(occupancy._row(0) - 1) * occupancy.columns:occupancy._row(0) * occupancy.columns]
+    assert not any(previous)
+
+
+def test_out_of_range_distance_is_a_free_ray(simulation):
+    from src.util.occupancy import OccupancyMap
+
+    occupancy = OccupancyMap()
+    max_range = occupancy.columns * occupancy.range_step_cm
+    occupancy.update(0, 50.0)
+    occupancy.update(0, 50.0)
+    for distance in (max_range, max_range + 120.0):
+        occupancy.update(0, distance)
+        occupancy.update(0, distance)
+    assert occupancy.nearest(0, max_age_ms=1000) == max_range
+    # 次の角度の行にはみ出さない
+    start = (occupancy._row(0) + 1) * occupancy.columns
+    assert not any(occupancy.cells[start:start + occupancy.columns])
@@ -0,0 +1,99 @@
+import pytest
+
+
+def _profile(enabled: bool):
+    import src.const
+
+    src.const.PROFILE_ENABLED = enabled  # src.util.profileを読み込む前に切り替える
+    from src.util import profile
+
+    return profile
+
+
+def test_bucket_bounds_contain_value(simulation):
+    profile = _profile(True)
+    for value in list(range(0, 300)) + [1000, 1499, 1500, 65535, 65536, 10 ** 6, 2 ** 24 + 7]:
+        low, high = profile._bounds(profile._bucket(value))
+        assert low <= value < high
+        assert high - low <= max(1, low // 4)  # 区間の幅は下限の1/4以下（誤差は約20%まで）
+
+
+def test_percentiles_of_known_durations(simulation):
+    profile = _profile(True)
+    histogram = profile.Histogram("test")
+    for _ in range(90):
+        histogram.add(1000)
+    for _ in range(10):
+        histogram.add(50000)
+    summary = histogram.summary()
+    assert summary["count"] == 100
+    assert summary["mean_us"] == (90 * 1000 + 10 * 50000) // 100
+    low, high = profile._bounds(profile._bucket(1000))
+    assert low <= summary["p50_us"] < high
+    low, high = profile._bounds(profile._bucket(50000))
+    assert low <= summary["p95_us"] <= 50000  # 最大値を超えない
+    assert summary["max_us"] == 50000
+
+
+def test_huge_and_negative_durations_are_clamped(simulation):
+    profile = _profile(True)
+    histogram = profile.Histogram("test", buckets=8)
+    histogram.add(-5)
+    histogram.add(10 ** 9)
+    assert histogram.counts[0] == 1
+    assert histogram.counts[7] == 1
+    assert histogram.max_us == 10 ** 9
+    assert histogram.percentile(1.0) <= histogram.max_us
+
+
+def test_decorators_record_virtual_time(simulation):
+    import uasyncio
+
+    profile = _profile(True)
+    clock = simulation.clock
+
+    @profile.profile("work")
+    def work():
+        clock.advance(2000)
+
+    @profile.profile_async("wait")
+    async def wait():
+        await uasyncio.sleep_ms(30)
+
+    for _ in range(3):
+        work()
+        with profile.span("span"):
+            clock.advance(100)
+    uasyncio.run(wait())
+    summaries = profile.summaries()
+    assert summaries["work"]["count"] == 3
+    assert summaries["work"]["max_us"] == pytest.approx(2000, abs=5)
+    assert summaries["span"]["max_us"] == pytest.approx(100, abs=5)
+    assert summaries["wait"]["max_us"] == pytest.approx(30000, abs=1000)
+
+
+def test_report_resets_histograms(simulation):
+    profile = _profile(True)
+    profile.get_histogram("a").add(100)
+    profile.get_histogram("b").add(200)
+    report = profile.report()
+    assert report.startswith("a: n=1") and "; b: n=1" in report
+    assert profile.summaries() == {}
+    assert profile.report() == ""
+    profile.get_histogram("a").add(100)
+    assert profile.report(reset=False) == profile.report()
+
+
+def test_disabled_profile_is_a_no_op(simulation):
+    profile = _profile(False)
+
+    def work():
+        return 42
+
+    assert profile.profile("work")(work) is work
+    assert profile.profile_async("work")(work) is work
+    with profile.span("span") as span:
+        pass
+    assert span is profile._NULL_SPAN
+    assert profile.summaries() == {}
+    assert profile.report() == ""
@@ -0,0 +1,84 @@
+from host import sim
+
+
+def _run(simulation, scheduler, seconds):
+    import uasyncio
+
+    simulation.clock.deadline_us = simulation.clock.now_us + int(seconds * 1000000)
+    try:
+        uasyncio.run(scheduler.run())
+    except sim.SimulationStop:
+        pass
+
+
+def test_record_run_keeps_period_without_drift(simulation):
+    from src.util.scheduler import Job
+
+    job = Job("job", 100, None, 0)
+    assert job.record_run(1000, 1003, 1010) == 1100
+    assert job.jitter_max_ms == 3
+    assert job.duration_max_ms == 7
+    assert job.overruns == 0
+
+
+def test_record_run_skips_missed_periods(simulation):
+    from src.util.scheduler import Job
+
+    job = Job("job", 100, None, 0)
+    # 250ms掛かったので、1100と1200の予定を飛ばして1300にする
+    assert job.record_run(1000, 1000, 1250) == 1300
+    assert job.overruns == 1
+    assert job.skipped == 2
+
+
+def test_record_run_wraps_ticks(simulation):
+    import utime
+    from src.util.scheduler import Job
+
+    job = Job("job", 100, None, 0)
+    start = utime.ticks_add(0, -50)  # ticks_msが一周する直前
+    assert job.record_run(start, start, start) == utime.ticks_add(0, 50)
+    assert job.jitter_max_ms == 0
+
+
+def test_zero_period_runs_back_to_back(simulation):
+    from src.util.scheduler import Job
+
+    job = Job("job", 0, None, 0)
+    assert job.record_run(1000, 1000, 1042) == 1042
+    assert job.overruns == 0
+
+
+def test_slow_job_does_not_delay_fast_job(simulation):
+    import uasyncio
+    from src.util.scheduler import Scheduler
+
+    async def slow_io():
+        await uasyncio.sleep_ms(250)
+
+    scheduler = Scheduler()
+    fast = scheduler.every(100, lambda: None, name="fast")
+    slow = scheduler.every(1000, slow_io, name="slow")
+    _run(simulation, scheduler, 10)
+    assert fast.runs == 100
+    assert fast.jitter_max_ms <= 1
+    assert slow.runs == 10
+    assert slow.overruns == 0
+
+
+def test_overrunning_job_keeps_its_phase(simulation):
+    from src.util.scheduler import Scheduler
+
+    clock = simulation.clock
+    scheduler = Scheduler()
+    started = []
+
+    def work():
+        started.append(clock.now_us // 1000)
+        clock.advance(150000)
+
+    job = scheduler.every(100, work, offset_ms=10)
+    _run(simulation, scheduler, 2)
+    # 150ms掛かるので毎回1周期を飛ばし、200msごとに実行する
+    assert job.overruns == job.skipped == job.runs == 10
+    assert [t - started[0] for t in started] == list(range(0, 2000, 200))
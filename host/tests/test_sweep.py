@@ -0,0 +1,94 @@
+def _step(planner, distances, clock=None):
+    """次の角度を測定したことにして、その角度を返す"""
+    angle = planner.next_angle()
+    planner.update(angle, distances.get(angle))
+    if clock is not None:
+        clock.advance(100000)
+    return angle
+
+
+def test_cruise_measures_front_only(simulation):
+    from src.util.sweep import SweepPlanner
+
+    planner = SweepPlanner()
+    planner.scanning = False
+    angles = [_step(planner, {0: 300}) for _ in range(10)]
+    assert angles == [0] * 10
+    assert planner.servo_moves == 1
+
+
+def test_close_front_scans_right_then_left(simulation):
+    from src.const import SWEEP_SIDE_ANGLE
+    from src.util.sweep import SweepPlanner
+
+    planner = SweepPlanner()
+    planner.scanning = False
+    distances = {0: 50, -SWEEP_SIDE_ANGLE: 100, SWEEP_SIDE_ANGLE: 120}
+    angles = [_step(planner, distances, simulation.clock) for _ in range(5)]
+    assert angles == [0, -SWEEP_SIDE_ANGLE, 0, SWEEP_SIDE_ANGLE, 0]
+    assert planner.sides_known()
+    assert round(planner.right) == 100
+    assert round(planner.left) == 120
+
+
+def test_far_front_returns_to_cruise_with_hysteresis(simulation):
+    from src.const import (
+        SWEEP_CRUISE_HYSTERESIS_CM,
+        SWEEP_SIDE_ANGLE,
+        SWEEP_SIDE_SCAN_DISTANCE_CM,
+    )
+    from src.util.sweep import SweepPlanner
+
+    planner = SweepPlanner()
+    inside = SWEEP_SIDE_SCAN_DISTANCE_CM + SWEEP_CRUISE_HYSTERESIS_CM - 1
+    distances = {0: inside, -SWEEP_SIDE_ANGLE: 100, SWEEP_SIDE_ANGLE: 100}
+    for _ in range(8):
+        _step(planner, distances, simulation.clock)
+    assert planner.scanning  # 左右を測定し始めた距離より遠くても、余裕の内側なら続ける
+    planner.filters[0].reset()
+    planner.update(0, inside + 1)
+    assert not planner.scanning
+
+
+def test_both_sides_close_widens_angle(simulation):
+    from src.const import SWEEP_SIDE_ANGLE, SWEEP_WIDE_ANGLE, SWEEP_WIDEN_DISTANCE_CM
+    from src.util.sweep import SweepPlanner
+
+    planner = SweepPlanner()
+    close = SWEEP_WIDEN_DISTANCE_CM - 5
+    distances = {
+        0: 20, -SWEEP_SIDE_ANGLE: close, SWEEP_SIDE_ANGLE: close,
+        -SWEEP_WIDE_ANGLE: 150, SWEEP_WIDE_ANGLE: 100,
+    }
+    angles = [_step(planner, distances, simulation.clock) for _ in range(8)]
+    assert angles[:4] == [0, -SWEEP_SIDE_ANGLE, 0, SWEEP_SIDE_ANGLE]
+    assert planner.current_side_angle == SWEEP_WIDE_ANGLE
+    assert -SWEEP_WIDE_ANGLE in angles[4:] and SWEEP_WIDE_ANGLE in angles[4:]
+    assert round(planner.right) == 150
+    assert round(planner.left) == 100
+
+
+def test_timeout_forgets_angle(simulation):
+    from src.util.sweep import SweepPlanner
+
+    planner = SweepPlanner()
+    planner.update(0, 120)
+    assert planner.front is not None
+    planner.update(0, None)
+    assert planner.front is None
+
+
+def test_stats_per_decision(simulation):
+    from src.util.sweep import SweepPlanner
+
+    planner = SweepPlanner()
+    assert planner.stats()["pings_per_decision"] == 0
+    for _ in range(4):
+        _step(planner, {0: 50, -60: 100, 60: 100})
+    planner.record_decision()
+    planner.record_decision()
+    stats = planner.stats()
+    assert stats["decisions"] == 2
+    assert stats["pings"] == 4
+    assert stats["pings_per_decision"] == 2
+    assert stats["servo_moves"] == 4
@@ -0,0 +1,38 @@
+import pytest
+
+
+def _records(path):
+    from host import telemetry
+
+    return list(telemetry.iter_records(path))
+
+
+@pytest.mark.parametrize("hpa", [300.0, 672.0, 1013.25, 1100.0, 1330.0])
+def test_pressure_round_trips_over_sensor_range(simulation, hpa):
+    import src.const
+    from src.device import AMeDASMeasurement
+    from src.util.telemetry import TelemetryWriter
+
+    telemetry = TelemetryWriter()
+    assert telemetry.write(AMeDASMeasurement(2150, round(hpa * 25600), 46080))
+    telemetry.flush()
+    [(name, _, _, _, values)] = _records(src.const.TELEMETRY_FILE_PATH)
+    assert name == "amedas"
+    assert values["pressure_hpa"] == pytest.approx(hpa, abs=0.05)
+    assert values["temperature_c"] == 21.5
+    assert values["humidity"] == 45.0
+
+
+def test_out_of_range_values_saturate(simulation):
+    import src.const
+    from src.dataclasses import Distance
+    from src.util.telemetry import TelemetryWriter
+
+    telemetry = TelemetryWriter()
+    telemetry.write(Distance(left=-5000.0, front=1.5, right=9000.0))  # ±3276.7cmを超える
+    telemetry.write(400.0)  # 327.67℃を超える
+    telemetry.flush()
+    (_, _, _, _, distance), (_, _, _, _, temperature) = _records(src.const.TELEMETRY_FILE_PATH)
+    assert distance == {"left_cm": -3276.8, "front_cm": 1.5, "right_cm": 3276.7}
+    assert temperature == {"temperature_c": 327.67}
+
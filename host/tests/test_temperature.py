@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+
+class Sequence:
+    """決まった順にADCの値を返す"""
+    def __init__(self, values) -> None:
+        self.values = list(values)
+
+    def read_u16(self) -> int:
+        return self.values.pop(0)
+
+
+def _sensor(simulation, values=None, **kwargs):
+    from src.device import TemperatureSensor
+
+    if values is not None:
+        simulation.board.adc[4] = Sequence(values)
+    return TemperatureSensor(num_in=4, **kwargs)
+
+
+def test_samples_must_exceed_twice_trim(simulation):
+    with pytest.raises(ValueError):
+        _sensor(simulation, samples=3, trim=2)
+    with pytest.raises(ValueError):
+        _sensor(simulation, samples=4, trim=2)
+    assert _sensor(simulation, [100, 200, 300], samples=3, trim=1).read_raw() == 200
+
+
+def test_trimmed_mean_drops_extremes(simulation):
+    values = [1000, 1002, 1004, 1006, 1008, 1010, 1012, 1014]
+    sensor = _sensor(simulation, values + [1016, 1018, 1020, 1022, 0, 1, 65535, 65534],
+                     samples=16, trim=2)
+    # 外れ値を2つずつ除いた12件の平均
+    assert sensor.read_raw() == round(sum(values + [1016, 1018, 1020, 1022]) / 12)
+
+
+def test_spikes_do_not_move_measurement(simulation, world):
+    world.adc_noise_lsb = 0
+    world.chip_c = 30.0
+    clean = _sensor(simulation).measure()
+    raw = _sensor(simulation).read_raw()
+    # 16回のうち2回、-30℃（ADCの値で約+1000）のスパイク
+    spiked = [raw] * 14 + [raw + 1000, raw + 1030]
+    assert clean == pytest.approx(30.0, abs=0.5)
+    assert _sensor(simulation, spiked).measure() == clean
+    assert _sensor(simulation, spiked, trim=0).measure() < clean - 3  # 除かなければずれる
+
+
+def test_calibration_is_saved_and_loaded(simulation, world):
+    import src.const
+
+    world.adc_noise_lsb = 0
+    sensor = _sensor(simulation)
+    world.chip_c = 10.0
+    sensor.add_calibration_point(12.0)  # 基準の温度計は2℃高い
+    assert sensor.calibration is None
+    world.chip_c = 35.0
+    sensor.add_calibration_point(37.0)
+    assert os.path.exists(src.const.TEMPERATURE_CALIBRATION_FILE_PATH)
+
+    world.chip_c = 20.0
+    assert _sensor(simulation).measure() == pytest.approx(22.0, abs=0.5)
+
+
+def test_close_calibration_points_are_rejected(simulation, world):
+    import src.const
+
+    world.adc_noise_lsb = 0
+    sensor = _sensor(simulation)
+    world.chip_c = 25.0
+    sensor.add_calibration_point(25.0)
+    world.chip_c = 26.0
+    with pytest.raises(ValueError):
+        sensor.add_calibration_point(26.0)
+    assert sensor.calibration is None
+    assert not os.path.exists(src.const.TEMPERATURE_CALIBRATION_FILE_PATH)
+
+
+def test_close_points_in_file_are_ignored(simulation):
+    import src.const
+
+    with open(src.const.TEMPERATURE_CALIBRATION_FILE_PATH, "w") as f:
+        f.write("14000,2500,14010,2530")
+    assert _sensor(simulation).calibration is None
@@ -0,0 +1,77 @@
+EPOCH_MS = 1700000000000
+
+
+def _first_sync():
+    from src.util import time
+
+    at_ms = time.monotonic_ms()
+    time.set_epoch_ms(EPOCH_MS, at_ms)
+    return time, at_ms
+
+
+def test_first_sync_sets_time_without_drift(simulation):
+    time, at_ms = _first_sync()
+    assert time.drift_ppm() == 0
+    assert time._epoch_ms(at_ms) == EPOCH_MS
+    assert time._epoch_ms(at_ms + 1234) == EPOCH_MS + 1234
+
+
+def test_second_sync_estimates_drift(simulation):
+    from src.const import TIME_DRIFT_MIN_INTERVAL_SEC
+
+    time, at_ms = _first_sync()
+    elapsed_ms = TIME_DRIFT_MIN_INTERVAL_SEC * 1000
+    # ticks_msが100ppm遅れている
+    error_ms = time.set_epoch_ms(
+        EPOCH_MS + elapsed_ms + elapsed_ms // 10000, at_ms + elapsed_ms
+    )
+    assert error_ms == elapsed_ms // 10000
+    assert time.drift_ppm() == 100
+    # 次の同期までは、経過時間に見積もったずれを足す
+    later_ms = at_ms + elapsed_ms + 1000000
+    assert time._epoch_ms(later_ms) == EPOCH_MS + elapsed_ms * 10001 // 10000 + 1000100
+
+
+def test_drift_refines_residual_error(simulation):
+    from src.const import TIME_DRIFT_MIN_INTERVAL_SEC
+
+    time, at_ms = _first_sync()
+    elapsed_ms = TIME_DRIFT_MIN_INTERVAL_SEC * 1000
+    epoch_ms = EPOCH_MS
+    for _ in range(3):  # 実際のずれは-50ppm（ticks_msが進んでいる）
+        at_ms += elapsed_ms
+        epoch_ms += elapsed_ms - elapsed_ms // 20000
+        time.set_epoch_ms(epoch_ms, at_ms)
+    assert time.drift_ppm() == -50
+    assert time.set_epoch_ms(
+        epoch_ms + elapsed_ms - elapsed_ms // 20000, at_ms + elapsed_ms
+    ) == 0
+
+
+def test_short_interval_does_not_estimate_drift(simulation):
+    from src.const import TIME_DRIFT_MIN_INTERVAL_SEC
+
+    time, at_ms = _first_sync()
+    elapsed_ms = TIME_DRIFT_MIN_INTERVAL_SEC * 1000 - 1
+    assert time.set_epoch_ms(EPOCH_MS + elapsed_ms + 50, at_ms + elapsed_ms) == 50
+    assert time.drift_ppm() == 0
+
+
+def test_implausible_drift_is_ignored(simulation):
+    from src.const import TIME_DRIFT_MAX_PPM, TIME_DRIFT_MIN_INTERVAL_SEC
+
+    time, at_ms = _first_sync()
+    elapsed_ms = TIME_DRIFT_MIN_INTERVAL_SEC * 1000
+    jump_ms = elapsed_ms * (TIME_DRIFT_MAX_PPM + 1) // 1000000 + 1
+    # 時刻は合わせるが、ずれの速さには使わない
+    assert time.set_epoch_ms(EPOCH_MS + elapsed_ms + jump_ms, at_ms + elapsed_ms) == jump_ms
+    assert time.drift_ppm() == 0
+    assert time._epoch_ms(at_ms + elapsed_ms) == EPOCH_MS + elapsed_ms + jump_ms
+
+
+def test_sync_invalidates_cached_now(simulation):
+    time, at_ms = _first_sync()
+    before = time.Time.now_string()
+    time.set_epoch_ms(EPOCH_MS + 3600 * 1000, time.monotonic_ms())
+    assert time.Time.now_string() != before
+    assert time.Time.now().hour == (time.Time.from_string(before).hour + 1) % 24
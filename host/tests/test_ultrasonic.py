@@ -0,0 +1,46 @@
+import pytest
+
+# シミュレーターのHC-SR04がつながっていないピン。エコーはテストで直接与える
+NUM_TRIGGER = 2
+NUM_ECHO = 3
+
+
+def _measure(simulation, edges):
+    """edges（[(トリガーからの時間[us], 電位), ...]）をエコーに与えて1回測定する"""
+    import uasyncio
+    from src.device import UltrasonicSensor
+
+    sensor = UltrasonicSensor(NUM_TRIGGER, NUM_ECHO, max_range_cm=100)
+    now_us = simulation.clock.now_us
+    for delay_us, level in edges:
+        simulation.board.schedule_drive(NUM_ECHO, level, now_us + delay_us)
+    return sensor, uasyncio.run(sensor._measure_once_async())
+
+
+def test_echo_width_is_converted_to_distance(simulation):
+    sensor, distance = _measure(simulation, [(600, 1), (1600, 0)])
+    assert distance == pytest.approx(1000 * sensor._cm_per_us, abs=0.5)
+
+
+def test_missed_rising_edge_is_a_timeout(simulation):
+    from src.errors import UltrasonicSensorTimeoutError
+
+    simulation.board.pin(NUM_ECHO).level = 1  # 立ち上がりの割り込みを取りこぼした
+    with pytest.raises(UltrasonicSensorTimeoutError):
+        _measure(simulation, [(800, 0)])
+
+
+def test_pulse_longer_than_timeout_is_a_timeout(simulation):
+    from src.device import UltrasonicSensor
+    from src.errors import UltrasonicSensorTimeoutError
+
+    timeout_us = UltrasonicSensor(NUM_TRIGGER, NUM_ECHO, max_range_cm=100).timeout_us
+    with pytest.raises(UltrasonicSensorTimeoutError):
+        _measure(simulation, [(50, 1), (50 + timeout_us + 100, 0)])
+
+
+def test_no_echo_is_a_timeout(simulation):
+    from src.errors import UltrasonicSensorTimeoutError
+
+    with pytest.raises(UltrasonicSensorTimeoutError):
+        _measure(simulation, [])
@@ -0,0 +1,88 @@
+import json
+import os
+
+from host.sim.http import WebhookStandIn
+
+
+class FailingOnce(WebhookStandIn):
+    """fail_at番目（1~）のリクエストにだけ500を返す"""
+    def __init__(self, clock, world, fail_at: int) -> None:
+        super().__init__(clock, world, latency_ms=10)
+        self.fail_at = fail_at
+
+    def handle(self, body: bytes) -> tuple:
+        if self.stats["requests"] + 1 == self.fail_at:
+            self.stats["requests"] += 1
+            self.stats["failures"] += 1
+            return 500, False
+        return super().handle(body)
+
+
+def _lines(server) -> list:
+    return [
+        line
+        for body in server.bodies
+        for line in json.loads(body)["text"].split("\n")
+    ]
+
+
+def _sender(world, simulation, server):
+    world.pico_w = True
+    simulation.set_wifi(True)
+    simulation.http_servers[("hooks.slack.com", 443)] = server
+    from src.util.webhook import WebhookSender
+
+    return WebhookSender()
+
+
+def test_partial_replay_resumes_after_last_batch(world, simulation):
+    import uasyncio
+    from src.const import (
+        WEBHOOK_BATCH_MAX_LINES,
+        WEBHOOK_SPOOL_OFFSET_PATH,
+        WEBHOOK_SPOOL_PATH,
+    )
+
+    server = FailingOnce(simulation.clock, world, fail_at=2)
+    sender = _sender(world, simulation, server)
+    messages = [f"message {i}" for i in range(WEBHOOK_BATCH_MAX_LINES * 2 + 10)]
+    sender._spill(messages)
+
+    assert not uasyncio.run(sender.send_pending())
+    assert _lines(server) == messages[:WEBHOOK_BATCH_MAX_LINES]
+    assert os.path.exists(WEBHOOK_SPOOL_OFFSET_PATH)
+
+    assert uasyncio.run(sender.send_pending())
+    assert _lines(server) == messages  # 送信済みのバッチは送り直さない
+    assert not os.path.exists(WEBHOOK_SPOOL_PATH)
+    assert not os.path.exists(WEBHOOK_SPOOL_OFFSET_PATH)
+
+
+def test_replay_resumes_across_restart(world, simulation):
+    import uasyncio
+    from src.const import WEBHOOK_BATCH_MAX_LINES
+    from src.util.webhook import WebhookSender
+
+    server = FailingOnce(simulation.clock, world, fail_at=2)
+    sender = _sender(world, simulation, server)
+    messages = [f"message {i}" for i in range(WEBHOOK_BATCH_MAX_LINES + 5)]
+    sender._spill(messages)
+    assert not uasyncio.run(sender.send_pending())
+
+    # 再起動した後も、記録した位置から送り直す
+    assert uasyncio.run(WebhookSender().send_pending())
+    assert _lines(server) == messages
+
+
+def test_spill_while_offline_then_replay_in_order(world, simulation):
+    import uasyncio
+
+    server = WebhookStandIn(simulation.clock, world, latency_ms=10)
+    sender = _sender(world, simulation, server)
+    simulation.set_wifi(False)
+    sender.put("first")
+    assert not uasyncio.run(sender.send_pending())
+    simulation.set_wifi(True)
+    sender.put("second")
+    assert uasyncio.run(sender.send_pending())
+    assert _lines(server) == ["first", "second"]
@@ -0,0 +1,93 @@
+from host import sim
+
+
+def _run(simulation, supervisor, seconds, events=()):
+    """supervisor.run()をseconds秒動かす（events: (秒, 関数)の順に実行する）"""
+    import uasyncio
+
+    clock = simulation.clock
+    for at_s, callback in events:
+        clock.schedule(int(at_s * 1000000), callback)
+    clock.deadline_us = int(seconds * 1000000)
+    try:
+        uasyncio.run(supervisor.run())
+    except sim.SimulationStop:
+        pass
+
+
+def _supervisor(simulation):
+    from src.util.wifi import WifiSupervisor
+
+    supervisor = WifiSupervisor()
+    changes = []
+    supervisor.on_change(lambda state: changes.append((simulation.clock.now_us // 1000, state)))
+    return supervisor, changes
+
+
+def test_backoff_doubles_up_to_max(simulation):
+    from src.const import WIFI_RETRY_BASE_MS, WIFI_RETRY_MAX_MS
+
+    supervisor, _ = _supervisor(simulation)
+    delays = []
+    for failures in range(12):
+        supervisor._failures = failures
+        delays.append(supervisor.backoff_ms())
+    assert delays[:4] == [0, WIFI_RETRY_BASE_MS, 2 * WIFI_RETRY_BASE_MS, 4 * WIFI_RETRY_BASE_MS]
+    assert delays[-1] == WIFI_RETRY_MAX_MS == 300000
+    assert all(b == min(2 * a, WIFI_RETRY_MAX_MS) for a, b in zip(delays[1:], delays[2:]))
+    supervisor._failures = 1000
+    assert supervisor.backoff_ms() == WIFI_RETRY_MAX_MS
+
+
+def test_retries_with_backoff_while_unavailable(simulation):
+    from src.const import WIFI_RETRY_BASE_MS, WIFI_STATE_CONNECTING, WIFI_STATE_DOWN
+
+    supervisor, changes = _supervisor(simulation)
+    _run(simulation, supervisor, 60)
+    assert {state for _, state in changes} == {WIFI_STATE_CONNECTING, WIFI_STATE_DOWN}
+    down = [t for t, state in changes if state == WIFI_STATE_DOWN]
+    connecting = [t for t, state in changes if state == WIFI_STATE_CONNECTING]
+    # 失敗してから次に接続し始めるまでの間隔が2秒、4秒、8秒…と倍になる
+    waits = [start - failed for failed, start in zip(down, connecting[1:])]
+    assert waits[:4] == [WIFI_RETRY_BASE_MS << i for i in range(4)]
+    assert supervisor.stats["failures"] == len(down)
+    assert not supervisor.connected
+
+
+def test_reconnects_after_dropped_link(simulation, world):
+    from src.const import (
+        WIFI_RETRY_BASE_MS,
+        WIFI_STATE_CONNECTING,
+        WIFI_STATE_DOWN,
+        WIFI_STATE_UP,
+    )
+
+    world.wifi_available = True
+    supervisor, changes = _supervisor(simulation)
+    _run(simulation, supervisor, 40, events=(
+        (10, lambda: simulation.set_wifi(False)),
+        (20, lambda: simulation.set_wifi(True)),
+    ))
+    states = [state for _, state in changes]
+    assert states[:2] == [WIFI_STATE_CONNECTING, WIFI_STATE_UP]
+    assert states[-1] == WIFI_STATE_UP
+    assert WIFI_STATE_DOWN in states
+    assert supervisor.stats["disconnects"] == 1
+    assert supervisor.stats["connects"] >= 1
+    # 切れている間に2回失敗し、2回目のバックオフ（4秒）が終わったらつながる
+    down = [t for t, state in changes if state == WIFI_STATE_DOWN]
+    up = [t for t, state in changes if state == WIFI_STATE_UP]
+    assert len(down) == 2
+    assert up[-1] == down[-1] + 2 * WIFI_RETRY_BASE_MS
+    assert supervisor.connected
+    assert supervisor.backoff_ms() == 0
+
+
+def test_listeners_see_each_change_once(simulation, world):
+    world.wifi_available = True
+    supervisor, changes = _supervisor(simulation)
+    seen = []
+    supervisor.on_change(seen.append)
+    _run(simulation, supervisor, 10)
+    assert seen == [state for _, state in changes]
+    assert len(seen) == 2  # CONNECTING→UP（つながっている間は呼び出さない）
@@ -1,19 +1,42 @@
+import _thread
+import uasyncio
 import utime
 
 from src import device
 from src.errors import UltrasonicSensorTimeoutError, TemperatureExtremeError
 from src.dataclasses import Distance
-from src.const import ALLOW_TEMPERATURE_MAX
+from src.const import (
+    ACQUISITION_ON_CORE1,
+    ACQUISITION_FLAG_TIMEOUT,
+    ALLOW_TEMPERATURE_MAX,
+    TELEMETRY_TAG_DISTANCE,
+    TELEMETRY_TAG_TEMPERATURE,
+    TEMPERATURE_CHECK_INTERVAL_SEC,
+    SCHEDULER_REPORT_INTERVAL_SEC,
+    ULTRASONIC_SENSOR_MEASURE_INTERVAL_SEC,
+    PROFILE_ENABLED,
+    PROFILE_REPORT_INTERVAL_SEC,
+)
 from src.util.judge import is_wifi_usable  # noqa: F401
 from src.util.logging import CustomLogging
+from src.util import history, profile
+from src.util.sweep import SweepPlanner
+from src.util.scheduler import Scheduler
+from src.util.acquisition import Acquisition, ReadingBuffer
 
 if is_wifi_usable():
-    import uasyncio
-    from src.util.wifi import prepare_wifi
+    from src.util.time import TimeSync
+    from src.util.wifi import WifiSupervisor
 
-    wlan = uasyncio.run(prepare_wifi())
+    # 接続を待たずに始め、つながるまで・切れたらつながり直すまでバックグラウンドで接続する
+    wifi = WifiSupervisor()
+    # つながったら・その後は定期的に、バックグラウンドでNTPで時刻を合わせる
+    timesync = TimeSync(link=wifi)
+else:
+    wifi = None
+    timesync = None
 
-logger = CustomLogging()
+logger = CustomLogging(link=wifi)
 
 temperature_sensor = device.TemperatureSensor(num_in=4)
 servo_motor = device.ServoMotor(num_pwm=1)
@@ -25,42 +48,218 @@ motor_driver = device.MotorDriver(
     num_b_in_2=16
 )
 
+# 巡航中は正面だけ、正面が近づいたら正面と左右を交互に測定する
+planner = SweepPlanner()
+# core1で測定する場合、plannerはcore1（角度・距離）とcore0（判断の記録・統計）の両方から使う
+planner_lock = _thread.allocate_lock()
+front_updated = uasyncio.Event()
+
+
+scheduler = Scheduler()
+
+
+def check_temperature():
+    """温度を確認し、上がりすぎたら停止する"""
+    temperature = temperature_sensor.measure()
+    # 気温の代わりに基板の温度で音速を補正する（気温より数℃高い）
+    sensor.set_temperature(temperature)
+    handle_temperature(temperature)
+
+
+def handle_temperature(temperature: float):
+    """温度を記録し、上がりすぎたら停止する"""
+    logger.write(temperature)
+    history.record(temperature)
+    if temperature > ALLOW_TEMPERATURE_MAX:  # 温度が上がりすぎたら停止
+        raise TemperatureExtremeError(
+            f"Temperature is too high: {temperature}℃"
+        )
+
+
+def report():
+    logger.write(scheduler.report())
+    if timesync is not None:
+        logger.write(f"ntp: {timesync.stats}")
+    with planner_lock:
+        stats = planner.stats()
+    logger.write(f"sweep: {stats}")
+    if ACQUISITION_ON_CORE1:
+        logger.write(f"core1: {acquisition.report()}")
 
-def run():
-    while True:
-        temperature = temperature_sensor.measure()
-        logger.write(temperature)
-        if temperature > ALLOW_TEMPERATURE_MAX:  # 温度が上がりすぎたら停止
-            raise TemperatureExtremeError(
-                f"Temperature is too high: {temperature}℃"
-            )
 
+if ACQUISITION_ON_CORE1:
+    # 温度と距離の測定はcore1で行い、core0は測定値を受け取って判断・記録する
+    readings = ReadingBuffer()
+    acquisition = Acquisition()
+    previous_angle = None
+else:
+    scheduler.every(TEMPERATURE_CHECK_INTERVAL_SEC * 1000, check_temperature)
+scheduler.every(
+    SCHEDULER_REPORT_INTERVAL_SEC * 1000,
+    report,
+    offset_ms=SCHEDULER_REPORT_INTERVAL_SEC * 1000,
+)
+
+
+def report_profile():
+    logger.write(f"profile: {profile.report()}")
+
+
+if PROFILE_ENABLED:
+    scheduler.every(
+        PROFILE_REPORT_INTERVAL_SEC * 1000,
+        report_profile,
+        offset_ms=PROFILE_REPORT_INTERVAL_SEC * 1000,
+    )
+
+
+async def sweep():
+    """SweepPlannerが決めた角度へサーボモーターを回し、距離を測定する
+
+    - エコーが返ってきたらすぐに次の角度へ回し始める
+    - 同じ角度を続けて測定する場合は、前のエコーが消えるまで間を空ける
+    """
+    previous = None
+    while True:
+        angle = planner.next_angle()
+        if angle == previous:
+            await uasyncio.sleep(ULTRASONIC_SENSOR_MEASURE_INTERVAL_SEC)
+        previous = angle
+        await servo_motor.set_angle_async(angle)
         try:
-            list_distance = []
-            for angle in [-60, 0, 60]:
-                servo_motor.set_angle(angle)
-                list_distance += [sensor.measure()]
-            distance = Distance(
-                left=list_distance[2],
-                front=list_distance[1],
-                right=list_distance[0]
-            )
-            logger.write(distance)
+            planner.update(angle, await sensor.measure_async(times=1))
         except UltrasonicSensorTimeoutError:
+            planner.update(angle, None)
             logger.write("UltrasonicSensorTimeoutError")
             motor_driver.stop()
-        else:  # 正常に終了した場合
-            if distance.front > 40:
-                motor_driver.forward()
-                continue
-            if distance.left < 20 and distance.right < 20:
-                motor_driver.backward()
-            if distance.left < distance.right:
-                motor_driver.right()
-            else:  # distance.left >= distance.right
-                motor_driver.left()
+        if angle == 0:
+            front_updated.set()
+
 
-        utime.sleep(1)
+async def drive():
+    """正面の距離が更新されるたびにモーターを制御する"""
+    while True:
+        await front_updated.wait()
+        front_updated.clear()
+        front = planner.front
+        if front is None:  # 未測定またはタイムアウト
+            continue
+        decide(front, planner.left, planner.right)
+
+
+@profile.profile("robot_car.decide")
+def decide(front: float, left: float, right: float):
+    """正面と左右の距離からモーターを制御する（左右が分からなければNone）"""
+    if front > 40:
+        with planner_lock:
+            planner.record_decision()
+        history.get_channel("distance_front").append(round(front * 10))
+        motor_driver.forward()
+        return
+    if left is None or right is None:  # 左右を測定し終わるまで止まって待つ
+        motor_driver.stop()
+        return
+    distance = Distance(left=left, front=front, right=right)
+    logger.write(distance)
+    history.record(distance)
+    with planner_lock:
+        planner.record_decision()
+    if distance.left < 20 and distance.right < 20:
+        motor_driver.backward()
+    if distance.left < distance.right:
+        motor_driver.right()
+    else:  # distance.left >= distance.right
+        motor_driver.left()
+
+
+def acquire_temperature():
+    """（core1）温度を測定して音速を補正し、core0に渡す"""
+    temperature = temperature_sensor.measure()
+    sensor.set_temperature(temperature)
+    readings.publish(TELEMETRY_TAG_TEMPERATURE, round(temperature * 100))
+
+
+def acquire_distance():
+    """（core1）SweepPlannerが決めた角度へ回して測定し、正面を測定したらcore0に渡す
+
+    - 距離は左・正面・右[mm]で渡し、分からない場合は-1とする
+    """
+    global previous_angle
+    with planner_lock:
+        angle = planner.next_angle()
+    if angle == previous_angle:
+        utime.sleep(ULTRASONIC_SENSOR_MEASURE_INTERVAL_SEC)
+    previous_angle = angle
+    servo_motor.set_angle(angle)
+    flags = 0
+    try:
+        distance = sensor.measure(times=1)
+    except UltrasonicSensorTimeoutError:
+        distance = None
+        flags = ACQUISITION_FLAG_TIMEOUT
+    # 測定の間はロックを持たず、core0の判断を待たせない
+    with planner_lock:
+        planner.update(angle, distance)
+        left, front, right = planner.left, planner.front, planner.right
+    if angle == 0 or flags:
+        readings.publish(
+            TELEMETRY_TAG_DISTANCE,
+            to_mm(left),
+            to_mm(front),
+            to_mm(right),
+            flags=flags,
+        )
+
+
+def to_mm(distance: float) -> int:
+    """距離[cm]をcore0に渡す整数[mm]に変換する（分からない場合は-1）"""
+    return -1 if distance is None else round(distance * 10)
+
+
+async def consume():
+    """（core0）core1から受け取った測定値を記録し、最新の距離でモーターを制御する"""
+    while True:
+        await readings.wait()
+        distances = None
+        while True:
+            reading = readings.read()
+            if reading is None:
+                break
+            tag, flags, value0, value1, value2, _ = reading
+            if tag == TELEMETRY_TAG_TEMPERATURE:
+                handle_temperature(value0 / 100)
+            elif flags & ACQUISITION_FLAG_TIMEOUT:
+                logger.write("UltrasonicSensorTimeoutError")
+                motor_driver.stop()
+                distances = None
+            else:
+                distances = (value0, value1, value2)
+        if distances is None:
+            continue
+        left, front, right = [None if d < 0 else d / 10 for d in distances]
+        if front is not None:
+            decide(front, left, right)
+
+
+if ACQUISITION_ON_CORE1:
+    acquisition.every(TEMPERATURE_CHECK_INTERVAL_SEC * 1000, acquire_temperature)
+    acquisition.every(0, acquire_distance)
+
+
+async def main():
+    if wifi is not None:
+        uasyncio.create_task(wifi.run())
+        uasyncio.create_task(timesync.run())
+    if ACQUISITION_ON_CORE1:
+        acquisition.start()
+        await uasyncio.gather(scheduler.run(), consume(), logger.run())
+        return
+    # 超音波センサーの測定はサーボモーターの回転に合わせて続けて行う
+    await uasyncio.gather(scheduler.run(), sweep(), drive(), logger.run())
+
+
+def run():
+    uasyncio.run(main())
 
 
 try:
@@ -69,4 +268,7 @@ except Exception as e:
     logger.write(str(e))
     raise e
 finally:
+    if ACQUISITION_ON_CORE1:
+        acquisition.stop()
     motor_driver.stop()
+    logger.flush()
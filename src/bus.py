@@ -0,0 +1,152 @@
+import _thread
+from machine import I2C, Pin
+import utime
+
+from src.errors import ConnectionError, I2CBusTimeoutError
+from src.const import I2C_FREQUENCY_HZ, I2C_LOCK_TIMEOUT_MS
+
+_buses = {}
+
+
+def get_bus(id: int, num_sda: int, num_scl: int) -> "I2CBus":
+    """(id, sda, scl)ごとに1つのI2CBusを返す
+
+    - 同じピンを使うデバイス同士で、I2Cの初期化とスキャンを共有する
+
+    Args:
+        id (int): I2Cの番号(0 or 1)
+        num_sda (int): SDAのGPIO番号
+        num_scl (int): SCLのGPIO番号
+
+    Returns:
+        I2CBus: I2Cバス
+    """
+    key = (id, num_sda, num_scl)
+    bus = _buses.get(key)
+    if bus is None:
+        bus = I2CBus(id, num_sda, num_scl)
+        _buses[key] = bus
+    return bus
+
+
+class I2CBus:
+    """複数のデバイスで共有するI2Cバス
+
+    - machine.I2Cと同じメソッドを持つので、ドライバにそのまま渡せる
+    - 1回の転送ごとにロックを取り、転送回数を数える
+    - withで囲むと、複数の転送を他のスレッドに割り込まれずに行える
+      （同じスレッドからは入れ子にできる）
+
+    Examples:
+        >>> bus = get_bus(0, num_sda=12, num_scl=13)
+        >>> bus.require(0x76)  # スキャン結果はキャッシュされる
+        >>> with bus:
+        >>>     bus.writeto_mem(0x76, 0xF4, b"\x25")
+        >>>     bus.readfrom_mem(0x76, 0xF7, 8)
+        >>> bus.transactions
+        2
+    """
+    def __init__(self, id: int, num_sda: int, num_scl: int) -> None:
+        self.i2c = I2C(
+            id=id, sda=Pin(num_sda), scl=Pin(num_scl), freq=I2C_FREQUENCY_HZ
+        )
+        self.transactions = 0
+        self.lock_timeouts = 0
+        self._devices = None
+        self._lock = _thread.allocate_lock()
+        self._owner = None
+        self._depth = 0
+
+    def acquire(self, timeout_ms: int = I2C_LOCK_TIMEOUT_MS) -> None:
+        """バスのロックを取る
+
+        - MicroPythonのロックはタイムアウトを指定できないので、取れるまで試す
+
+        Args:
+            timeout_ms (int): タイムアウト時間（単位：ms）
+
+        Raises:
+            I2CBusTimeoutError: 時間内にロックを取れなかった場合
+        """
+        me = _thread.get_ident()
+        if self._owner == me:
+            self._depth += 1
+            return
+        if not self._lock.acquire(0):
+            start = utime.ticks_ms()
+            while not self._lock.acquire(0):
+                if utime.ticks_diff(utime.ticks_ms(), start) >= timeout_ms:
+                    self.lock_timeouts += 1
+                    raise I2CBusTimeoutError("I2Cバスのロックを取れませんでした")
+        self._owner = me
+        self._depth = 1
+
+    def release(self) -> None:
+        """バスのロックを解放する"""
+        self._depth -= 1
+        if self._depth == 0:
+            self._owner = None
+            self._lock.release()
+
+    def __enter__(self) -> "I2CBus":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.release()
+
+    def scan(self, refresh: bool = False) -> list:
+        """接続されているデバイスのアドレスを返す
+
+        Args:
+            refresh (bool): キャッシュを使わずにスキャンし直すか
+
+        Returns:
+            list: アドレスのリスト
+        """
+        if self._devices is None or refresh:
+            with self:
+                self._devices = self.i2c.scan()
+        return self._devices
+
+    def require(self, address: int) -> None:
+        """デバイスが接続されているかを確認する
+
+        Args:
+            address (int): デバイスのアドレス
+
+        Raises:
+            ConnectionError: デバイスが見つからない場合
+        """
+        if address not in self.scan():
+            raise ConnectionError("i2cの接続が正しくありません")
+
+    def writeto(self, addr, buf, stop=True):
+        with self:
+            self.transactions += 1
+            return self.i2c.writeto(addr, buf, stop)
+
+    def readfrom(self, addr, nbytes, stop=True):
+        with self:
+            self.transactions += 1
+            return self.i2c.readfrom(addr, nbytes, stop)
+
+    def readfrom_into(self, addr, buf, stop=True):
+        with self:
+            self.transactions += 1
+            return self.i2c.readfrom_into(addr, buf, stop)
+
+    def writeto_mem(self, addr, memaddr, buf, *, addrsize=8):
+        with self:
+            self.transactions += 1
+            return self.i2c.writeto_mem(addr, memaddr, buf, addrsize=addrsize)
+
+    def readfrom_mem(self, addr, memaddr, nbytes, *, addrsize=8):
+        with self:
+            self.transactions += 1
+            return self.i2c.readfrom_mem(addr, memaddr, nbytes, addrsize=addrsize)
+
+    def readfrom_mem_into(self, addr, memaddr, buf, *, addrsize=8):
+        with self:
+            self.transactions += 1
+            return self.i2c.readfrom_mem_into(addr, memaddr, buf, addrsize=addrsize)
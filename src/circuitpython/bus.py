@@ -0,0 +1,113 @@
+import time
+
+import board
+import busio
+
+from src.errors import ConnectionError, I2CBusTimeoutError
+from src.const import I2C_LOCK_TIMEOUT_MS
+
+PIN_PREFIX = "GP"
+_buses = {}
+
+
+def get_bus(id: int, num_sda: int, num_scl: int) -> "I2CBus":
+    """(id, sda, scl)ごとに1つのI2CBusを返す
+
+    - busio.I2Cは番号を取らない（ピンから決まる）ので、idは区別にだけ使う
+    """
+    key = (id, num_sda, num_scl)
+    bus = _buses.get(key)
+    if bus is None:
+        bus = I2CBus(num_sda, num_scl)
+        _buses[key] = bus
+    return bus
+
+
+class I2CBus:
+    """複数のデバイスで共有するI2Cバス
+
+    - busio.I2Cと同じメソッドを持つので、ドライバにそのまま渡せる
+    - busio.I2Cは転送の前にtry_lock()が必要なので、転送ごとにロックを取る
+      （python_lcdのようにロックを取らないドライバもそのまま使える）
+    - try_lock()/unlock()は入れ子にできるので、adafruit_bus_deviceのように
+      自分でロックを取るドライバと一緒に使ってもロックが解けない
+    """
+    def __init__(self, num_sda: int, num_scl: int) -> None:
+        self.i2c = busio.I2C(
+            getattr(board, f"{PIN_PREFIX}{num_scl}"),
+            getattr(board, f"{PIN_PREFIX}{num_sda}"),
+        )
+        self.transactions = 0
+        self.lock_timeouts = 0
+        self._devices = None
+        self._depth = 0
+
+    def acquire(self, timeout_ms: int = I2C_LOCK_TIMEOUT_MS) -> None:
+        """バスのロックを取る
+
+        Raises:
+            I2CBusTimeoutError: 時間内にロックを取れなかった場合
+        """
+        if self._depth == 0:
+            deadline = time.monotonic_ns() + timeout_ms * 1000000
+            while not self.i2c.try_lock():
+                if time.monotonic_ns() >= deadline:
+                    self.lock_timeouts += 1
+                    raise I2CBusTimeoutError("I2Cバスのロックを取れませんでした")
+        self._depth += 1
+
+    def release(self) -> None:
+        """バスのロックを解放する"""
+        self._depth -= 1
+        if self._depth == 0:
+            self.i2c.unlock()
+
+    def try_lock(self) -> bool:
+        try:
+            self.acquire()
+        except I2CBusTimeoutError:
+            return False
+        return True
+
+    def unlock(self) -> None:
+        self.release()
+
+    def __enter__(self) -> "I2CBus":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.release()
+
+    def scan(self, refresh: bool = False) -> list:
+        """接続されているデバイスのアドレスを返す（結果はキャッシュする）"""
+        if self._devices is None or refresh:
+            with self:
+                self._devices = self.i2c.scan()
+        return self._devices
+
+    def require(self, address: int) -> None:
+        """デバイスが接続されているかを確認する
+
+        Raises:
+            ConnectionError: デバイスが見つからない場合
+        """
+        if address not in self.scan():
+            raise ConnectionError("i2cの接続が正しくありません")
+
+    def writeto(self, address, buffer, **kwargs):
+        with self:
+            self.transactions += 1
+            return self.i2c.writeto(address, buffer, **kwargs)
+
+    def readfrom_into(self, address, buffer, **kwargs):
+        with self:
+            self.transactions += 1
+            return self.i2c.readfrom_into(address, buffer, **kwargs)
+
+    def writeto_then_readfrom(self, address, buffer_out, buffer_in, **kwargs):
+        with self:
+            self.transactions += 1
+            return self.i2c.writeto_then_readfrom(
+                address, buffer_out, buffer_in, **kwargs
+            )
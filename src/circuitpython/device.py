@@ -1,10 +1,7 @@
 import board
-import busio
 import digitalio
 
-
-PIN_PREFIX = "GP"
-i2c = None
+from src.circuitpython.bus import PIN_PREFIX, get_bus
 
 
 class LED:
@@ -56,16 +53,9 @@ class AMeDAS:
         # needs: adafruit-circuitpython-bme280（インストールエラーが出るのでファイルをコピーする）
         from adafruit_bme280 import basic as adafruit_bme280
 
-        global i2c
-        if not i2c:
-            i2c = busio.I2C(
-                getattr(board, f"{PIN_PREFIX}{num_scl}"),
-                getattr(board, f"{PIN_PREFIX}{num_sda}"),
-            )
-            while not i2c.try_lock():
-                pass
-
-        self.bme = adafruit_bme280.Adafruit_BME280_I2C(i2c, address=0x76)
+        self.bus = get_bus(0, num_sda, num_scl)
+        self.bus.require(0x76)
+        self.bme = adafruit_bme280.Adafruit_BME280_I2C(self.bus, address=0x76)
 
     def measure(self) -> AMeDASMeasurement:
         return AMeDASMeasurement(self.bme)
@@ -80,17 +70,10 @@ class Display:
     def __init__(self, num_sda: int, num_scl: int) -> None:
         from circuitpython_i2c_lcd import I2cLcd
 
-        global i2c
         I2C_ADDR = 0x27
-        if not i2c:
-            i2c = busio.I2C(
-                getattr(board, f"{PIN_PREFIX}{num_scl}"),
-                getattr(board, f"{PIN_PREFIX}{num_sda}"),
-            )
-            while not i2c.try_lock():
-                pass
-
-        self.lcd = I2cLcd(i2c, I2C_ADDR, 2, 16)
+        self.bus = get_bus(0, num_sda, num_scl)
+        self.bus.require(I2C_ADDR)
+        self.lcd = I2cLcd(self.bus, I2C_ADDR, 2, 16)
         self.clear()
 
     def print(self, value) -> None:
@@ -1,9 +1,115 @@
-ERROR_FILE_PATH = "/log.txt"
+LOG_SEGMENT_PATH_FORMAT = "/log.{}.txt"  # {}はセグメントの番号（0~）
+LOG_SEGMENT_BYTES = 16384  # 1セグメントの最大バイト数（4KBブロックの倍数）
+LOG_TOTAL_BYTES = 131072  # ログ全体の上限（LOG_SEGMENT_BYTES * セグメント数）
+LOG_INDEX_FILE_PATH = "/log.idx"
+# 索引の先頭: マジック、バージョン、セグメント数、予約、セグメントの最大バイト数、現在の通し番号
+LOG_INDEX_HEADER_FORMAT = "<4sBBHII"
+LOG_INDEX_SLOT_FORMAT = "<II"  # セグメントごと: 通し番号（未使用は0xFFFFFFFF）、開始時のUNIX時刻
+LOG_INDEX_MAGIC = b"PLOG"
+LOG_INDEX_VERSION = 1
+LOG_BUFFER_BYTES = 2048  # ファイルに書き出す前にRAMに溜めておく最大バイト数
+LOG_BUFFER_LINES = 32  # この行数が溜まったらファイルに書き出す
+LOG_FLUSH_INTERVAL_MS = 30000  # 最後に書き出してからこの時間が経ったら書き出す
+LOG_FLUSH_CHECK_INTERVAL_MS = 1000  # 行数・経過時間のしきい値をバックグラウンドで確認する間隔
+TELEMETRY_FILE_PATH = "/telemetry.bin"
+TELEMETRY_BLOCK_RECORDS = 32  # この件数が溜まったらまとめて書き出す
+# ファイル先頭: マジック、バージョン、レコード長、予約
+TELEMETRY_HEADER_FORMAT = "<4sBBH"
+TELEMETRY_MAGIC = b"PTLM"
+TELEMETRY_VERSION = 1
+# レコード: 種別、フラグ、ticks_msの下位16bit、UNIX時刻[s]、値0、値1、値2、通し番号
+# 値0~2はint16（-32768~32767）。範囲外の値は上下限に丸めて記録する
+TELEMETRY_RECORD_FORMAT = "<BBHIhhhH"
+TELEMETRY_TAG_AMEDAS = 1  # 気温[0.01℃]、気圧[0.1hPa]（3276.7hPaまで）、湿度[0.01%]
+TELEMETRY_TAG_DISTANCE = 2  # 左・正面・右[mm]
+TELEMETRY_TAG_TEMPERATURE = 3  # 温度[0.01℃]
+
+# 測定値の履歴（src/util/history.py）。1チャンネルあたり6バイト/件
+HISTORY_SAMPLES = 120  # 測定ごとの値を保持する件数
+HISTORY_MINUTES = 60  # 1分ごとの平均を保持する件数（1時間分）
+HISTORY_HOURS = 24  # 1時間ごとの平均を保持する件数（1日分）
+HISTORY_EMA_SHIFT = 3  # EMAの係数（1/2^3 = 1/8）
+PRESSURE_DROP_ALERT_HPA = 1.0  # 1時間でこれ以上気圧が下がったら記録する
+
+WEBHOOK_SPOOL_PATH = "/webhook_spool.txt"
+WEBHOOK_SPOOL_MAX_BYTES = 16384  # Wi-Fiが使えない間に退避しておく最大バイト数
+WEBHOOK_SPOOL_OFFSET_PATH = "/webhook_spool.pos"  # 退避ファイルのうち送信済みのバイト数
+
+WEBHOOK_SEND_INTERVAL_SEC = 10  # この間隔でまとめて送信する
+WEBHOOK_QUEUE_MAX = 100  # RAMに溜めておく最大件数（超えた分はフラッシュに退避）
+WEBHOOK_BATCH_MAX_LINES = 50  # 1回のPOSTに含める最大行数
+WEBHOOK_TIMEOUT_MS = 5000
+WEBHOOK_RETRY_BASE_MS = 1000  # 失敗したら1秒、2秒、4秒…と間隔を空けて再送する
+WEBHOOK_RETRY_MAX_MS = 60000
+WEBHOOK_RETRY_MAX = 5  # 連続してこの回数失敗したらフラッシュに退避する
+
+WIFI_CONNECT_TIMEOUT_MS = 10000  # 1回の接続を待つ最大時間
+WIFI_POLL_INTERVAL_MS = 250  # 接続を待つ間に状態を確認する間隔
+WIFI_CHECK_INTERVAL_MS = 1000  # 接続した後に切断していないか確認する間隔
+WIFI_RETRY_BASE_MS = 2000  # 接続に失敗したら2秒、4秒、8秒…と間隔を空けて接続し直す
+WIFI_RETRY_MAX_MS = 300000
+WIFI_STATE_DOWN = 0
+WIFI_STATE_CONNECTING = 1
+WIFI_STATE_UP = 2
+
+# 時刻合わせ（src/util/time.py）
+TIME_UTC_OFFSET_SEC = 9 * 3600  # Time.now()の時差（日本標準時）。now_epoch_ms()はUTCのまま
+TIME_NTP_HOST = "ntp.nict.jp"
+TIME_NTP_TIMEOUT_MS = 1000  # NTPの応答を待つ最大時間
+TIME_NTP_POLL_MS = 5  # 応答を待つ間に受信を確認する間隔（時刻の誤差はこの程度になる）
+TIME_SYNC_INTERVAL_SEC = 3600  # 時刻を合わせ直す間隔
+TIME_SYNC_RETRY_SEC = 60  # 時刻合わせに失敗したら、この時間後にやり直す
+TIME_DRIFT_MIN_INTERVAL_SEC = 600  # 前回の時刻合わせからこれ以上経っていれば、ずれの速さを見積もる
+TIME_DRIFT_MAX_PPM = 500  # 見積もったずれの速さがこれを超えたら、測定の誤りとして使わない
 
 I2C_FREQUENCY_HZ = 400000
+I2C_LOCK_TIMEOUT_MS = 100  # 共有しているI2Cバスのロックを待つ最大時間
 PWM_FREQUENCY_HZ = 50
 
-SERVO_MOTOR_WAIT_TIME_SEC = 0.5
+SERVO_MOTOR_WAIT_TIME_SEC = 0.5  # 現在の角度が分からないときの待ち時間
+SERVO_MOTOR_MS_PER_60_DEGREE = 120  # SG90は4.8Vで0.1s/60度。3.3V駆動なので余裕を持たせる
+SERVO_MOTOR_SETTLE_MARGIN_MS = 20  # 目標角度に着いてから揺れが収まるまでの時間
 ULTRASONIC_SENSOR_MEASURE_INTERVAL_SEC = 0.1
-ULTRASONIC_SENSOR_MAX_TRY = 1000
+ULTRASONIC_SENSOR_MAX_RANGE_CM = 400  # これより遠い場合はタイムアウトとする（HC-SR04は最大4m）
+ULTRASONIC_SENSOR_BURST_US = 500  # TRIGから超音波の送信を終えてECHOが立ち上がるまでの時間
+ULTRASONIC_SENSOR_TIMEOUT_MARGIN_US = 200
+ULTRASONIC_SENSOR_DEFAULT_TEMPERATURE = 20  # 気温が分からないときに使う気温
+BUTTON_DEBOUNCE_MS = 20  # ボタンのチャタリングが収まるまでの時間
+MOTION_SENSOR_DEBOUNCE_MS = 100  # HC-SR501の出力が切り替わった直後のノイズを無視する時間
+INPUT_EVENT_BUFFER_SIZE = 16  # 割り込みで記録しておくエッジの最大件数（超えた分は捨てる）
+SWEEP_SIDE_ANGLE = 60  # 左右を測定する角度
+SWEEP_WIDE_ANGLE = 90  # 左右がどちらも近いときに広げる角度
+SWEEP_SIDE_SCAN_DISTANCE_CM = 80  # 正面がこれより近くなったら左右も測定する
+SWEEP_CRUISE_HYSTERESIS_CM = 10  # 正面だけの測定に戻るときの余裕
+SWEEP_WIDEN_DISTANCE_CM = 30  # 左右がどちらもこれより近いときは角度を広げる
+OCCUPANCY_ANGLE_STEP = 15  # 占有マップの角度の刻み[度]
+OCCUPANCY_RANGE_STEP_CM = 5  # 占有マップの距離の刻み
+OCCUPANCY_MAX_RANGE_CM = 200
+OCCUPANCY_HIT = 96  # 障害物を検知したマスに加える値
+OCCUPANCY_MISS = 48  # 障害物より手前のマスから引く値
+OCCUPANCY_THRESHOLD = 64  # これ以上のマスに障害物があるとみなす
+OCCUPANCY_HALF_LIFE_MS = 1000  # マスの値が半分になる時間
+OCCUPANCY_MAX_AGE_MS = 1000  # これより新しい測定が占有マップにあれば、測定し直さない
+DISTANCE_FILTER_PROCESS_NOISE = 500  # 加速度の大きさ[cm^2/s^3]
+DISTANCE_FILTER_VELOCITY_VARIANCE = 2500  # やり直したときの速さの分散[(cm/s)^2]（標準偏差50cm/s）
+DISTANCE_FILTER_MEASUREMENT_NOISE = 4  # 測定値の分散[cm^2]（標準偏差2cm）
+DISTANCE_FILTER_GATE_SIGMA = 3  # 予測から標準偏差のこの倍数以上離れた測定値はスパイクとみなす
+TEMPERATURE_SENSOR_SAMPLES = 16  # 1回の測定でADCを読む回数
+TEMPERATURE_SENSOR_TRIM = 2  # 平均する前に上下から除く件数
+TEMPERATURE_SENSOR_REFRESH_MS = 1000  # value()が測定し直す間隔
+TEMPERATURE_CALIBRATION_FILE_PATH = "/temperature_calibration.txt"
+TEMPERATURE_CALIBRATION_MIN_DELTA_C = 5  # 2つの校正点の基準の温度の最小の差
+TEMPERATURE_CALIBRATION_MIN_DELTA_RAW = 160  # 2つの校正点のADCの値の最小の差（約5℃、1℃あたり約34）
 ALLOW_TEMPERATURE_MAX = 40
+TEMPERATURE_CHECK_INTERVAL_SEC = 1
+AMEDAS_MEASURE_INTERVAL_SEC = 10
+SCHEDULER_REPORT_INTERVAL_SEC = 600  # 周期処理の遅れ・取りこぼしを記録する間隔
+# 測定を2つ目のコアで行う（src/util/acquisition.py）
+ACQUISITION_ON_CORE1 = False  # Trueにすると、センサーの測定をcore1のループで行う
+ACQUISITION_BUFFER_SIZE = 16  # core1からcore0に渡す測定値の最大件数（超えたら古い値を上書きする）
+ACQUISITION_STOP_TIMEOUT_MS = 1000  # core1のループが終わるのを待つ最大時間
+ACQUISITION_FLAG_TIMEOUT = 1  # 距離: 超音波センサーがタイムアウトした
+# 処理時間の計測（src/util/profile.py）
+PROFILE_ENABLED = False  # Trueにすると、主な処理の所要時間をヒストグラムに記録する
+PROFILE_BUCKETS = 96  # ヒストグラムの区間数（1オクターブを4区間に分け、約30秒まで）
+PROFILE_REPORT_INTERVAL_SEC = 600  # 所要時間のp50・p95・最大値を記録する間隔
@@ -1,4 +1,9 @@
+from src.const import TELEMETRY_TAG_DISTANCE
+
+
 class Distance:
+    TELEMETRY_TAG = TELEMETRY_TAG_DISTANCE
+
     def __init__(self, left: int, front: int, right: int) -> None:
         self.left = left
         self.front = front
@@ -6,3 +11,15 @@ class Distance:
 
     def __str__(self) -> str:
         return f"Distance(left: {self.left}, front: {self.front}, right: {self.right})"
+
+    def telemetry_values(self) -> tuple:
+        """バイナリ形式で記録する値（左・正面・右[mm]）"""
+        return (
+            round(self.left * 10), round(self.front * 10), round(self.right * 10)
+        )
+
+    def telemetry_values_into(self, values) -> None:
+        """telemetry_values()と同じ値をvalues（長さ3以上）に書き込む（タプルを作らない）"""
+        values[0] = round(self.left * 10)
+        values[1] = round(self.front * 10)
+        values[2] = round(self.right * 10)
@@ -1,31 +1,117 @@
-from machine import I2C, Pin, PWM, ADC
+from array import array
+from machine import Pin, PWM, ADC, Timer, time_pulse_us, disable_irq, enable_irq
+import micropython
+import uasyncio
 import utime
 
-from src.errors import ConnectionError, UltrasonicSensorTimeoutError
+from src.bus import get_bus
+from src.util.profile import profile, profile_async
+from src.errors import UltrasonicSensorTimeoutError
 from src.const import (
     SERVO_MOTOR_WAIT_TIME_SEC,
+    SERVO_MOTOR_MS_PER_60_DEGREE,
+    SERVO_MOTOR_SETTLE_MARGIN_MS,
     ULTRASONIC_SENSOR_MEASURE_INTERVAL_SEC,
-    I2C_FREQUENCY_HZ,
     PWM_FREQUENCY_HZ,
-    ULTRASONIC_SENSOR_MAX_TRY
+    ULTRASONIC_SENSOR_MAX_RANGE_CM,
+    ULTRASONIC_SENSOR_BURST_US,
+    ULTRASONIC_SENSOR_TIMEOUT_MARGIN_US,
+    ULTRASONIC_SENSOR_DEFAULT_TEMPERATURE,
+    BUTTON_DEBOUNCE_MS,
+    MOTION_SENSOR_DEBOUNCE_MS,
+    INPUT_EVENT_BUFFER_SIZE,
+    TELEMETRY_TAG_AMEDAS,
+    TEMPERATURE_SENSOR_SAMPLES,
+    TEMPERATURE_SENSOR_TRIM,
+    TEMPERATURE_SENSOR_REFRESH_MS,
+    TEMPERATURE_CALIBRATION_FILE_PATH,
+    TEMPERATURE_CALIBRATION_MIN_DELTA_C,
+    TEMPERATURE_CALIBRATION_MIN_DELTA_RAW,
 )
 
 
 class TemperatureSensor:
     """基板上の温度センサから温度情報を取得するクラス
 
+    - 1回の測定でsamples回連続してADCを読み、外れ値をtrim個ずつ除いて平均する
+      （スパイクノイズ1回で温度の異常と判定しないため）
+    - 計算は整数で行い、2点校正があれば適用する
+    - value()は最後の測定値を返し、refresh_msが経ったときだけ測定し直す
+
     References:
         https://github.com/raspberrypi/pico-micropython-examples/blob/35f9a54463fb2f2ca072b10048b200230d7ddfea/adc/temperature.py#L7
 
     Examples:
-        >>> temperature = device.Temperature(num_in=4)
+        >>> temperature = device.TemperatureSensor(num_in=4)
         >>> temperature.measure()
         25.0
-    """
-    conversion_factor = 3.3 / (65535)
+        >>> temperature.value()  # 前回の測定からrefresh_msが経つまではADCを読まない
+        25.0
 
-    def __init__(self, num_in: int) -> None:
+        >>> # 2点校正（温度計の値を基準にして、低温と高温で1回ずつ行う）
+        >>> temperature.add_calibration_point(10.0)
+        >>> temperature.add_calibration_point(35.0)  # 2点目で保存される
+    """
+    def __init__(
+        self,
+        num_in: int,
+        samples: int = TEMPERATURE_SENSOR_SAMPLES,
+        trim: int = TEMPERATURE_SENSOR_TRIM,
+        refresh_ms: int = TEMPERATURE_SENSOR_REFRESH_MS,
+        calibration_path: str = TEMPERATURE_CALIBRATION_FILE_PATH,
+    ) -> None:
+        if samples <= 2 * trim:
+            raise ValueError(f"samples({samples})はtrimの2倍({2 * trim})より多くしてください")
         self.adc = ADC(num_in)
+        self._samples = array("H", bytes(2 * samples))
+        self.trim = trim
+        self.refresh_ms = refresh_ms
+        self.calibration_path = calibration_path
+        self.calibration = self._load_calibration()  # (raw1, 温度1, raw2, 温度2)
+        self._points = []
+        self._cached = None
+        self._measured_at_ms = 0
+
+    def read_raw(self) -> int:
+        """ADCを連続して読み、外れ値を除いた平均を返す
+
+        Returns:
+            int: ADCの値(0~65535)
+        """
+        samples = self._samples
+        read_u16 = self.adc.read_u16
+        n = len(samples)
+        for i in range(n):
+            samples[i] = read_u16()
+        if self.trim:
+            for i in range(1, n):  # 件数が少ないので挿入ソートでその場で並べる
+                value = samples[i]
+                j = i - 1
+                while j >= 0 and samples[j] > value:
+                    samples[j + 1] = samples[j]
+                    j -= 1
+                samples[j + 1] = value
+        total = 0
+        for i in range(self.trim, n - self.trim):
+            total += samples[i]
+        count = n - 2 * self.trim
+        return (total + count // 2) // count
+
+    def measure_centi(self) -> int:
+        """温度を測定する
+
+        Returns:
+            int: 温度（単位：0.01℃）
+        """
+        raw = self.read_raw()
+        calibration = self.calibration
+        if calibration is not None:
+            raw1, centi1, raw2, centi2 = calibration
+            return centi1 + (raw - raw1) * (centi2 - centi1) // (raw2 - raw1)
+        # 27℃のときの電圧が0.706V、温度が1℃上がると電圧が0.001721V減少する
+        # （電圧は10μV単位で計算する）
+        volt = raw * 330000 // 65535
+        return 2700 - (volt - 70600) * 10000 // 17210
 
     def measure(self) -> float:
         """温度を測定する
@@ -33,10 +119,64 @@ class TemperatureSensor:
         Returns:
             float: 温度
         """
-        # 整数値から電圧に変換
-        reading = self.adc.read_u16() * self.conversion_factor
-        # 27℃のときの電圧が0.706V、温度が1℃上がると電圧が0.001721V減少する
-        return 27 - (reading - 0.706) / 0.001721
+        self._cached = self.measure_centi() / 100
+        self._measured_at_ms = utime.ticks_ms()
+        return self._cached
+
+    def value(self) -> float:
+        """最後に測定した温度を返す（refresh_msが経っていれば測定し直す）
+
+        Returns:
+            float: 温度
+        """
+        if (
+            self._cached is None
+            or utime.ticks_diff(utime.ticks_ms(), self._measured_at_ms)
+            >= self.refresh_ms
+        ):
+            return self.measure()
+        return self._cached
+
+    def add_calibration_point(self, actual_c: float) -> None:
+        """今の温度を基準の温度として校正点を追加する
+
+        - 2点揃ったら校正を適用し、ファイルに保存する
+        - 2点の基準の温度・ADCの値が近すぎる場合は、傾きが大きく狂うので受け付けない
+
+        Args:
+            actual_c (float): 温度計で測った温度（単位：℃）
+
+        Raises:
+            ValueError: 2点の温度またはADCの値が近すぎる場合（2点とも捨てる）
+        """
+        self._points.append((self.read_raw(), round(actual_c * 100)))
+        if len(self._points) < 2:
+            return
+        (raw1, centi1), (raw2, centi2) = self._points[-2:]
+        self._points = []
+        if not self._separated(raw1, centi1, raw2, centi2):
+            raise ValueError("校正点の温度が近すぎます")
+        self.calibration = (raw1, centi1, raw2, centi2)
+        with open(self.calibration_path, "w") as f:
+            f.write(",".join(str(v) for v in self.calibration))
+
+    def _load_calibration(self):
+        try:
+            with open(self.calibration_path) as f:
+                calibration = tuple(int(v) for v in f.read().split(","))
+        except (OSError, ValueError):
+            return None
+        if len(calibration) != 4 or not self._separated(*calibration):
+            return None
+        return calibration
+
+    @staticmethod
+    def _separated(raw1: int, centi1: int, raw2: int, centi2: int) -> bool:
+        """2つの校正点が、傾きを求められるだけ離れているか"""
+        return (
+            abs(raw2 - raw1) >= TEMPERATURE_CALIBRATION_MIN_DELTA_RAW
+            and abs(centi2 - centi1) >= TEMPERATURE_CALIBRATION_MIN_DELTA_C * 100
+        )
 
 
 class LED:
@@ -64,19 +204,177 @@ class LED:
         self.pin.value(0)
 
 
-class Button:
+class EdgeInput:
+    """デジタル入力の変化（エッジ）を割り込みで記録するクラス
+
+    - ButtonとMotionSensorの基底クラス
+    - 割り込みハンドラは、事前に確保したリングバッファに電位と時刻を書き込むだけにする
+      （ループの周期に関係なく、短いパルスも取りこぼさない）
+    - 最後に受け付けたエッジからdebounce_ms以内のエッジは無視する（チャタリング対策）
+    - 無視する時間が終わったらワンショットのタイマーでピンを読み直し、
+      その間に電位が変わっていれば、読み直した時刻のエッジとして記録する
+    - バッファがいっぱいのときは新しいエッジを捨てて、droppedに数える
+
+    Args:
+        num_in (int): 入力ピンの番号
+        debounce_ms (int): エッジを受け付けた後、次のエッジを無視する時間
+        capacity (int): リングバッファに記録しておくエッジの最大件数
+    """
+    def __init__(
+        self,
+        num_in: int,
+        debounce_ms: int,
+        capacity: int = INPUT_EVENT_BUFFER_SIZE,
+    ) -> None:
+        self.pin = Pin(num_in, Pin.IN, Pin.PULL_DOWN)
+        self.debounce_ms = debounce_ms
+        self.dropped = 0
+        # 割り込みハンドラで書き込むので事前に確保しておく
+        self._levels = bytearray(capacity)
+        self._times_ms = array("i", bytes(4 * capacity))
+        self._head = 0  # 次に書き込む位置（割り込みハンドラが進める）
+        self._tail = 0  # 次に読み出す位置（events()が進める）
+        self._level = self.pin.value()
+        self._changed_ms = utime.ticks_ms()
+        self._flag = uasyncio.ThreadSafeFlag()
+        # hard IRQではタイマーを設定できないので、micropython.scheduleで設定する。
+        # 割り込みハンドラでメモリを確保しないよう、bound methodも事前に作っておく
+        self._timer = Timer(-1)
+        self._arm_handler = self._arm_settle_timer
+        self._settle_handler = self._on_settle
+        self.pin.irq(
+            handler=self._on_edge,
+            trigger=Pin.IRQ_RISING | Pin.IRQ_FALLING,
+            hard=True,
+        )
+
+    def events(self):
+        """前回の呼び出しから記録されたエッジを古い順に返す
+
+        Returns:
+            iterator: (電位, ticks_ms)のタプル。電位は1が立ち上がり、0が立ち下がり
+        """
+        while True:
+            event = self._pop()
+            if event is None:
+                return
+            yield event
+
+    async def wait_for_event(self, timeout_ms: int = None):
+        """次のエッジを待って返す（待つ間は他のタスクを実行する）
+
+        Args:
+            timeout_ms (int): 待つ最大時間。Noneの場合は無期限に待つ
+
+        Returns:
+            tuple: (電位, ticks_ms)。タイムアウトした場合はNone
+        """
+        if timeout_ms is not None:
+            deadline = utime.ticks_add(utime.ticks_ms(), timeout_ms)
+        while True:
+            event = self._pop()
+            if event is not None:
+                return event
+            if timeout_ms is None:
+                await self._flag.wait()
+                continue
+            wait_ms = utime.ticks_diff(deadline, utime.ticks_ms())
+            if wait_ms <= 0:
+                return None
+            try:
+                await uasyncio.wait_for_ms(self._flag.wait(), wait_ms)
+            except uasyncio.TimeoutError:
+                pass
+
+    def _on_edge(self, pin) -> None:
+        """エッジを記録する割り込みハンドラ
+
+        - hard IRQで実行されるので、メモリを確保しない
+        """
+        now = utime.ticks_ms()
+        level = pin.value()
+        if level == self._level:
+            return
+        if utime.ticks_diff(now, self._changed_ms) < self.debounce_ms:
+            return  # 無視する時間が終わったら_on_settle()で読み直す
+        self._push(level, now)
+        try:
+            micropython.schedule(self._arm_handler, None)
+        except RuntimeError:  # キューがいっぱい（次のエッジで読み直す）
+            pass
+
+    def _arm_settle_timer(self, _) -> None:
+        """無視する時間が終わったときに_on_settle()を呼ぶタイマーを設定する"""
+        elapsed_ms = utime.ticks_diff(utime.ticks_ms(), self._changed_ms)
+        self._timer.init(
+            mode=Timer.ONE_SHOT,
+            period=max(self.debounce_ms - elapsed_ms, 0),
+            callback=self._settle_handler,
+        )
+
+    def _on_settle(self, _) -> None:
+        """無視している間に電位が変わっていたら、今の時刻のエッジとして補う"""
+        state = disable_irq()  # 割り込みハンドラと同時に書き込まないようにする
+        try:
+            now = utime.ticks_ms()
+            if utime.ticks_diff(now, self._changed_ms) < self.debounce_ms:
+                return  # その後に受け付けたエッジのタイマーに任せる
+            level = self.pin.value()
+            if level == self._level:
+                return
+            self._push(level, now)
+        finally:
+            enable_irq(state)
+        self._arm_settle_timer(None)  # 補ったエッジからも、同じ時間だけ無視する
+
+    def _push(self, level: int, now: int) -> None:
+        """エッジをリングバッファに書き込む（割り込みハンドラからも呼ばれる）"""
+        self._level = level
+        self._changed_ms = now
+        head = self._head
+        next_head = head + 1
+        if next_head == len(self._levels):
+            next_head = 0
+        if next_head == self._tail:
+            self.dropped += 1
+            return
+        self._levels[head] = level
+        self._times_ms[head] = now
+        self._head = next_head
+        self._flag.set()
+
+    def _pop(self):
+        """リングバッファから最も古いエッジを取り出す（なければNone）"""
+        tail = self._tail
+        if tail == self._head:
+            return None
+        event = (self._levels[tail], self._times_ms[tail])
+        tail += 1
+        if tail == len(self._levels):
+            tail = 0
+        self._tail = tail
+        return event
+
+
+class Button(EdgeInput):
     """ボタンを制御するクラス
 
+    - 押した・離したことを割り込みで記録する（短く押しても取りこぼさない）
+
     Examples:
         >>> button = device.Button(num_in=16)
         >>> button.is_push()
         True
+        >>> list(button.events())  # 押した(1)・離した(0)と、そのときのticks_ms
+        [(1, 10234), (0, 10391)]
+        >>> await button.wait_for_event()
+        (1, 12050)
 
     Hint:
         3V3(OUT) → ボタン → GPIO16の順に接続
     """
-    def __init__(self, num_in: int) -> None:
-        self.pin = Pin(num_in, Pin.IN, Pin.PULL_DOWN)
+    def __init__(self, num_in: int, debounce_ms: int = BUTTON_DEBOUNCE_MS) -> None:
+        super().__init__(num_in, debounce_ms)
 
     def is_push(self) -> bool:
         """ボタンが押されているかを返す
@@ -87,9 +385,11 @@ class Button:
         return self.pin.value()
 
 
-class MotionSensor:
+class MotionSensor(EdgeInput):
     """モーションセンサー(HC-SR501)を制御するクラス
 
+    - 検知し始めた・検知しなくなったことを割り込みで記録する
+
     References:
         https://www.mpja.com/download/31227sc.pdf
 
@@ -97,9 +397,13 @@ class MotionSensor:
         >>> motion_sensor = device.MotionSensor(num_in=17)
         >>> motion_sensor.is_detect()
         True
+        >>> await motion_sensor.wait_for_event(timeout_ms=60000)
+        (1, 53120)
     """
-    def __init__(self, num_in: int) -> None:
-        self.pin = Pin(num_in, Pin.IN, Pin.PULL_DOWN)
+    def __init__(
+        self, num_in: int, debounce_ms: int = MOTION_SENSOR_DEBOUNCE_MS
+    ) -> None:
+        super().__init__(num_in, debounce_ms)
 
     def is_detect(self) -> bool:
         """モーションを検知しているかを返す
@@ -111,12 +415,20 @@ class MotionSensor:
 
 
 class AMeDASMeasurement:
-    """気圧、温度、湿度を表すクラス"""
-    def __init__(self, values: list) -> None:
-        temperature, pressure, humidity = values
-        self.pressure = float(pressure[:-3])
-        self.temperature = float(temperature[:-1])
-        self.humidity = float(humidity[:-1])
+    """気圧、温度、湿度を表すクラス
+
+    - BME280の補正済みの整数値をそのまま保持し、表示・記録するときに変換する
+      （気温[0.01℃]、気圧[Pa/256]、湿度[%/1024]）
+    """
+    TELEMETRY_TAG = TELEMETRY_TAG_AMEDAS
+    __slots__ = ("raw_temperature", "raw_pressure", "raw_humidity")
+
+    def __init__(
+        self, raw_temperature: int, raw_pressure: int, raw_humidity: int
+    ) -> None:
+        self.raw_temperature = raw_temperature
+        self.raw_pressure = raw_pressure
+        self.raw_humidity = raw_humidity
 
     def __str__(self):
         return (
@@ -124,6 +436,35 @@ class AMeDASMeasurement:
             + f"{self.humidity:.02f}%"
         )
 
+    @property
+    def pressure(self) -> float:
+        """気圧（単位：hPa）"""
+        return self.raw_pressure / 25600
+
+    @property
+    def temperature(self) -> float:
+        """気温（単位：℃）"""
+        return self.raw_temperature / 100
+
+    @property
+    def humidity(self) -> float:
+        """湿度（単位：%）"""
+        return self.raw_humidity / 1024
+
+    def telemetry_values(self) -> tuple:
+        """バイナリ形式で記録する値（気温[0.01℃]、気圧[0.1hPa]、湿度[0.01%]）"""
+        return (
+            self.raw_temperature,
+            (self.raw_pressure + 1280) // 2560,
+            (self.raw_humidity * 100 + 512) >> 10,
+        )
+
+    def telemetry_values_into(self, values) -> None:
+        """telemetry_values()と同じ値をvalues（長さ3以上）に書き込む（タプルを作らない）"""
+        values[0] = self.raw_temperature
+        values[1] = (self.raw_pressure + 1280) // 2560
+        values[2] = (self.raw_humidity * 100 + 512) >> 10
+
 
 class AMeDAS:
     """温湿度・気圧センサ(BME280)で気圧、温度、湿度を測定するクラス
@@ -147,23 +488,105 @@ class AMeDAS:
         | CSB    |          |
         | SDO    | GND      |  # I2CかSPIかを決めるピン。GNDでI2C
     """
+    I2C_ADDR = 0x76
+    OVERSAMPLING = 1  # 気温・気圧・湿度のオーバーサンプリング設定（1は1回）
+    REG_CTRL_HUM = 0xF2
+    REG_CTRL_MEAS = 0xF4
+    REG_DATA = 0xF7
+    MODE_FORCED = 0x01
+
     def __init__(self, num_sda: int, num_scl: int) -> None:
         import bme280  # need: micropython-bme280
 
-        i2c = I2C(
-            id=0, sda=Pin(num_sda), scl=Pin(num_scl), freq=I2C_FREQUENCY_HZ
+        self.bus = get_bus(0, num_sda, num_scl)
+        self.bus.require(self.I2C_ADDR)
+        self.bme = bme280.BME280(
+            mode=self.OVERSAMPLING, address=self.I2C_ADDR, i2c=self.bus
         )
-        if not i2c.scan():
-            raise ConnectionError("i2cの接続が正しくありません")
-        self.bme = bme280.BME280(i2c=i2c)
+        # 測定の開始と読み出しを分けるため、ドライバの読み出しを置き換える
+        # （補正の計算だけをドライバに任せる）
+        self.bme.read_raw_data = self._read_raw_data
+        self._ctrl = bytearray(1)
+        self._data = bytearray(8)
+        # 補正済みの値（気温、気圧、湿度）を受け取るバッファ
+        self._raw = array("i", [0, 0, 0])
+        # データシートの最大測定時間: 1.25 + 2.3 * 回数 * 3 + 0.575 * 2 [ms]
+        times = 1 << (self.OVERSAMPLING - 1)
+        self.measure_time_ms = (1250 + 2300 * times * 3 + 575 * 2 + 999) // 1000
+
+    def start_measurement(self) -> int:
+        """forcedモードで1回だけ測定を開始する
+
+        - 測定が終わるとBME280は自動でsleepモードに戻る（測定の間は電流を消費しない）
 
-    def measure(self) -> AMeDASMeasurement:
+        Returns:
+            int: 測定が終わるまでの時間（単位：ms）
+        """
+        ctrl = self._ctrl
+        with self.bus:
+            ctrl[0] = self.OVERSAMPLING
+            self.bus.writeto_mem(self.I2C_ADDR, self.REG_CTRL_HUM, ctrl)
+            ctrl[0] = (
+                self.OVERSAMPLING << 5 | self.OVERSAMPLING << 2 | self.MODE_FORCED
+            )
+            self.bus.writeto_mem(self.I2C_ADDR, self.REG_CTRL_MEAS, ctrl)
+        return self.measure_time_ms
+
+    def read_measurement(self, result: AMeDASMeasurement = None) -> AMeDASMeasurement:
+        """最後に測定した値を読み出す
+
+        - 文字列を経由せず、補正済みの整数値を読み出す
+
+        Args:
+            result (AMeDASMeasurement): 結果を書き込むオブジェクト。
+                指定すると新しいオブジェクトを作らない
+
+        Returns:
+            AMeDASMeasurement: 気圧、温度、湿度を表すクラス
+        """
+        raw = self.bme.read_compensated_data(self._raw)
+        if result is None:
+            return AMeDASMeasurement(raw[0], raw[1], raw[2])
+        result.raw_temperature = raw[0]
+        result.raw_pressure = raw[1]
+        result.raw_humidity = raw[2]
+        return result
+
+    @profile("AMeDAS.measure")
+    def measure(self, result: AMeDASMeasurement = None) -> AMeDASMeasurement:
         """気圧、温度、湿度を測定する
 
+        Args:
+            result (AMeDASMeasurement): 結果を書き込むオブジェクト
+
         Returns:
             AMeDASMeasurement: 気圧、温度、湿度を表すクラス
         """
-        return AMeDASMeasurement(self.bme.values)
+        utime.sleep_ms(self.start_measurement())
+        return self.read_measurement(result)
+
+    @profile_async("AMeDAS.measure_async")
+    async def measure_async(
+        self, result: AMeDASMeasurement = None
+    ) -> AMeDASMeasurement:
+        """気圧、温度、湿度を測定する（測定を待つ間は他のタスクを実行する）
+
+        Args:
+            result (AMeDASMeasurement): 結果を書き込むオブジェクト
+
+        Returns:
+            AMeDASMeasurement: 気圧、温度、湿度を表すクラス
+        """
+        await uasyncio.sleep_ms(self.start_measurement())
+        return self.read_measurement(result)
+
+    def _read_raw_data(self, result) -> None:
+        """データレジスタを一括で読み出す（ドライバのread_raw_dataの代わり）"""
+        data = self._data
+        self.bus.readfrom_mem_into(self.I2C_ADDR, self.REG_DATA, data)
+        result[0] = ((data[3] << 16) | (data[4] << 8) | data[5]) >> 4
+        result[1] = ((data[0] << 16) | (data[1] << 8) | data[2]) >> 4
+        result[2] = (data[6] << 8) | data[7]
 
 
 class Display:
@@ -179,6 +602,9 @@ class Display:
     Examples:
         >>> display = device.Display(num_sda=12, num_scl=13)
         >>> display.print("Hello, world!")
+        >>> display.set_line(1, "22.01C")  # 2行目だけを書き換える
+        >>> display.set_cell(15, 0, "*")  # 1文字だけを書き換える
+        >>> display.show_channel(history.get_channel("pressure"))
 
     Hint:
         | LCD | Pico |
@@ -189,30 +615,131 @@ class Display:
         | SCL | GP13 |
     """
 
+    I2C_ADDR = 0x27
+    NUM_LINES = 2
+    NUM_COLUMNS = 16
+
     def __init__(self, num_sda: int, num_scl: int) -> None:
         from machine_i2c_lcd import I2cLcd
 
-        I2C_ADDR = 0x27
-        i2c = I2C(
-            id=0, sda=Pin(num_sda), scl=Pin(num_scl), freq=I2C_FREQUENCY_HZ
+        self.bus = get_bus(0, num_sda, num_scl)
+        self.bus.require(self.I2C_ADDR)
+        self.lcd = I2cLcd(
+            self.bus,
+            self.I2C_ADDR,
+            num_lines=self.NUM_LINES,
+            num_columns=self.NUM_COLUMNS,
         )
-        if not i2c.scan():
-            raise ConnectionError("i2cの接続が正しくありません")
-        self.lcd = I2cLcd(i2c, I2C_ADDR, num_lines=2, num_columns=16)
+        # LCDに表示されている内容（シャドウフレームバッファ）と、次に表示する内容
+        size = self.NUM_LINES * self.NUM_COLUMNS
+        self._frame = bytearray(size)
+        self._next = bytearray(size)
+        self._cursor = None  # LCDのカーソル位置（フレームの添字、不明ならNone）
         self.clear()
 
+    @profile("Display.print")
     def print(self, value) -> None:
         """LCDに文字列を表示する
 
+        - 前回の表示から変わった文字だけを書き換える
+        - 改行で次の行に移り、表示しきれない文字は切り捨てる
+
         Args:
             value (str): 表示する文字列
         """
-        self.clear()
-        self.lcd.putstr(str(value))
+        next_frame = self._next
+        for i in range(len(next_frame)):
+            next_frame[i] = 0x20
+        index = 0
+        for char in str(value):
+            if char == "\n":
+                index = (index // self.NUM_COLUMNS + 1) * self.NUM_COLUMNS
+            elif index < len(next_frame):
+                next_frame[index] = ord(char) & 0xFF
+                index += 1
+            if index >= len(next_frame):
+                break
+        self._render(0, len(next_frame))
+
+    def set_line(self, line: int, value) -> None:
+        """指定した行だけを書き換える（16文字に満たない部分は空白で埋める）
+
+        Args:
+            line (int): 行(0~1)
+            value (str): 表示する文字列
+        """
+        next_frame = self._next
+        value = str(value)
+        for x in range(self.NUM_COLUMNS):
+            next_frame[x] = ord(value[x]) & 0xFF if x < len(value) else 0x20
+        self._render(line * self.NUM_COLUMNS, self.NUM_COLUMNS)
+
+    def set_cell(self, x: int, y: int, char: str) -> None:
+        """指定した位置の1文字だけを書き換える
+
+        Args:
+            x (int): 列(0~15)
+            y (int): 行(0~1)
+            char (str): 表示する文字
+        """
+        self._next[0] = ord(char) & 0xFF
+        self._render(y * self.NUM_COLUMNS + x, 1)
+
+    def show_channel(self, channel) -> None:
+        """測定値の履歴を表示する
+
+        - 1行目: 名前と最新値
+        - 2行目: 最小値-最大値と、1時間の傾向（^: 上昇、v: 下降、-: 不明・変化なし）
+
+        Args:
+            channel (src.util.history.Channel): 測定値の履歴
+        """
+        if not channel.samples.count:
+            self.set_line(0, channel.name)
+            self.set_line(1, "-")
+            return
+        trend = channel.trend()
+        mark = "-" if not trend else ("^" if trend > 0 else "v")
+        self.set_line(0, f"{channel.name[:8]:<8}{channel.latest():>8.2f}")
+        self.set_line(1, f"{channel.minimum():.1f}-{channel.maximum():.1f} {mark}")
 
     def clear(self) -> None:
         """LCDに表示されている文字列を消去する"""
         self.lcd.clear()
+        for i in range(len(self._frame)):
+            self._frame[i] = 0x20
+        self._cursor = 0
+
+    def _render(self, offset: int, length: int) -> None:
+        """次に表示する内容の先頭length文字をフレームのoffsetから表示する
+
+        - 変わった文字だけをLCDに送る
+        - 変わった文字が続く場合はカーソルを移動しない（LCDが自動で進める）
+        - 変わっていない1文字を挟む場合は、カーソル移動の代わりに書き直す
+
+        Args:
+            offset (int): 書き込み先のフレームの添字
+            length (int): 文字数
+        """
+        frame = self._frame
+        next_frame = self._next
+        lcd = self.lcd
+        columns = self.NUM_COLUMNS
+        with self.bus:  # 1画面分の転送をまとめてロックする
+            for i in range(length):
+                index = offset + i
+                code = next_frame[i]
+                if frame[index] == code:
+                    continue
+                cursor = self._cursor
+                if cursor is not None and index == cursor + 1 and index % columns:
+                    lcd.hal_write_data(frame[cursor])  # 移動するより書き直す方が安い
+                elif cursor != index:
+                    lcd.move_to(index % columns, index // columns)
+                lcd.hal_write_data(code)
+                frame[index] = code
+                # 行末を越えるとLCDのアドレスは次の行の先頭にならない
+                self._cursor = index + 1 if (index + 1) % columns else None
 
 
 class ServoMotor:
@@ -227,6 +754,10 @@ class ServoMotor:
         >>>     servo_motor.set_angle(ang)
         >>>     time.sleep(1)
 
+        >>> servo_motor.move_to(60)  # 回転を待たずに戻る
+        >>> ...  # 回転中に別の処理を行う
+        >>> servo_motor.wait_until_settled()
+
     Hint:
         | SG90    | Pico     |
         | ------- | -------  |
@@ -237,6 +768,12 @@ class ServoMotor:
     def __init__(self, num_pwm: int) -> None:
         self.pwm = PWM(Pin(num_pwm))
         self.pwm.freq(PWM_FREQUENCY_HZ)
+        # -90~90度のデューティ値を事前に計算しておく
+        self._duty_table = array(
+            "H", [self._degree2servo_value(d) for d in range(-90, 91)]
+        )
+        self.angle = None  # 最後に指示した角度（起動直後は不明）
+        self._settled_at_ms = utime.ticks_ms()
 
     def _degree2servo_value(self, degree):
         """角度をサーボモーターの値に変換する
@@ -252,14 +789,85 @@ class ServoMotor:
         duty_ratio = duty_ms / (1000 / PWM_FREQUENCY_HZ)
         return int(duty_ratio * 65535)
 
+    def _settle_time_ms(self, degree: int) -> int:
+        """回転にかかる時間を計算する
+
+        Args:
+            degree (int): 目標の角度
+
+        Returns:
+            int: 回転が終わるまでの時間（単位：ms）
+        """
+        if self.angle is None:
+            return int(SERVO_MOTOR_WAIT_TIME_SEC * 1000)
+        delta = abs(degree - self.angle)
+        if delta == 0:
+            return 0
+        return delta * SERVO_MOTOR_MS_PER_60_DEGREE // 60 + SERVO_MOTOR_SETTLE_MARGIN_MS
+
+    def move_to(self, degree: int) -> int:
+        """サーボモーターの角度を設定する（回転を待たない）
+
+        Args:
+            degree (int): 角度(-90~90)
+
+        Returns:
+            int: 回転が終わるまでの時間（単位：ms）
+        """
+        degree = min(max(int(degree), -90), 90)
+        settle_ms = self._settle_time_ms(degree)
+        if settle_ms == 0:
+            return self.remaining_ms()
+        self.pwm.duty_u16(self._duty_table[degree + 90])
+        self.angle = degree
+        self._settled_at_ms = utime.ticks_add(utime.ticks_ms(), settle_ms)
+        return settle_ms
+
+    def remaining_ms(self) -> int:
+        """回転が終わるまでの残り時間を返す
+
+        Returns:
+            int: 残り時間（単位：ms）。回転が終わっていれば0
+        """
+        return max(0, utime.ticks_diff(self._settled_at_ms, utime.ticks_ms()))
+
+    def is_settled(self) -> bool:
+        """回転が終わっているかを返す"""
+        return self.remaining_ms() == 0
+
+    def wait_until_settled(self) -> None:
+        """回転が終わるまで待つ"""
+        remaining_ms = self.remaining_ms()
+        if remaining_ms:
+            utime.sleep_ms(remaining_ms)
+
+    async def wait_until_settled_async(self) -> None:
+        """回転が終わるまで待つ（待つ間は他のタスクを実行する）"""
+        remaining_ms = self.remaining_ms()
+        if remaining_ms:
+            await uasyncio.sleep_ms(remaining_ms)
+
+    @profile("ServoMotor.set_angle")
     def set_angle(self, degree: int) -> None:
-        """サーボモーターの角度を設定する
+        """サーボモーターの角度を設定し、回転が終わるまで待つ
+
+        - 角度が変わらない場合は待たない
+
+        Args:
+            degree (int): 角度(-90~90)
+        """
+        self.move_to(degree)
+        self.wait_until_settled()
+
+    @profile_async("ServoMotor.set_angle_async")
+    async def set_angle_async(self, degree: int) -> None:
+        """サーボモーターの角度を設定する（回転を待つ間は他のタスクを実行する）
 
         Args:
             degree (int): 角度(-90~90)
         """
-        self.pwm.duty_u16(self._degree2servo_value(degree))
-        utime.sleep(SERVO_MOTOR_WAIT_TIME_SEC)  # サーボモーターが回転するのを待つ
+        self.move_to(degree)
+        await self.wait_until_settled_async()
 
 
 class UltrasonicSensor:
@@ -268,10 +876,17 @@ class UltrasonicSensor:
     References:
         https://akizukidenshi.com/download/ds/rainbow_e-technology/hc-sr04_v20.pdf
 
+    - 音速は気温から計算する（331.3 + 0.606 × 気温[m/s]）
+    - エコーを待つ時間は最大距離の往復時間から決める（1mなら約6ms）
+
     Examples:
         >>> sensor = device.UltrasonicSensor(num_trigger=14, num_echo=15)
         >>> sensor.measure()
         0.0
+        >>> sensor.set_temperature(amedas.measure().temperature)
+        >>> sensor = device.UltrasonicSensor(14, 15, max_range_cm=100)
+        >>> sensor.timeout_us
+        6023
 
     Hint:
         | HC-SR04 | Pico     |
@@ -283,55 +898,156 @@ class UltrasonicSensor:
         ECHO -> 1kΩ -> 2kΩ -> GND
                     └> GP15
     """
-    def __init__(self, num_trigger: int, num_echo: int) -> None:
+    def __init__(
+        self,
+        num_trigger: int,
+        num_echo: int,
+        max_range_cm: float = ULTRASONIC_SENSOR_MAX_RANGE_CM,
+    ) -> None:
         self.trigger = Pin(num_trigger, Pin.OUT)
         self.echo = Pin(num_echo, Pin.IN)
+        self.max_range_cm = max_range_cm
+        self.set_temperature(ULTRASONIC_SENSOR_DEFAULT_TEMPERATURE)
+        # 割り込みハンドラで書き込むので事前に確保しておく（立ち上がり、立ち下がり）
+        self._edges_us = array("i", [0, 0])
+        self._echo_flag = uasyncio.ThreadSafeFlag()
+        self.echo.irq(
+            handler=self._on_echo,
+            trigger=Pin.IRQ_RISING | Pin.IRQ_FALLING,
+            hard=True,
+        )
 
-    def measure(self) -> float:
+    def set_temperature(self, celsius: float) -> None:
+        """気温を設定し、音速とエコーを待つ時間を計算し直す
+
+        Args:
+            celsius (float): 気温（TemperatureSensorやAMeDASの値）
+        """
+        self.temperature = celsius
+        speed_cm_per_us = (331.3 + 0.606 * celsius) / 10000
+        self._cm_per_us = speed_cm_per_us / 2  # 往復するので半分
+        self.timeout_us = (
+            int(self.max_range_cm / self._cm_per_us)
+            + ULTRASONIC_SENSOR_TIMEOUT_MARGIN_US
+        )
+        self._timeout_ms = (
+            self.timeout_us + ULTRASONIC_SENSOR_BURST_US + 999
+        ) // 1000
+
+    @profile("UltrasonicSensor.measure")
+    def measure(self, times: int = 3) -> float:
         """距離を測定する
 
-        - 3回の測定のうち、中央値を返す
+        - times回の測定のうち、中央値を返す
+
+        Args:
+            times (int): 測定回数。1回の場合は待ち時間なしで返す
 
         Returns:
             float: 距離（単位：cm）
         """
+        if times == 1:
+            return self._measure_once()
         distances = []
-        for _ in range(3):
+        for _ in range(times):
             distances.append(self._measure_once())
             utime.sleep(ULTRASONIC_SENSOR_MEASURE_INTERVAL_SEC)
         distances = sorted(distances)
-        return distances[1]
+        return distances[times // 2]
+
+    @profile_async("UltrasonicSensor.measure_async")
+    async def measure_async(self, times: int = 3) -> float:
+        """距離を測定する（エコーを待つ間は他のタスクを実行する）
+
+        - times回の測定のうち、中央値を返す
+
+        Args:
+            times (int): 測定回数。1回の場合は待ち時間なしで返す
+
+        Returns:
+            float: 距離（単位：cm）
+        """
+        if times == 1:
+            return await self._measure_once_async()
+        distances = []
+        for _ in range(times):
+            distances.append(await self._measure_once_async())
+            await uasyncio.sleep(ULTRASONIC_SENSOR_MEASURE_INTERVAL_SEC)
+        distances = sorted(distances)
+        return distances[times // 2]
 
     def _measure_once(self) -> float:
         """一回距離を測定する
 
+        - エコーのパルス幅はtime_pulse_usで計測する
+
         Returns:
             float: 距離（単位：cm）
         """
+        self._trigger()
+        timepassed_us = time_pulse_us(self.echo, 1, self.timeout_us)
+        if timepassed_us < 0:  # -2: 立ち上がりがない、-1: 立ち下がりがない
+            raise UltrasonicSensorTimeoutError("センサーの値を読み取れませんでした")
+        return self._to_distance(timepassed_us)
+
+    async def _measure_once_async(self) -> float:
+        """一回距離を測定する（エコーの立ち下がりを割り込みで待つ）
+
+        - 今回のトリガーより後の立ち上がりを記録できなかった場合や、パルス幅が
+          0以下・timeout_usより長い場合（前回のエコーの立ち下がりなど）は、
+          time_pulse_usと同じくタイムアウトとする
+
+        Returns:
+            float: 距離（単位：cm）
+        """
+        self._echo_flag.clear()
+        self._edges_us[0] = self._edges_us[1] = 0
+        triggered_us = utime.ticks_us()
+        self._trigger()
+        try:
+            await uasyncio.wait_for_ms(self._echo_flag.wait(), self._timeout_ms)
+        except uasyncio.TimeoutError:
+            raise UltrasonicSensorTimeoutError("センサーの値を読み取れませんでした")
+        rising_us = self._edges_us[0]
+        width_us = utime.ticks_diff(self._edges_us[1], rising_us)
+        if (
+            rising_us == 0
+            or utime.ticks_diff(rising_us, triggered_us) < 0
+            or not 0 < width_us <= self.timeout_us
+        ):
+            raise UltrasonicSensorTimeoutError("センサーの値を読み取れませんでした")
+        return self._to_distance(width_us)
+
+    def _trigger(self) -> None:
+        """TRIGに10μsのパルスを送り、測定を開始する"""
         self.trigger.low()
         utime.sleep_us(2)
         self.trigger.high()
-        utime.sleep(0.00001)
+        utime.sleep_us(10)
         self.trigger.low()
 
-        for i in range(ULTRASONIC_SENSOR_MAX_TRY):
-            if self.echo.value() != 0:
-                signaloff = utime.ticks_us()
-                break
-            utime.sleep_us(1)
-        else:  # breakしなかった場合
-            raise UltrasonicSensorTimeoutError("センサーの値を読み取れませんでした")
-        for i in range(ULTRASONIC_SENSOR_MAX_TRY):
-            if self.echo.value() != 1:
-                signalon = utime.ticks_us()
-                break
-            utime.sleep_us(1)
-        else:  # breakしなかった場合
-            raise UltrasonicSensorTimeoutError("センサーの値を読み取れませんでした")
+    def _on_echo(self, pin) -> None:
+        """エコーの立ち上がり・立ち下がりの時刻を記録する割り込みハンドラ
+
+        - hard IRQで実行されるので、メモリを確保しない
+        """
+        now = utime.ticks_us()
+        if pin.value():
+            self._edges_us[0] = now
+        else:
+            self._edges_us[1] = now
+            self._echo_flag.set()
+
+    def _to_distance(self, timepassed_us: int) -> float:
+        """エコーのパルス幅を距離に変換する
 
-        timepassed_s = (signalon - signaloff) / 1000 / 1000  # μs -> s
-        distance_m = (timepassed_s * 342.62) / 2  # 20℃
-        return distance_m * 100  # m -> cm
+        Args:
+            timepassed_us (int): パルス幅（単位：μs）
+
+        Returns:
+            float: 距離（単位：cm）
+        """
+        return timepassed_us * self._cm_per_us
 
 
 class IndividualMotorDriver:
@@ -12,3 +12,11 @@ class UltrasonicSensorTimeoutError(Exception):
 
 class TemperatureExtremeError(Exception):
     pass
+
+
+class WebhookError(Exception):
+    pass
+
+
+class I2CBusTimeoutError(Exception):
+    pass
@@ -0,0 +1,198 @@
+import _thread
+from array import array
+
+import uasyncio
+import utime
+
+from src.const import ACQUISITION_BUFFER_SIZE, ACQUISITION_STOP_TIMEOUT_MS
+from src.util.scheduler import Job
+
+
+class ReadingBuffer:
+    """別のコアで測定した値を受け渡すリングバッファ
+
+    - 1件は種別(TELEMETRY_TAG_*)、フラグ、整数の値3つ、ticks_msで、
+      事前に確保した配列に書き込む
+    - 書き込みと読み出しはロックで守る（書きかけの値を読まない）。
+      ロックを持つのは配列を読み書きする間だけにする
+    - いっぱいになったら最も古い値を上書きし、overwrittenに数える（新しい値を優先する）
+    - 書き込むとThreadSafeFlagで読み出す側のタスクを起こす
+
+    Examples:
+        >>> buffer = ReadingBuffer()
+        >>> buffer.publish(TELEMETRY_TAG_TEMPERATURE, 2512)  # core1
+        >>> await buffer.wait()  # core0
+        >>> buffer.read()  # (種別, フラグ, 値0, 値1, 値2, ticks_ms)
+        (3, 0, 2512, 0, 0, 10234)
+        >>> buffer.read()  # 読み出していない値がない
+        None
+    """
+    def __init__(self, capacity: int = ACQUISITION_BUFFER_SIZE) -> None:
+        self._tags = bytearray(capacity)
+        self._flags = bytearray(capacity)
+        self._values = array("i", bytes(3 * 4 * capacity))
+        self._times_ms = array("i", bytes(4 * capacity))
+        self._head = 0  # 次に書き込む位置
+        self._count = 0  # 読み出していない件数
+        self._lock = _thread.allocate_lock()
+        self._updated = uasyncio.ThreadSafeFlag()
+        self.published = 0
+        self.overwritten = 0
+
+    def publish(
+        self, tag: int, value0: int = 0, value1: int = 0, value2: int = 0, flags: int = 0
+    ) -> None:
+        """測定値を書き込む
+
+        Args:
+            tag (int): 測定値の種類（TELEMETRY_TAG_*）
+            value0 (int): 値（整数。単位は種類ごとにtelemetry_values()と同じ）
+            value1 (int): 値
+            value2 (int): 値
+            flags (int): 種類ごとのフラグ（ACQUISITION_FLAG_*）
+        """
+        now = utime.ticks_ms()
+        with self._lock:
+            head = self._head
+            self._tags[head] = tag
+            self._flags[head] = flags
+            self._values[3 * head] = value0
+            self._values[3 * head + 1] = value1
+            self._values[3 * head + 2] = value2
+            self._times_ms[head] = now
+            head += 1
+            self._head = 0 if head == len(self._tags) else head
+            if self._count == len(self._tags):
+                self.overwritten += 1
+            else:
+                self._count += 1
+            self.published += 1
+        self._updated.set()
+
+    def read(self):
+        """最も古い測定値を取り出す
+
+        Returns:
+            tuple: (種別, フラグ, 値0, 値1, 値2, ticks_ms)。なければNone
+        """
+        with self._lock:
+            if not self._count:
+                return None
+            index = self._head - self._count
+            if index < 0:
+                index += len(self._tags)
+            self._count -= 1
+            return (
+                self._tags[index],
+                self._flags[index],
+                self._values[3 * index],
+                self._values[3 * index + 1],
+                self._values[3 * index + 2],
+                self._times_ms[index],
+            )
+
+    async def wait(self) -> None:
+        """読み出していない測定値ができるまで待つ"""
+        while not self._count:
+            await self._updated.wait()
+
+
+class Acquisition:
+    """測定を2つ目のコア(core1)で続けるクラス
+
+    - every()で登録した関数を、core1のループで周期ごとに呼び出す
+      （周期0の関数は毎回呼び出す）。統計はSchedulerと同じJobに記録する
+    - 関数はReadingBuffer.publish()で測定値を渡す。測定に使うデバイスはcore1だけが使い、
+      core0は測定の完了を待たずに判断・モーターの制御・記録を続ける
+    - 関数で起きた例外はerrorsに数え、last_errorに残してループを続ける
+
+    Examples:
+        >>> buffer = ReadingBuffer()
+        >>> acquisition = Acquisition()
+        >>> acquisition.every(1000, lambda: buffer.publish(
+        >>>     TELEMETRY_TAG_TEMPERATURE, temperature_sensor.measure_centi()))
+        >>> acquisition.start()
+        >>> acquisition.stop()  # ループが終わるまで待つ
+        True
+    """
+    def __init__(self) -> None:
+        self.jobs = []
+        self.running = False
+        self.errors = 0
+        self.last_error = None
+        self._active = False
+
+    def every(
+        self, period_ms: int, callback, name: str = None, offset_ms: int = 0
+    ) -> Job:
+        """core1で実行する周期処理を登録する（start()より前に呼び出す）
+
+        Args:
+            period_ms (int): 周期（単位：ms）。0の場合は続けて実行する
+            callback (callable): 実行する関数（引数なし）
+            name (str): 統計に表示する名前。省略時は関数名
+            offset_ms (int): 開始してから初回を実行するまでの時間（単位：ms）
+
+        Returns:
+            Job: 登録した周期処理
+        """
+        if name is None:
+            name = getattr(callback, "__name__", "job")
+        job = Job(name, int(period_ms), callback, int(offset_ms))
+        self.jobs.append(job)
+        return job
+
+    def start(self) -> None:
+        """core1でループを開始する"""
+        self.running = True
+        self._active = True
+        _thread.start_new_thread(self._run, ())
+
+    def stop(self, timeout_ms: int = ACQUISITION_STOP_TIMEOUT_MS) -> bool:
+        """ループを止め、終わるまで待つ
+
+        Args:
+            timeout_ms (int): 待つ最大時間（単位：ms）
+
+        Returns:
+            bool: ループが終わったか
+        """
+        self.running = False
+        start = utime.ticks_ms()
+        while self._active:
+            if utime.ticks_diff(utime.ticks_ms(), start) >= timeout_ms:
+                return False
+            utime.sleep_ms(1)
+        return True
+
+    def report(self) -> str:
+        """周期処理ごとの統計と例外の回数を返す"""
+        return "; ".join(str(job) for job in self.jobs) + (
+            f"; errors={self.errors}, last_error={self.last_error}"
+        )
+
+    def _run(self) -> None:
+        now = utime.ticks_ms()
+        next_ms = [utime.ticks_add(now, job.offset_ms) for job in self.jobs]
+        try:
+            while self.running:
+                wait_ms = None
+                for i, job in enumerate(self.jobs):
+                    started_ms = utime.ticks_ms()
+                    delay_ms = utime.ticks_diff(next_ms[i], started_ms)
+                    if delay_ms <= 0:
+                        try:
+                            job.callback()
+                        except Exception as e:
+                            self.errors += 1
+                            self.last_error = e
+                        next_ms[i] = job.record_run(
+                            next_ms[i], started_ms, utime.ticks_ms()
+                        )
+                        delay_ms = utime.ticks_diff(next_ms[i], utime.ticks_ms())
+                    if wait_ms is None or delay_ms < wait_ms:
+                        wait_ms = delay_ms
+                if wait_ms is not None and wait_ms > 0:
+                    utime.sleep_ms(wait_ms)
+        finally:
+            self._active = False
@@ -0,0 +1,158 @@
+import utime
+
+from src.const import (
+    DISTANCE_FILTER_PROCESS_NOISE,
+    DISTANCE_FILTER_MEASUREMENT_NOISE,
+    DISTANCE_FILTER_VELOCITY_VARIANCE,
+    DISTANCE_FILTER_GATE_SIGMA,
+    ULTRASONIC_SENSOR_MAX_RANGE_CM,
+)
+
+
+class DistanceFilter:
+    """1つの角度の距離を、測定のたびに少しずつ推定するフィルタ
+
+    - 距離と、距離が変わる速さを状態に持つカルマンフィルタ（測定は距離の1次元）
+      なので、測定を捨てた回や次の訪問までの間も、動きに合わせて予測できる
+    - 予測から標準偏差のgate_sigma倍以上離れた測定値はスパイク（マルチパスなど）
+      として捨てる。ただし、続けて外れた場合は、障害物が本当に動いたか
+      予測が外れたとみなして、その測定値からやり直す
+    - 状態は角度ごとに持ち、スイープをまたいで引き継ぐので、1回の訪問で
+      1回測定すればよい
+    - 推定した距離は0~max_distanceに収める（速さで外挿しても負にならない）
+
+    Examples:
+        >>> front = DistanceFilter()
+        >>> front.update(120.3)
+        120.3
+        >>> front.update(380.0)  # スパイクは捨てて予測を返す
+        120.3
+        >>> front.uncertainty()  # 今の推定の分散（単位：cm^2）。小さいほど確か
+        4.0
+    """
+    __slots__ = (
+        "estimate", "velocity", "variance", "rejected",
+        "process_noise", "measurement_noise", "gate_sigma", "accept_closer", "max_distance",
+        "_p01", "_p11", "_outlier", "_updated_at_ms",
+    )
+
+    def __init__(
+        self,
+        process_noise: float = DISTANCE_FILTER_PROCESS_NOISE,
+        measurement_noise: float = DISTANCE_FILTER_MEASUREMENT_NOISE,
+        gate_sigma: float = DISTANCE_FILTER_GATE_SIGMA,
+        accept_closer: bool = False,
+        max_distance: float = ULTRASONIC_SENSOR_MAX_RANGE_CM,
+    ) -> None:
+        """
+        Args:
+            process_noise (float): 加速度の大きさ（単位：cm^2/s^3）
+            measurement_noise (float): 測定値の分散（単位：cm^2）
+            gate_sigma (float): スパイクとみなす距離（標準偏差の何倍か）
+            accept_closer (bool): 予測より近い測定値はスパイクとみなさない
+                （障害物を見逃さないことを優先する場合）
+            max_distance (float): 推定する距離の上限（単位：cm）
+        """
+        self.estimate = None  # 推定した距離（単位：cm）。測定前はNone
+        self.velocity = 0.0  # 推定した距離が変わる速さ（単位：cm/s）
+        self.variance = None  # 推定した距離の分散（単位：cm^2）
+        self.rejected = 0  # スパイクとして捨てた回数
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.gate_sigma = gate_sigma
+        self.accept_closer = accept_closer
+        self.max_distance = max_distance
+        self._p01 = 0.0  # 距離と速さの共分散
+        self._p11 = 0.0  # 速さの分散
+        self._outlier = False  # 直前の測定値を捨てたか
+        self._updated_at_ms = 0
+
+    def update(self, distance: float) -> float:
+        """測定値を取り込み、推定した距離を返す
+
+        Args:
+            distance (float): 測定した距離（単位：cm）
+
+        Returns:
+            float: 推定した距離（単位：cm）
+        """
+        now_ms = utime.ticks_ms()
+        if self.estimate is None:
+            return self._reset_to(distance, now_ms)
+        self._predict(now_ms)
+        innovation = distance - self.estimate
+        innovation_variance = self.variance + self.measurement_noise
+        gate = self.gate_sigma * self.gate_sigma
+        if innovation * innovation > gate * innovation_variance:
+            if self.accept_closer and innovation < 0:
+                return self._reset_to(distance, now_ms)
+            if self._outlier:
+                return self._reset_to(distance, now_ms)
+            self._outlier = True
+            self.rejected += 1
+            return self.estimate
+        gain0 = self.variance / innovation_variance
+        gain1 = self._p01 / innovation_variance
+        self.estimate += gain0 * innovation
+        self.velocity += gain1 * innovation
+        self._p11 -= gain1 * self._p01
+        self._p01 *= 1 - gain0
+        self.variance *= 1 - gain0
+        self._outlier = False
+        self._clamp()
+        return self.estimate
+
+    def uncertainty(self) -> float:
+        """今の時点での推定の分散を返す（測定がない間も時間とともに大きくなる）
+
+        Returns:
+            float: 分散（単位：cm^2）。測定前はNone
+        """
+        if self.variance is None:
+            return None
+        dt = utime.ticks_diff(utime.ticks_ms(), self._updated_at_ms) / 1000
+        return (
+            self.variance + 2 * dt * self._p01 + dt * dt * self._p11
+            + self.process_noise * dt * dt * dt / 3
+        )
+
+    def reset(self) -> None:
+        """推定をやり直す"""
+        self.estimate = None
+        self.variance = None
+        self._outlier = False
+
+    def _predict(self, now_ms: int) -> None:
+        """前回からの経過時間だけ状態を進める（等速で動くと仮定する）"""
+        dt = utime.ticks_diff(now_ms, self._updated_at_ms) / 1000
+        self._updated_at_ms = now_ms
+        q = self.process_noise
+        p01 = self._p01
+        p11 = self._p11
+        self.estimate += self.velocity * dt
+        self.variance += 2 * dt * p01 + dt * dt * p11 + q * dt * dt * dt / 3
+        self._p01 = p01 + dt * p11 + q * dt * dt / 2
+        self._p11 = p11 + q * dt
+        self._clamp()
+
+    def _clamp(self) -> None:
+        """推定した距離を0~max_distanceに収め、範囲の外へ向かう速さは0にする"""
+        if self.estimate < 0:
+            self.estimate = 0.0
+            if self.velocity < 0:
+                self.velocity = 0.0
+        elif self.estimate > self.max_distance:
+            self.estimate = self.max_distance
+            if self.velocity > 0:
+                self.velocity = 0.0
+
+    def _reset_to(self, distance: float, now_ms: int) -> float:
+        self.estimate = distance
+        self.velocity = 0.0
+        self._clamp()
+        self.variance = self.measurement_noise
+        self._p01 = 0.0
+        self._p11 = DISTANCE_FILTER_VELOCITY_VARIANCE
+        self._outlier = False
+        self._updated_at_ms = now_ms
+        return self.estimate
@@ -0,0 +1,296 @@
+from array import array
+
+from src.const import (
+    HISTORY_SAMPLES,
+    HISTORY_MINUTES,
+    HISTORY_HOURS,
+    HISTORY_EMA_SHIFT,
+    TELEMETRY_TAG_AMEDAS,
+    TELEMETRY_TAG_DISTANCE,
+    TELEMETRY_TAG_TEMPERATURE,
+)
+from src.util.time import monotonic_ms
+
+# 測定値の種類ごとのチャンネル名（値の並びはtelemetry_values()と同じ）
+CHANNELS_BY_TAG = {
+    TELEMETRY_TAG_AMEDAS: ("temperature", "pressure", "humidity"),
+    TELEMETRY_TAG_DISTANCE: ("distance_left", "distance_front", "distance_right"),
+    TELEMETRY_TAG_TEMPERATURE: ("chip_temperature",),
+}
+# チャンネルごとの整数値から実際の値への変換: (値 + offset) / scale
+CHANNEL_UNITS = {
+    "temperature": (100, 0),  # ℃
+    "pressure": (10, 0),  # hPa
+    "humidity": (100, 0),  # %
+    "distance_left": (10, 0),  # cm
+    "distance_front": (10, 0),
+    "distance_right": (10, 0),
+    "chip_temperature": (100, 0),
+}
+
+_channels = {}
+_channels_by_tag = {}  # TELEMETRY_TAGごとのChannelのタプル（最初に記録するときに作る）
+_values = array("i", bytes(4 * 3))  # record()で測定値を受け取る（使い回す）
+
+
+class _MonotonicQueue:
+    """窓内の最小値（sign=1）・最大値（sign=-1）の候補を古い順に持つキュー
+
+    - 候補はRingBufferの添字で持ち、値はRingBufferから読む
+    """
+    __slots__ = ("slots", "head", "size", "sign")
+
+    def __init__(self, capacity: int, sign: int) -> None:
+        self.slots = array("H", bytes(2 * capacity))
+        self.head = 0
+        self.size = 0
+        self.sign = sign
+
+    def push(self, slot: int, value: int, values) -> None:
+        slots = self.slots
+        capacity = len(slots)
+        # 新しい値より悪い候補は、この先も最小値（最大値）にならない
+        while self.size:
+            back = slots[(self.head + self.size - 1) % capacity]
+            if (values[back] - value) * self.sign < 0:
+                break
+            self.size -= 1
+        slots[(self.head + self.size) % capacity] = slot
+        self.size += 1
+
+    def expire(self, slot: int) -> None:
+        """上書きされる添字が先頭にあれば取り除く（先頭が最も古い）"""
+        if self.size and self.slots[self.head] == slot:
+            self.head = (self.head + 1) % len(self.slots)
+            self.size -= 1
+
+    def front(self) -> int:
+        return self.slots[self.head]
+
+
+class RingBuffer:
+    """固定長の整数のリングバッファ
+
+    - 追加のたびに合計、最小値、最大値、EMAを更新するので、集計はO(1)
+      （最小値・最大値は償却O(1)）
+    - 追加でメモリを確保しない（値はint16の範囲）
+    - メモリ: 値2バイト + 最小値・最大値の候補2バイトずつ = 6バイト/件
+
+    Examples:
+        >>> buffer = RingBuffer(4)
+        >>> for value in (3, 1, 4, 1, 5):
+        >>>     buffer.append(value)
+        >>> buffer.minimum(), buffer.maximum(), buffer.total
+        (1, 5, 11)
+    """
+    __slots__ = (
+        "capacity", "values", "count", "total", "ema_fp", "ema_shift",
+        "_next", "_mins", "_maxs",
+    )
+
+    def __init__(self, capacity: int, ema_shift: int = HISTORY_EMA_SHIFT) -> None:
+        self.capacity = capacity
+        self.values = array("h", bytes(2 * capacity))
+        self.count = 0
+        self.total = 0
+        self.ema_fp = 0  # EMAの256倍（固定小数点）
+        self.ema_shift = ema_shift  # EMAの係数は1/2^ema_shift
+        self._next = 0
+        self._mins = _MonotonicQueue(capacity, 1)
+        self._maxs = _MonotonicQueue(capacity, -1)
+
+    def append(self, value: int) -> None:
+        """値を追加する（いっぱいの場合は最も古い値を捨てる）"""
+        slot = self._next
+        if self.count == self.capacity:
+            self.total -= self.values[slot]
+            self._mins.expire(slot)
+            self._maxs.expire(slot)
+        else:
+            self.count += 1
+        self.values[slot] = value
+        self.total += value
+        self._mins.push(slot, value, self.values)
+        self._maxs.push(slot, value, self.values)
+        if self.count == 1:
+            self.ema_fp = value << 8
+        else:
+            self.ema_fp += ((value << 8) - self.ema_fp) >> self.ema_shift
+        self._next = (slot + 1) % self.capacity
+
+    def latest(self, back: int = 0) -> int:
+        """back件前の値を返す（0は最新）"""
+        if back >= self.count:
+            raise IndexError("history index out of range")
+        return self.values[(self._next - 1 - back) % self.capacity]
+
+    def minimum(self) -> int:
+        return self.values[self._mins.front()]
+
+    def maximum(self) -> int:
+        return self.values[self._maxs.front()]
+
+    def mean(self) -> int:
+        return self.total // self.count
+
+    def ema(self) -> int:
+        return (self.ema_fp + 128) >> 8
+
+
+class Channel:
+    """1種類の測定値の履歴
+
+    - 測定ごとの値、1分ごとの平均、1時間ごとの平均の3段階で持つ
+    - 値は整数で持ち、取り出すときに(値 + offset) / scaleで実際の値に変換する
+    - メモリ: 6バイト × (HISTORY_SAMPLES + HISTORY_MINUTES + HISTORY_HOURS)
+      （既定の120 + 60 + 24件で約1.2KB + オブジェクト約0.3KB）
+
+    Examples:
+        >>> pressure = get_channel("pressure")
+        >>> pressure.latest(), pressure.minimum(), pressure.maximum()
+        (1013.25, 1012.8, 1013.4)
+        >>> pressure.trend(60)  # 1時間前の1分平均からの変化
+        -1.2
+    """
+    __slots__ = (
+        "name", "scale", "offset", "samples", "minutes", "hours",
+        "_minute", "_minute_total", "_minute_count",
+        "_hour", "_hour_total", "_hour_count",
+    )
+
+    def __init__(self, name: str, scale: int = 1, offset: int = 0) -> None:
+        self.name = name
+        self.scale = scale
+        self.offset = offset
+        self.samples = RingBuffer(HISTORY_SAMPLES)
+        self.minutes = RingBuffer(HISTORY_MINUTES)
+        self.hours = RingBuffer(HISTORY_HOURS)
+        self._minute = None
+        self._minute_total = 0
+        self._minute_count = 0
+        self._hour = None
+        self._hour_total = 0
+        self._hour_count = 0
+
+    def append(self, value: int, now_ms: int = None) -> None:
+        """値を追加する
+
+        - 分（時）が変わったら、それまでの平均を1分（1時間）ごとの履歴に追加する
+          （測定がなかった分は追加しない）
+
+        Args:
+            value (int): 値（int16の範囲）
+            now_ms (int): 測定時刻（単位：ms）。省略時はmonotonic_ms()
+        """
+        if now_ms is None:
+            now_ms = monotonic_ms()
+        minute = now_ms // 60000
+        if minute != self._minute:
+            if self._minute_count:
+                self._add_minute(
+                    self._minute_total // self._minute_count, self._minute
+                )
+            self._minute = minute
+            self._minute_total = 0
+            self._minute_count = 0
+        self.samples.append(value)
+        self._minute_total += value
+        self._minute_count += 1
+
+    def _add_minute(self, value: int, minute: int) -> None:
+        self.minutes.append(value)
+        hour = minute // 60
+        if hour != self._hour:
+            if self._hour_count:
+                self.hours.append(self._hour_total // self._hour_count)
+            self._hour = hour
+            self._hour_total = 0
+            self._hour_count = 0
+        self._hour_total += value
+        self._hour_count += 1
+
+    def to_value(self, raw: int) -> float:
+        """整数値を実際の値に変換する"""
+        return (raw + self.offset) / self.scale
+
+    def latest(self) -> float:
+        return self.to_value(self.samples.latest())
+
+    def minimum(self) -> float:
+        return self.to_value(self.samples.minimum())
+
+    def maximum(self) -> float:
+        return self.to_value(self.samples.maximum())
+
+    def mean(self) -> float:
+        return self.to_value(self.samples.mean())
+
+    def ema(self) -> float:
+        return self.to_value(self.samples.ema())
+
+    def trend(self, minutes: int = 60) -> float:
+        """minutes分前の1分平均から最新の1分平均までの変化を返す
+
+        - 履歴が足りない場合は、ある分だけで計算する
+
+        Returns:
+            float: 変化量（1分ごとの平均が2件未満の場合はNone）
+        """
+        count = self.minutes.count
+        if count < 2:
+            return None
+        back = min(minutes, count - 1)
+        return (self.minutes.latest() - self.minutes.latest(back)) / self.scale
+
+    def __str__(self) -> str:
+        if not self.samples.count:
+            return f"{self.name}: -"
+        return (
+            f"{self.name}: {self.latest():.2f} "
+            + f"(min {self.minimum():.2f}, max {self.maximum():.2f}, "
+            + f"mean {self.mean():.2f}, ema {self.ema():.2f})"
+        )
+
+
+def get_channel(name: str) -> Channel:
+    """名前ごとに1つのChannelを返す（どのモジュールからでも同じ履歴を参照できる）
+
+    Args:
+        name (str): チャンネル名（CHANNEL_UNITSのキー）
+
+    Returns:
+        Channel: 測定値の履歴
+    """
+    channel = _channels.get(name)
+    if channel is None:
+        scale, offset = CHANNEL_UNITS.get(name, (1, 0))
+        channel = Channel(name, scale, offset)
+        _channels[name] = channel
+    return channel
+
+
+def record(message) -> bool:
+    """測定値を対応するチャンネルに追加する
+
+    - TelemetryWriterと同じく、TELEMETRY_TAGとtelemetry_values_into()を持つ
+      オブジェクトと、float（温度）を受け付ける
+    - 値は使い回すarrayで受け取り、タプルやイテレータを作らない
+
+    Returns:
+        bool: 追加したか（対応していない型の場合はFalse）
+    """
+    now_ms = monotonic_ms()
+    if isinstance(message, float):
+        get_channel("chip_temperature").append(round(message * 100), now_ms)
+        return True
+    if not hasattr(message, "TELEMETRY_TAG"):
+        return False
+    tag = message.TELEMETRY_TAG
+    channels = _channels_by_tag.get(tag)
+    if channels is None:
+        channels = tuple(get_channel(name) for name in CHANNELS_BY_TAG[tag])
+        _channels_by_tag[tag] = channels
+    message.telemetry_values_into(_values)
+    for index in range(len(channels)):
+        channels[index].append(_values[index], now_ms)
+    return True
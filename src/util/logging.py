@@ -1,48 +1,169 @@
-import json
+import uasyncio
+import utime
 
-from src.const import ERROR_FILE_PATH
-from src.secret import WEB_HOOK_URL
+from src.const import (
+    LOG_BUFFER_BYTES,
+    LOG_BUFFER_LINES,
+    LOG_FLUSH_CHECK_INTERVAL_MS,
+    LOG_FLUSH_INTERVAL_MS,
+    WIFI_STATE_UP,
+)
 from src.util.judge import is_wifi_usable
-from src.util.time import Time, ntp_sync
+from src.util.logstore import SegmentedLog
+from src.util.profile import profile
+from src.util.telemetry import TelemetryWriter
+from src.util.time import Time
 
 
 if is_wifi_usable():
-    import urequests
+    from src.util.webhook import WebhookSender
 
 
 class CustomLogging:
-    def __init__(self, console=True, file=True, slack=False):
+    """コンソール・ファイル・Slackにログを出力するクラス
+
+    - ファイルへの出力はRAMのバッファに溜めておき、まとめて書き出す。
+      行数・経過時間のしきい値と、バッファが半分を超えたかはrun()のタスクが
+      LOG_FLUSH_CHECK_INTERVAL_MSごとに確認して書き出す。
+      write()の中で書き出すのはバッファが一杯になったときだけ
+    - ファイルはSegmentedLogで上限のあるセグメントに順番に書き込む（古いログから消える）。
+      セグメントの切り替え（索引の書き直し）もrun()のタスクが行う
+    - Slackへの出力はWebhookSenderのキューに積むだけで、送信はrun()の
+      タスクがまとめて行う
+    - telemetry=Trueの場合、測定値（AMeDASMeasurement, Distance, 温度）は
+      テキストではなくバイナリのレコードとしてファイルに記録する
+    - 異常終了時に最後のログが失われないよう、finally節でflush()を呼ぶ
+    - link（WifiSupervisor）を渡した場合は、Wi-Fiがつながった・切れたことを記録する
+    - 時刻合わせ（NTP）は行わない。TimeSyncがバックグラウンドで行う
+
+    Examples:
+        >>> logger = CustomLogging()
+        >>> try:
+        >>>     logger.write("hello")
+        >>> finally:
+        >>>     logger.flush()
+    """
+    def __init__(
+        self,
+        console=True,
+        file=True,
+        slack=False,
+        telemetry=False,
+        buffer_bytes=LOG_BUFFER_BYTES,
+        buffer_lines=LOG_BUFFER_LINES,
+        flush_interval_ms=LOG_FLUSH_INTERVAL_MS,
+        link=None,
+    ):
         self.console = console
         self.file = file
         self.slack = slack
+        self.link = link
+        self.webhook = WebhookSender(link=link) if slack and is_wifi_usable() else None
+        self.telemetry = TelemetryWriter() if telemetry else None
+        self.buffer_lines = buffer_lines
+        self.flush_interval_ms = flush_interval_ms
+
+        self._store = SegmentedLog() if file else None
+        self._buffer = bytearray(buffer_bytes)
+        self._length = 0
+        self._lines = 0
+        self._last_flush_ms = utime.ticks_ms()
 
-        self._write_file("\n\nnew session\n")
-        try:
-            ntp_sync()
-        except Exception as e:
-            self.write(f"ntp sync failed: {e}")
+        if file:
+            self._write_file("\n\nnew session\n")
+        if link is not None:
+            self._link_up = False
+            link.on_change(self._on_link_change)
+
+    def _on_link_change(self, state):
+        """Wi-Fiの状態が変わったときにWifiSupervisorから呼び出される"""
+        if state == WIFI_STATE_UP:
+            self._link_up = True
+            self.write(f"wifi connected: {self.link.stats}")
+        elif self._link_up:  # つながっていた状態から切れたときだけ記録する
+            self._link_up = False
+            self.write(f"wifi disconnected: status={self.link.wlan.status()}")
 
     def _format(self, message):
-        return f"[{Time.now()}] {message}"
+        return f"[{Time.now_string()}] {message}"
 
+    @profile("CustomLogging.write")
     def write(self, message):
+        binary = (
+            self.file and self.telemetry is not None and self.telemetry.write(message)
+        )
+        if binary and not self.console and self.webhook is None:
+            return  # 文字列に整形する必要がない
         message = self._format(message)
         if self.console:
             self._write_console(message)
-        if self.file:
+        if self.file and not binary:
             self._write_file(message)
 
-        if self.slack and is_wifi_usable():
+        if self.webhook is not None:
             self._write_slack(message)
 
+    async def run(self):
+        """バックグラウンドでの書き出し・送信を行う（uasyncioのタスクとして実行する）"""
+        tasks = []
+        if self.file:
+            tasks.append(self._run_flush())
+        if self.webhook is not None:
+            tasks.append(self.webhook.run())
+        await uasyncio.gather(*tasks)
+
+    async def _run_flush(self):
+        """行数・経過時間のしきい値を超えたら、またはバッファが半分を超えたら書き出す
+
+        - 一杯になる前に書き出しておき、write()の中で書き出さずに済むようにする
+        - セグメントにバッファ1杯分の空きがなくなったら、次のセグメントに切り替える
+          （write()の中で書き出す場合も切り替えずに済むようにする）
+        """
+        while True:
+            await uasyncio.sleep_ms(LOG_FLUSH_CHECK_INTERVAL_MS)
+            if (
+                self._lines >= self.buffer_lines
+                or self._length * 2 >= len(self._buffer)
+                or utime.ticks_diff(utime.ticks_ms(), self._last_flush_ms)
+                >= self.flush_interval_ms
+            ):
+                self._flush_file()
+            if self._store.full(len(self._buffer)):
+                self._store.rotate()
+
+    def flush(self):
+        """バッファに溜まっているログを書き出す
+
+        - 未送信のSlack向けのメッセージはフラッシュ上に退避する
+        """
+        self._flush_file()
+        if self.telemetry is not None:
+            self.telemetry.flush()
+        if self.webhook is not None:
+            self.webhook.spill_queue()
+
+    def _flush_file(self):
+        """バッファに溜まっているログをファイルに書き出す"""
+        self._last_flush_ms = utime.ticks_ms()
+        if self._length == 0:
+            return
+        self._store.append(memoryview(self._buffer)[:self._length])
+        self._length = 0
+        self._lines = 0
+
     def _write_console(self, message):
         print(message)
 
     def _write_slack(self, message):
-        urequests.post(WEB_HOOK_URL, data=json.dumps({
-            "text": message
-        }))
+        self.webhook.put(message)
 
     def _write_file(self, message):
-        with open(ERROR_FILE_PATH, "a", encoding="utf-8") as f:
-            f.write(f"{message}\n")
+        data = f"{message}\n".encode("utf-8")
+        if self._length + len(data) > len(self._buffer):
+            self._flush_file()
+        if len(data) > len(self._buffer):  # バッファに収まらない場合は直接書き出す
+            self._store.append(data)
+            return
+        self._buffer[self._length:self._length + len(data)] = data
+        self._length += len(data)
+        self._lines += 1
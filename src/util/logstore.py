@@ -0,0 +1,176 @@
+import os
+import struct
+from array import array
+
+from src.const import (
+    LOG_INDEX_FILE_PATH,
+    LOG_INDEX_HEADER_FORMAT,
+    LOG_INDEX_MAGIC,
+    LOG_INDEX_SLOT_FORMAT,
+    LOG_INDEX_VERSION,
+    LOG_SEGMENT_BYTES,
+    LOG_SEGMENT_PATH_FORMAT,
+    LOG_TOTAL_BYTES,
+)
+from src.util.time import now_epoch_ms
+
+HEADER_SIZE = struct.calcsize(LOG_INDEX_HEADER_FORMAT)
+SLOT_SIZE = struct.calcsize(LOG_INDEX_SLOT_FORMAT)
+UNUSED = 0xFFFFFFFF
+
+
+class SegmentedLog:
+    """ログを決まった数のセグメントファイルに順番に書き込むクラス
+
+    - 各セグメントはsegment_bytesまで追記し、次のセグメントに移る。
+      最後のセグメントの次は最初のセグメントを空にして使い回すので、
+      ログ全体はおよそtotal_bytesを超えない
+    - append()はセグメントを切り替えない（索引の書き直しを呼び出し元の処理に
+      持ち込まない）。切り替えはfull()を確認してrotate()で行う。
+      CustomLoggingではバックグラウンドのタスクが、バッファ1杯分の空きが
+      なくなった時点で切り替える
+    - LittleFSはコピーオンライトなので、事前に確保した領域を上書きしても
+      ブロックの書き直しになる。そのため空のファイルに追記する形のまま使い回す
+      （1回の追記のコストはログ全体の量によらない）
+    - 索引ファイル（LOG_INDEX_*）にはセグメントごとの通し番号と開始時刻を記録する。
+      書き直すのはセグメントを切り替えるときだけ
+    - 起動時は索引から続きのセグメントを探して追記する
+    - 読み出しはホスト側の`python -m host.logs`で行う
+
+    Examples:
+        >>> store = SegmentedLog()
+        >>> store.append(b"hello\\n")
+        >>> if store.full(reserve=2048):  # 次の2KBが収まらなければ切り替える
+        >>>     store.rotate()
+        >>> store.segments()  # 古い順の(通し番号, 開始時刻, パス)
+        [(0, 1700000000, '/log.0.txt')]
+    """
+    def __init__(
+        self,
+        segment_bytes=LOG_SEGMENT_BYTES,
+        total_bytes=LOG_TOTAL_BYTES,
+        path_format=LOG_SEGMENT_PATH_FORMAT,
+        index_path=LOG_INDEX_FILE_PATH,
+    ) -> None:
+        self.segment_bytes = segment_bytes
+        self.slots = max(total_bytes // segment_bytes, 2)
+        self.path_format = path_format
+        self.index_path = index_path
+        self.rotations = 0
+        self._sequences = array("I", [UNUSED] * self.slots)
+        self._started = array("I", bytes(4 * self.slots))
+        self._index = bytearray(HEADER_SIZE + SLOT_SIZE * self.slots)
+        if self._load_index():
+            try:
+                self.size = os.stat(self.path)[6]
+            except OSError:
+                self.size = 0
+        else:
+            self._start_segment(0)
+
+    @property
+    def path(self) -> str:
+        """書き込み中のセグメントのパス"""
+        return self.path_format.format(self.sequence % self.slots)
+
+    def append(self, data) -> None:
+        """データを書き込み中のセグメントに追記する
+
+        - セグメントは切り替えない。rotate()が間に合わなかった場合は、
+          セグメントがsegment_bytesを超えることがある
+        - segment_bytesより長いデータは先頭のsegment_bytesだけを書き込む
+
+        Args:
+            data (bytes | bytearray | memoryview): 追記するデータ
+        """
+        if len(data) > self.segment_bytes:
+            data = memoryview(data)[:self.segment_bytes]
+        with open(self.path, "ab") as f:
+            f.write(data)
+        self.size += len(data)
+
+    def full(self, reserve: int = 0) -> bool:
+        """書き込み中のセグメントに、あとreserveバイト追記する空きがないか
+
+        Args:
+            reserve (int): これから追記する予定のバイト数
+
+        Returns:
+            bool: 空きがない（rotate()で切り替えるべき）か
+        """
+        return self.size > 0 and self.size + reserve > self.segment_bytes
+
+    def rotate(self) -> None:
+        """次のセグメントを空にして書き込み先にし、索引を書き直す"""
+        self._start_segment(self.sequence + 1)
+        self.rotations += 1
+
+    def segments(self) -> list:
+        """使用中のセグメントを古い順に返す
+
+        Returns:
+            list: (通し番号, 開始時のUNIX時刻, パス)のリスト
+        """
+        used = [
+            (self._sequences[slot], self._started[slot], self.path_format.format(slot))
+            for slot in range(self.slots)
+            if self._sequences[slot] != UNUSED
+        ]
+        used.sort()
+        return used
+
+    def _start_segment(self, sequence: int) -> None:
+        """セグメントを空にして書き込み先にし、索引を書き直す"""
+        self.sequence = sequence
+        slot = sequence % self.slots
+        self._sequences[slot] = sequence
+        self._started[slot] = now_epoch_ms() // 1000
+        with open(self.path, "wb"):
+            pass
+        self.size = 0
+        self._write_index()
+
+    def _write_index(self) -> None:
+        struct.pack_into(
+            LOG_INDEX_HEADER_FORMAT, self._index, 0,
+            LOG_INDEX_MAGIC, LOG_INDEX_VERSION, self.slots, 0,
+            self.segment_bytes, self.sequence,
+        )
+        for slot in range(self.slots):
+            struct.pack_into(
+                LOG_INDEX_SLOT_FORMAT, self._index, HEADER_SIZE + SLOT_SIZE * slot,
+                self._sequences[slot], self._started[slot],
+            )
+        with open(self.index_path, "wb") as f:
+            f.write(self._index)
+
+    def _load_index(self) -> bool:
+        """索引を読み込む
+
+        Returns:
+            bool: 続きから書き込めるか（索引がない・設定が変わった場合はFalse）
+        """
+        try:
+            with open(self.index_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return False
+        if len(data) != len(self._index):
+            return False
+        magic, version, slots, _, segment_bytes, sequence = struct.unpack_from(
+            LOG_INDEX_HEADER_FORMAT, data, 0
+        )
+        if (
+            magic != LOG_INDEX_MAGIC
+            or version != LOG_INDEX_VERSION
+            or slots != self.slots
+            or segment_bytes != self.segment_bytes
+        ):
+            return False
+        for slot in range(self.slots):
+            self._sequences[slot], self._started[slot] = struct.unpack_from(
+                LOG_INDEX_SLOT_FORMAT, data, HEADER_SIZE + SLOT_SIZE * slot
+            )
+        self.sequence = sequence
+        self._index[:] = data
+        return True
@@ -0,0 +1,128 @@
+from array import array
+
+import utime
+
+from src.const import (
+    OCCUPANCY_ANGLE_STEP,
+    OCCUPANCY_RANGE_STEP_CM,
+    OCCUPANCY_MAX_RANGE_CM,
+    OCCUPANCY_HIT,
+    OCCUPANCY_MISS,
+    OCCUPANCY_THRESHOLD,
+    OCCUPANCY_HALF_LIFE_MS,
+)
+
+
+class OccupancyMap:
+    """サーボモーターの角度と距離で区切った極座標の占有マップ
+
+    - マスごとに障害物がある確からしさ(0~255)をbytearrayに持つ
+    - 測定すると、その角度の測定距離のマスを増やし、手前のマスを減らす
+    - 値は時間とともに半減する。角度（行）ごとに最後に減衰させた時刻を持ち、
+      その行を更新・参照するときにまとめて減衰させる（触れた行だけ計算する）
+    - メモリ: 角度-90~90度を15度ごと(13行) × 0~200cmを5cmごと(40マス)で520バイト
+
+    Examples:
+        >>> occupancy = OccupancyMap()
+        >>> occupancy.update(60, 35.2)
+        >>> occupancy.nearest(60, max_age_ms=1000)  # 1秒以内に測定していれば使う
+        37.5
+        >>> occupancy.nearest(-60, max_age_ms=1000)  # 測定していなければNone
+    """
+    def __init__(
+        self,
+        angle_step: int = OCCUPANCY_ANGLE_STEP,
+        range_step_cm: int = OCCUPANCY_RANGE_STEP_CM,
+        max_range_cm: int = OCCUPANCY_MAX_RANGE_CM,
+    ) -> None:
+        self.angle_step = angle_step
+        self.range_step_cm = range_step_cm
+        self.rows = 180 // angle_step + 1
+        self.columns = max_range_cm // range_step_cm
+        self.cells = bytearray(self.rows * self.columns)
+        self._measured_at_ms = array("i", bytes(4 * self.rows))
+        self._decayed_at_ms = array("i", bytes(4 * self.rows))
+        self._measured = bytearray(self.rows)  # 一度でも測定した行か
+        self.updates = 0
+
+    def update(self, angle: int, distance: float) -> None:
+        """測定値をマップに反映する
+
+        - 負の距離は最も近いマスに障害物があるものとする
+        - 最大距離以上の場合は、その角度のマスをすべて空いているものとする（障害物は記録しない）
+
+        Args:
+            angle (int): サーボモーターの角度(-90~90)
+            distance (float): 距離（単位：cm）
+        """
+        row = self._row(angle)
+        now_ms = utime.ticks_ms()
+        self._decay(row, now_ms)
+        cells = self.cells
+        start = row * self.columns
+        hit = int(distance // self.range_step_cm)
+        if hit < 0:
+            hit = 0
+        for column in range(min(hit, self.columns)):  # 手前は空いている
+            value = cells[start + column]
+            cells[start + column] = value - OCCUPANCY_MISS if value > OCCUPANCY_MISS else 0
+        if hit < self.columns:
+            value = cells[start + hit] + OCCUPANCY_HIT
+            cells[start + hit] = value if value < 255 else 255
+        self._measured[row] = 1
+        self._measured_at_ms[row] = now_ms
+        self.updates += 1
+
+    def age_ms(self, angle: int) -> int:
+        """その角度を最後に測定してからの時間を返す（測定していなければNone）"""
+        row = self._row(angle)
+        if not self._measured[row]:
+            return None
+        return utime.ticks_diff(utime.ticks_ms(), self._measured_at_ms[row])
+
+    def nearest(self, angle: int, max_age_ms: int) -> float:
+        """その角度で最も近い障害物までの距離を返す
+
+        Args:
+            angle (int): サーボモーターの角度(-90~90)
+            max_age_ms (int): これより前の測定しかない場合は使わない
+
+        Returns:
+            float: 距離（単位：cm）。障害物がなければ最大距離。
+                測定していない・古い場合はNone
+        """
+        age_ms = self.age_ms(angle)
+        if age_ms is None or age_ms > max_age_ms:
+            return None
+        row = self._row(angle)
+        self._decay(row, utime.ticks_ms())
+        cells = self.cells
+        start = row * self.columns
+        for column in range(self.columns):
+            if cells[start + column] >= OCCUPANCY_THRESHOLD:
+                return (column + 0.5) * self.range_step_cm
+        return self.columns * self.range_step_cm
+
+    def _row(self, angle: int) -> int:
+        angle = min(max(angle, -90), 90)
+        return (angle + 90 + self.angle_step // 2) // self.angle_step
+
+    def _decay(self, row: int, now_ms: int) -> None:
+        """行の値を、前回からの経過時間に応じて半減させる"""
+        halvings = (
+            utime.ticks_diff(now_ms, self._decayed_at_ms[row])
+            // OCCUPANCY_HALF_LIFE_MS
+        )
+        if halvings <= 0:
+            return
+        if halvings > 8:  # 8回で0になる
+            self._decayed_at_ms[row] = now_ms
+            halvings = 8
+        else:  # 半減した分だけ時刻を進める（端数は次回に持ち越す）
+            self._decayed_at_ms[row] = utime.ticks_add(
+                self._decayed_at_ms[row], halvings * OCCUPANCY_HALF_LIFE_MS
+            )
+        cells = self.cells
+        start = row * self.columns
+        for column in range(start, start + self.columns):
+            cells[column] >>= halvings
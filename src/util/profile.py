@@ -0,0 +1,262 @@
+from array import array
+
+import utime
+
+from src.const import PROFILE_ENABLED, PROFILE_BUCKETS
+
+_histograms = {}
+_spans = {}
+
+
+class Histogram:
+    """所要時間[μs]の対数ヒストグラム
+
+    - 区間は2倍ごと（オクターブ）に4つに分ける（誤差は最大で約20%）。
+      4μs未満は1μsごとの区間とする
+    - 区間ごとの回数は事前に確保したarrayに数えるので、記録するときにメモリを確保しない
+    - 2つのコアから同時に記録すると、まれに1回分数え損なう
+
+    Examples:
+        >>> histogram = Histogram("ServoMotor.set_angle")
+        >>> histogram.add(1500)
+        >>> histogram.percentile(0.5)  # 1280~1536μsの区間の中央
+        1408
+    """
+    def __init__(self, name: str, buckets: int = PROFILE_BUCKETS) -> None:
+        self.name = name
+        self.counts = array("I", bytes(4 * buckets))
+        self.reset()
+
+    def reset(self) -> None:
+        """記録を消す"""
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+
+    def add(self, elapsed_us: int) -> None:
+        """所要時間を記録する
+
+        Args:
+            elapsed_us (int): 所要時間（単位：μs）
+        """
+        if elapsed_us < 0:
+            elapsed_us = 0
+        bucket = _bucket(elapsed_us)
+        if bucket >= len(self.counts):
+            bucket = len(self.counts) - 1
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total_us += elapsed_us
+        if elapsed_us > self.max_us:
+            self.max_us = elapsed_us
+
+    def percentile(self, q: float) -> int:
+        """q分位点の見積もり（区間の中央の値。最大値を超えない）
+
+        Args:
+            q (float): 0~1
+
+        Returns:
+            int: 所要時間（単位：μs）。記録がない場合は0
+        """
+        if not self.count:
+            return 0
+        target = q * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                low, high = _bounds(bucket)
+                return min((low + high) // 2, self.max_us)
+        return self.max_us
+
+    def summary(self) -> dict:
+        """回数、平均、p50、p95、最大値[μs]を返す"""
+        return {
+            "count": self.count,
+            "mean_us": self.total_us // self.count if self.count else 0,
+            "p50_us": self.percentile(0.5),
+            "p95_us": self.percentile(0.95),
+            "max_us": self.max_us,
+        }
+
+    def __str__(self) -> str:
+        summary = self.summary()
+        return (
+            f"{self.name}: n={summary['count']}, p50={summary['p50_us']}us, "
+            + f"p95={summary['p95_us']}us, max={summary['max_us']}us"
+        )
+
+
+class _Span:
+    """withで囲んだ区間の所要時間をHistogramに記録する"""
+    __slots__ = ("histogram", "started_us")
+
+    def __init__(self, histogram: Histogram) -> None:
+        self.histogram = histogram
+        self.started_us = 0
+
+    def __enter__(self) -> "_Span":
+        self.started_us = utime.ticks_us()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.histogram.add(utime.ticks_diff(utime.ticks_us(), self.started_us))
+
+
+class _NullSpan:
+    """無効なときにspan()が返す、何もしないコンテキストマネージャ"""
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def get_histogram(name: str) -> Histogram:
+    """名前に対応するHistogramを返す（なければ作る）
+
+    Args:
+        name (str): 計測する処理の名前
+
+    Returns:
+        Histogram: ヒストグラム
+    """
+    if name not in _histograms:
+        _histograms[name] = Histogram(name)
+    return _histograms[name]
+
+
+def profile(name: str):
+    """関数の所要時間を記録するデコレータ
+
+    - PROFILE_ENABLEDがFalseの場合は関数をそのまま返す（呼び出しのコストは増えない）
+    - async関数にはprofile_asyncを使う
+
+    Args:
+        name (str): 計測する処理の名前
+
+    Examples:
+        >>> class ServoMotor:
+        >>>     @profile("ServoMotor.set_angle")
+        >>>     def set_angle(self, degree):
+        >>>         ...
+    """
+    if not PROFILE_ENABLED:
+        return _identity
+    histogram = get_histogram(name)
+
+    def decorator(f):
+        def wrapper(*args, **kwargs):
+            started_us = utime.ticks_us()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                histogram.add(utime.ticks_diff(utime.ticks_us(), started_us))
+        return wrapper
+    return decorator
+
+
+def profile_async(name: str):
+    """async関数の所要時間（待っている時間を含む）を記録するデコレータ
+
+    Args:
+        name (str): 計測する処理の名前
+    """
+    if not PROFILE_ENABLED:
+        return _identity
+    histogram = get_histogram(name)
+
+    def decorator(f):
+        async def wrapper(*args, **kwargs):
+            started_us = utime.ticks_us()
+            try:
+                return await f(*args, **kwargs)
+            finally:
+                histogram.add(utime.ticks_diff(utime.ticks_us(), started_us))
+        return wrapper
+    return decorator
+
+
+def span(name: str):
+    """withで囲んだ区間の所要時間を記録する
+
+    - 同じ名前のspanを入れ子にはできない（開始時刻を1つしか持たないため）
+
+    Args:
+        name (str): 計測する処理の名前
+
+    Examples:
+        >>> with span("drive"):
+        >>>     decide(front, left, right)
+    """
+    if not PROFILE_ENABLED:
+        return _NULL_SPAN
+    if name not in _spans:
+        _spans[name] = _Span(get_histogram(name))
+    return _spans[name]
+
+
+def summaries() -> dict:
+    """記録した処理ごとの統計（Histogram.summary()）を返す"""
+    return {name: h.summary() for name, h in _histograms.items() if h.count}
+
+
+def report(reset: bool = True) -> str:
+    """記録した処理ごとのp50、p95、最大値を返す
+
+    Args:
+        reset (bool): 返した後に記録を消すか（一定間隔ごとの値にする）
+
+    Returns:
+        str: 処理ごとの統計
+    """
+    lines = "; ".join(str(h) for h in _histograms.values() if h.count)
+    if reset:
+        for histogram in _histograms.values():
+            histogram.reset()
+    return lines
+
+
+def _identity(f):
+    return f
+
+
+def _bucket(elapsed_us: int) -> int:
+    """所要時間が入る区間の番号を返す"""
+    if elapsed_us < 4:
+        return elapsed_us
+    # 最上位ビットの位置を二分探索で求める
+    msb = 0
+    value = elapsed_us
+    if value >> 16:
+        value >>= 16
+        msb += 16
+    if value >> 8:
+        value >>= 8
+        msb += 8
+    if value >> 4:
+        value >>= 4
+        msb += 4
+    if value >> 2:
+        value >>= 2
+        msb += 2
+    if value >> 1:
+        msb += 1
+    return 4 * (msb - 1) + ((elapsed_us >> (msb - 2)) & 3)
+
+
+def _bounds(bucket: int) -> tuple:
+    """区間の下限と上限（上限は含まない）を返す"""
+    if bucket < 4:
+        return bucket, bucket + 1
+    shift = bucket // 4 - 1
+    low = (4 + bucket % 4) << shift
+    return low, low + (1 << shift)
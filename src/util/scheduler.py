@@ -0,0 +1,127 @@
+import uasyncio
+import utime
+
+
+class Job:
+    """Schedulerに登録された周期処理と、その実行結果の統計"""
+    __slots__ = (
+        "name", "period_ms", "callback", "offset_ms",
+        "runs", "overruns", "skipped",
+        "jitter_total_ms", "jitter_max_ms", "duration_max_ms",
+    )
+
+    def __init__(self, name: str, period_ms: int, callback, offset_ms: int) -> None:
+        self.name = name
+        self.period_ms = period_ms
+        self.callback = callback
+        self.offset_ms = offset_ms
+        self.runs = 0
+        self.overruns = 0  # 処理が次の予定時刻を過ぎた回数
+        self.skipped = 0  # そのために飛ばした回数
+        self.jitter_total_ms = 0  # 予定時刻からの遅れの合計
+        self.jitter_max_ms = 0
+        self.duration_max_ms = 0
+
+    def record_run(self, next_ms: int, started_ms: int, finished_ms: int) -> int:
+        """1回の実行を統計に加え、次の予定時刻を返す
+
+        - 処理が次の予定時刻を過ぎた場合は、過ぎた分を飛ばす
+        - 周期が0の場合は、終わったらすぐに次を実行する
+
+        Args:
+            next_ms (int): 今回の予定時刻（ticks_ms）
+            started_ms (int): 実行を始めた時刻（ticks_ms）
+            finished_ms (int): 実行を終えた時刻（ticks_ms）
+
+        Returns:
+            int: 次の予定時刻（ticks_ms）
+        """
+        jitter_ms = utime.ticks_diff(started_ms, next_ms)
+        self.runs += 1
+        self.jitter_total_ms += jitter_ms
+        if jitter_ms > self.jitter_max_ms:
+            self.jitter_max_ms = jitter_ms
+        duration_ms = utime.ticks_diff(finished_ms, started_ms)
+        if duration_ms > self.duration_max_ms:
+            self.duration_max_ms = duration_ms
+        if self.period_ms == 0:
+            return finished_ms
+        next_ms = utime.ticks_add(next_ms, self.period_ms)
+        late_ms = utime.ticks_diff(finished_ms, next_ms)
+        if late_ms > 0:
+            skip = late_ms // self.period_ms + 1
+            self.overruns += 1
+            self.skipped += skip
+            next_ms = utime.ticks_add(next_ms, skip * self.period_ms)
+        return next_ms
+
+    def __str__(self) -> str:
+        jitter_mean_ms = self.jitter_total_ms // self.runs if self.runs else 0
+        return (
+            f"{self.name}: runs={self.runs}, "
+            + f"jitter(mean/max)={jitter_mean_ms}/{self.jitter_max_ms}ms, "
+            + f"duration(max)={self.duration_max_ms}ms, "
+            + f"overruns={self.overruns}, skipped={self.skipped}"
+        )
+
+
+class Scheduler:
+    """デバイスごとの周期で処理を実行するスケジューラ
+
+    - 予定時刻はticks_msで「前回の予定時刻+周期」とするので、
+      処理時間や遅れが積み重ならない（ずれない）
+    - 処理が次の予定時刻を過ぎた場合は、過ぎた分を飛ばして周期を保つ
+    - 処理ごとに別のタスクで待つので、遅い処理が速い処理を待たせない
+      （待つ間はuasyncioが休止する）
+    - コールバックはasync関数でもよい
+
+    Examples:
+        >>> scheduler = Scheduler()
+        >>> scheduler.every(1000, check_temperature)
+        >>> scheduler.every(10000, measure_weather, offset_ms=500)
+        >>> uasyncio.run(scheduler.run())
+        >>> print(scheduler.report())
+        check_temperature: runs=10, jitter(mean/max)=0/1ms, ...
+    """
+    def __init__(self) -> None:
+        self.jobs = []
+
+    def every(
+        self, period_ms: int, callback, name: str = None, offset_ms: int = 0
+    ) -> Job:
+        """周期処理を登録する
+
+        Args:
+            period_ms (int): 周期（単位：ms）
+            callback (callable): 実行する関数（引数なし）
+            name (str): 統計に表示する名前。省略時は関数名
+            offset_ms (int): 開始してから初回を実行するまでの時間（単位：ms）
+
+        Returns:
+            Job: 登録した周期処理
+        """
+        if name is None:
+            name = getattr(callback, "__name__", "job")
+        job = Job(name, int(period_ms), callback, int(offset_ms))
+        self.jobs.append(job)
+        return job
+
+    async def run(self) -> None:
+        """登録した周期処理を実行し続ける（いずれかで例外が起きたら終了する）"""
+        await uasyncio.gather(*[self._run_job(job) for job in self.jobs])
+
+    def report(self) -> str:
+        """周期処理ごとの統計を返す"""
+        return "; ".join(str(job) for job in self.jobs)
+
+    async def _run_job(self, job: Job) -> None:
+        next_ms = utime.ticks_add(utime.ticks_ms(), job.offset_ms)
+        while True:
+            delay_ms = utime.ticks_diff(next_ms, utime.ticks_ms())
+            if delay_ms > 0:
+                await uasyncio.sleep_ms(delay_ms)
+            started_ms = utime.ticks_ms()
+            result = job.callback()
+            if hasattr(result, "send"):  # async関数
+                await result
+            next_ms = job.record_run(next_ms, started_ms, utime.ticks_ms())
@@ -0,0 +1,170 @@
+from src.const import (
+    OCCUPANCY_MAX_AGE_MS,
+    SWEEP_SIDE_ANGLE,
+    SWEEP_WIDE_ANGLE,
+    SWEEP_SIDE_SCAN_DISTANCE_CM,
+    SWEEP_CRUISE_HYSTERESIS_CM,
+    SWEEP_WIDEN_DISTANCE_CM,
+)
+from src.util.filter import DistanceFilter
+from src.util.occupancy import OccupancyMap
+
+
+class SweepPlanner:
+    """次にどの角度を測定するかを決めるクラス
+
+    - 正面が遠い間（巡航中）は正面だけを測定し、サーボモーターを動かさない
+    - 正面がside_scan_cmより近くなったら、正面と左右を交互に測定する
+      （正面がside_scan_cm + ヒステリシスより遠くなったら巡航に戻る）
+    - 左右がどちらもwiden_cmより近い場合は、巡航に戻るまで左右の角度を広げて
+      空いている方を探す
+    - 角度ごとにDistanceFilterで平滑化し、OccupancyMapに蓄積する
+      （負の角度は右、正の角度は左）
+    - 左右はOCCUPANCY_MAX_AGE_MS以内の測定が占有マップにあれば測定し直さず、
+      占有マップの値を使う（止まって左右を測定しなくても曲がる方向を決められる）
+
+    Examples:
+        >>> planner = SweepPlanner()
+        >>> angle = planner.next_angle()
+        >>> planner.update(angle, sensor.measure())
+        >>> planner.front, planner.left, planner.right
+        (120.3, 80.2, 55.0)
+        >>> planner.sides_known()  # 左右の距離が分かっているか
+        True
+        >>> planner.record_decision()
+        >>> planner.stats()
+        {'decisions': 1, 'pings': 3, 'servo_moves': 2, ...}
+    """
+    def __init__(
+        self,
+        side_angle: int = SWEEP_SIDE_ANGLE,
+        wide_angle: int = SWEEP_WIDE_ANGLE,
+        side_scan_cm: float = SWEEP_SIDE_SCAN_DISTANCE_CM,
+        widen_cm: float = SWEEP_WIDEN_DISTANCE_CM,
+    ) -> None:
+        self.side_angle = side_angle
+        self.wide_angle = wide_angle
+        self.side_scan_cm = side_scan_cm
+        self.widen_cm = widen_cm
+        self.current_side_angle = side_angle
+        # 障害物の見逃しを防ぐため、近くなった測定値はすぐに採用する
+        self.filters = {
+            angle: DistanceFilter(accept_closer=True)
+            for angle in (0, -side_angle, side_angle, -wide_angle, wide_angle)
+        }
+        self.occupancy = OccupancyMap()
+        self._valid = {angle: False for angle in self.filters}
+        self._fresh = {angle: False for angle in self.filters}
+        self.scanning = True  # 起動直後は左右も一度測定する
+        self._step = 0
+        self._last_angle = None
+        self.pings = 0
+        self.servo_moves = 0
+        self.decisions = 0
+
+    def next_angle(self) -> int:
+        """次に測定する角度を返す
+
+        Returns:
+            int: 角度
+        """
+        angle = 0
+        if self.scanning:
+            side = self.current_side_angle
+            for _ in range(2):  # 占有マップに新しい測定がある左右は飛ばす
+                angle = (0, -side, 0, side)[self._step % 4]
+                self._step += 1
+                if angle == 0 or not self._recent(angle):
+                    break
+                angle = 0
+        if angle != self._last_angle:
+            self.servo_moves += 1
+            self._last_angle = angle
+        return angle
+
+    def update(self, angle: int, distance: float) -> None:
+        """測定値を取り込み、測定する角度を決め直す
+
+        Args:
+            angle (int): 測定した角度
+            distance (float): 距離（単位：cm）。タイムアウトの場合はNone
+        """
+        self.pings += 1
+        if distance is None:
+            self._valid[angle] = False
+            return
+        self.occupancy.update(angle, self.filters[angle].update(distance))
+        self._valid[angle] = True
+        self._fresh[angle] = True
+        front = self.front
+        if front is None:
+            return
+        if not self.scanning and front < self.side_scan_cm:
+            self.scanning = True
+            self._step = 1  # 次は右から
+            for side in self.filters:
+                self._fresh[side] = side == 0
+        elif (
+            self.scanning
+            and front >= self.side_scan_cm + SWEEP_CRUISE_HYSTERESIS_CM
+            and self.sides_known()
+        ):
+            self.scanning = False
+            self.current_side_angle = self.side_angle
+        elif (
+            self.scanning
+            and self.current_side_angle != self.wide_angle
+            and self.sides_known()
+            and self.left < self.widen_cm
+            and self.right < self.widen_cm
+        ):  # 広げるのは巡航に戻るまで
+            side = self.wide_angle
+            self.current_side_angle = side
+            self._fresh[side] = self._fresh[-side] = False
+
+    def distance(self, angle: int) -> float:
+        """角度ごとの推定した距離（未測定またはタイムアウトの場合はNone）"""
+        if not self._valid[angle]:
+            return None
+        return self.filters[angle].estimate
+
+    @property
+    def front(self) -> float:
+        return self.distance(0)
+
+    @property
+    def left(self) -> float:
+        return self._side_distance(self.current_side_angle)
+
+    @property
+    def right(self) -> float:
+        return self._side_distance(-self.current_side_angle)
+
+    def sides_known(self) -> bool:
+        """左右の距離が分かっているかを返す"""
+        return self.left is not None and self.right is not None
+
+    def _side_distance(self, angle: int) -> float:
+        """左右の距離（左右の測定を始めてから測定していなければ占有マップの値）"""
+        if self._fresh[angle]:
+            return self.distance(angle)
+        return self.occupancy.nearest(angle, OCCUPANCY_MAX_AGE_MS)
+
+    def _recent(self, angle: int) -> bool:
+        age_ms = self.occupancy.age_ms(angle)
+        return age_ms is not None and age_ms <= OCCUPANCY_MAX_AGE_MS
+
+    def record_decision(self) -> None:
+        """モーターの制御を1回行ったことを記録する"""
+        self.decisions += 1
+
+    def stats(self) -> dict:
+        """判断1回あたりのサーボモーターの移動回数と測定回数を返す"""
+        decisions = self.decisions or 1
+        return {
+            "decisions": self.decisions,
+            "pings": self.pings,
+            "servo_moves": self.servo_moves,
+            "pings_per_decision": self.pings / decisions,
+            "servo_moves_per_decision": self.servo_moves / decisions,
+        }
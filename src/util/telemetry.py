@@ -0,0 +1,96 @@
+import os
+import struct
+from array import array
+
+import utime
+
+from src.const import (
+    TELEMETRY_BLOCK_RECORDS,
+    TELEMETRY_FILE_PATH,
+    TELEMETRY_HEADER_FORMAT,
+    TELEMETRY_MAGIC,
+    TELEMETRY_RECORD_FORMAT,
+    TELEMETRY_TAG_TEMPERATURE,
+    TELEMETRY_VERSION,
+)
+from src.util.time import now_epoch_ms
+
+RECORD_SIZE = struct.calcsize(TELEMETRY_RECORD_FORMAT)
+
+
+def _saturate(value: int) -> int:
+    """int16の範囲に収める（struct.pack_intoが送出しない・折り返さないように）"""
+    if value < -32768:
+        return -32768
+    if value > 32767:
+        return 32767
+    return value
+
+
+class TelemetryWriter:
+    """測定値を固定長のバイナリレコードとしてファイルに記録するクラス
+
+    - TELEMETRY_TAGとtelemetry_values_into()を持つオブジェクトと、float（温度）を記録する
+    - レコードは事前に確保したバッファに詰め、ブロック単位で追記する
+    - 読み出しはホスト側の`python -m host.telemetry`で行う
+
+    Examples:
+        >>> telemetry = TelemetryWriter()
+        >>> telemetry.write(amedas.measure())
+        True
+        >>> telemetry.write("text")  # 記録できないものはFalse
+        False
+        >>> telemetry.flush()
+    """
+    def __init__(
+        self, path=TELEMETRY_FILE_PATH, block_records=TELEMETRY_BLOCK_RECORDS
+    ) -> None:
+        self.path = path
+        self._buffer = bytearray(RECORD_SIZE * block_records)
+        self._length = 0
+        self._seq = 0
+        self._values = array("i", bytes(4 * 3))  # 測定値を受け取る（使い回す）
+
+    def write(self, message) -> bool:
+        """測定値を記録する
+
+        Returns:
+            bool: 記録したか（対応していない型の場合はFalse）
+        """
+        values = self._values
+        if isinstance(message, float):
+            tag = TELEMETRY_TAG_TEMPERATURE
+            values[0] = round(message * 100)
+            values[1] = values[2] = 0
+        elif hasattr(message, "TELEMETRY_TAG"):
+            tag = message.TELEMETRY_TAG
+            message.telemetry_values_into(values)
+        else:
+            return False
+        struct.pack_into(
+            TELEMETRY_RECORD_FORMAT, self._buffer, self._length,
+            tag, 0, utime.ticks_ms() & 0xFFFF, now_epoch_ms() // 1000,
+            _saturate(values[0]), _saturate(values[1]), _saturate(values[2]), self._seq,
+        )
+        self._seq = (self._seq + 1) & 0xFFFF
+        self._length += RECORD_SIZE
+        if self._length >= len(self._buffer):
+            self.flush()
+        return True
+
+    def flush(self) -> None:
+        """バッファに溜まっているレコードを書き出す"""
+        if self._length == 0:
+            return
+        try:
+            empty = os.stat(self.path)[6] == 0
+        except OSError:
+            empty = True
+        with open(self.path, "ab") as f:
+            if empty:
+                f.write(struct.pack(
+                    TELEMETRY_HEADER_FORMAT,
+                    TELEMETRY_MAGIC, TELEMETRY_VERSION, RECORD_SIZE, 0,
+                ))
+            f.write(memoryview(self._buffer)[:self._length])
+        self._length = 0
@@ -1,8 +1,46 @@
-import utime
+import errno
+import struct
+
 import ntptime
+import uasyncio
+import usocket
+import utime
+
+from src.const import (
+    TIME_DRIFT_MAX_PPM,
+    TIME_DRIFT_MIN_INTERVAL_SEC,
+    TIME_NTP_HOST,
+    TIME_NTP_POLL_MS,
+    TIME_NTP_TIMEOUT_MS,
+    TIME_SYNC_INTERVAL_SEC,
+    TIME_SYNC_RETRY_SEC,
+    TIME_UTC_OFFSET_SEC,
+    WIFI_STATE_UP,
+)
+
+NTP_DELTA = 2208988800  # 1900-01-01から1970-01-01までの秒数
 
 
 class Time:
+    """日時を表すクラス
+
+    - now()は同じ秒のうちは同じインスタンスを返し、文字列も使い回す
+      （ログを書くたびにタプルや文字列を作らないため）
+    - now()はRTCを読まず、now_epoch_ms()にTIME_UTC_OFFSET_SECを足した地方時を返す
+
+    Examples:
+        >>> str(Time.now())
+        '2024-01-01 12:34:56'
+        >>> Time.now_string()  # Time.now()を作らずに文字列だけ得る
+        '2024-01-01 12:34:56'
+    """
+    __slots__ = (
+        "_year", "_month", "_day", "_hour", "_minute", "_second", "_string"
+    )
+
+    _cached_now = None
+    _valid_until_ms = 0  # monotonic_ms()がこの値になるまでは_cached_nowを返す
+
     def __init__(
         self,
         year: int,
@@ -18,12 +56,15 @@ class Time:
         self._hour = hour
         self._minute = minute
         self._second = second
+        self._string = None
 
     def __str__(self) -> str:
-        return (
-            f"{self._year:04d}-{self._month:02d}-{self._day:02d} "
-            + f"{self._hour:02d}:{self._minute:02d}:{self._second:02d}"
-        )
+        if self._string is None:
+            self._string = (
+                f"{self._year:04d}-{self._month:02d}-{self._day:02d} "
+                + f"{self._hour:02d}:{self._minute:02d}:{self._second:02d}"
+            )
+        return self._string
 
     @classmethod
     def from_string(cls, time_string: str) -> "Time":
@@ -41,9 +82,20 @@ class Time:
 
     @classmethod
     def now(cls) -> "Time":
-        """現在時刻を取得する"""
-        now = utime.localtime()
-        return cls(now[0], now[1], now[2], now[3], now[4], now[5])
+        """現在時刻（地方時）を取得する（同じ秒の間はキャッシュを返す）"""
+        now_ms = monotonic_ms()
+        if now_ms < cls._valid_until_ms:
+            return cls._cached_now
+        epoch_ms = _epoch_ms(now_ms)
+        now = utime.localtime(epoch_ms // 1000 + TIME_UTC_OFFSET_SEC)
+        cls._cached_now = cls(now[0], now[1], now[2], now[3], now[4], now[5])
+        cls._valid_until_ms = now_ms + 1000 - epoch_ms % 1000  # 次の秒の始まり
+        return cls._cached_now
+
+    @classmethod
+    def now_string(cls) -> str:
+        """現在時刻の文字列を取得する（同じ秒の間はキャッシュを返す）"""
+        return str(cls.now())
 
     @property
     def year(self) -> int:
@@ -70,11 +122,197 @@ class Time:
         return self._second
 
 
+_monotonic_ticks = utime.ticks_ms()
+_monotonic_ms = 0
+
+
+def monotonic_ms() -> int:
+    """起動からの経過時間を返す（RTCを読まない安価なタイムスタンプ）
+
+    - ticks_msの折り返し（約12日）を補正する。
+      ただし約6日以上呼び出さないと補正できない
+
+    Returns:
+        int: 経過時間（単位：ms）
+    """
+    global _monotonic_ticks, _monotonic_ms
+    now = utime.ticks_ms()
+    _monotonic_ms += utime.ticks_diff(now, _monotonic_ticks)
+    _monotonic_ticks = now
+    return _monotonic_ms
+
+
+# 起動時にRTCを1回だけ読み、以降はticks_msからUNIX時刻を計算する
+_offset_ms = utime.time() * 1000 - monotonic_ms()  # UNIX時刻[ms] - monotonic_ms()
+_synced_ms = monotonic_ms()  # 最後に時刻を合わせたときのmonotonic_ms()
+_drift_ppm = 0  # ticks_msの進み方の補正（正ならticks_msが遅れている）
+_ntp_synced = False  # NTPで時刻を合わせたことがあるか
+
+
+def _epoch_ms(now_ms: int) -> int:
+    return _offset_ms + now_ms + (now_ms - _synced_ms) * _drift_ppm // 1000000
+
+
+def now_epoch_ms() -> int:
+    """現在のUNIX時刻（UTC）を返す
+
+    - RTCを読まず、monotonic_ms()と最後に時刻を合わせたときの差から計算する
+    - 時刻を合わせてからの経過時間に、見積もったずれの速さ（ppm）の補正をかける
+
+    Returns:
+        int: UNIX時刻（単位：ms）
+    """
+    return _epoch_ms(monotonic_ms())
+
+
+def set_epoch_ms(epoch_ms: int, at_ms: int = None) -> int:
+    """NTPで得た時刻に合わせる
+
+    - 前回NTPで合わせてからTIME_DRIFT_MIN_INTERVAL_SEC以上経っていれば、
+      その間に生じたずれからticks_msのずれの速さを見積もり直す
+
+    Args:
+        epoch_ms (int): at_msの時点のUNIX時刻（単位：ms）
+        at_ms (int): epoch_msを得たときのmonotonic_ms()（省略時は現在）
+
+    Returns:
+        int: 合わせる前の時刻のずれ（単位：ms、正なら遅れていた）
+    """
+    global _offset_ms, _synced_ms, _drift_ppm, _ntp_synced
+    if at_ms is None:
+        at_ms = monotonic_ms()
+    error_ms = epoch_ms - _epoch_ms(at_ms)
+    elapsed_ms = at_ms - _synced_ms
+    if _ntp_synced and elapsed_ms >= TIME_DRIFT_MIN_INTERVAL_SEC * 1000:
+        # 今の補正で取り切れなかったずれの分だけ補正を足す
+        drift_ppm = _drift_ppm + error_ms * 1000000 // elapsed_ms
+        if -TIME_DRIFT_MAX_PPM <= drift_ppm <= TIME_DRIFT_MAX_PPM:
+            _drift_ppm = drift_ppm
+    _offset_ms = epoch_ms - at_ms
+    _synced_ms = at_ms
+    _ntp_synced = True
+    Time._valid_until_ms = 0
+    return error_ms
+
+
+def drift_ppm() -> int:
+    """見積もったticks_msのずれの速さ（単位：ppm）"""
+    return _drift_ppm
+
+
+class TimeSync:
+    """NTPで時刻を合わせ続けるクラス
+
+    - run()をuasyncioのタスクとして実行する。起動時や測定の間に通信を待たない
+    - link（WifiSupervisor）がつながったとき、その後はTIME_SYNC_INTERVAL_SECごとに
+      時刻を合わせる。失敗したらTIME_SYNC_RETRY_SEC後にやり直す
+    - 最初に合わせた後は、ずれの速さを早く見積もるため
+      TIME_DRIFT_MIN_INTERVAL_SEC後に合わせ直す
+    - 問い合わせはブロッキングしないソケットで送り、応答を待つ間は他のタスクを動かす。
+      応答の送信時刻に往復時間の半分を足して、ms単位で合わせる
+      （ntptime.time()は秒単位に切り捨てる）
+
+    Examples:
+        >>> timesync = TimeSync(link=wifi)
+        >>> uasyncio.create_task(timesync.run())
+        >>> now_epoch_ms()  # 時刻を合わせるまでは起動時のRTCの時刻から数える
+        1700000000123
+    """
+    def __init__(self, link=None, host=TIME_NTP_HOST) -> None:
+        self.link = link
+        self.host = host
+        self.stats = {"syncs": 0, "failures": 0, "error_ms": None, "rtt_ms": None, "drift_ppm": 0}
+        self._address = None
+        self._wake = uasyncio.Event()
+        if link is not None:
+            link.on_change(self._on_link_change)
+
+    def _on_link_change(self, state: int) -> None:
+        if state == WIFI_STATE_UP:
+            self._wake.set()
+
+    async def run(self) -> None:
+        """時刻を合わせ続ける（uasyncioのタスクとして実行する）"""
+        while True:
+            synced = False
+            if self.link is None or self.link.connected:
+                synced = await self.sync()
+            self._wake.clear()
+            if not synced:
+                wait_sec = TIME_SYNC_RETRY_SEC
+            elif self.stats["syncs"] == 1:
+                wait_sec = TIME_DRIFT_MIN_INTERVAL_SEC
+            else:
+                wait_sec = TIME_SYNC_INTERVAL_SEC
+            try:
+                await uasyncio.wait_for_ms(self._wake.wait(), wait_sec * 1000)
+            except uasyncio.TimeoutError:
+                pass
+
+    async def sync(self) -> bool:
+        """NTPサーバーに問い合わせて時刻を合わせる
+
+        Returns:
+            bool: 合わせられたか
+        """
+        try:
+            epoch_ms, rtt_ms, at_ms = await self._query()
+        except OSError:
+            self.stats["failures"] += 1
+            self._address = None  # 次は名前解決からやり直す
+            return False
+        self.stats["syncs"] += 1
+        self.stats["error_ms"] = set_epoch_ms(epoch_ms, at_ms)
+        self.stats["rtt_ms"] = rtt_ms
+        self.stats["drift_ppm"] = _drift_ppm
+        return True
+
+    async def _query(self) -> tuple:
+        """NTPの問い合わせを1回行う
+
+        Returns:
+            tuple: (応答を受け取ったときのUNIX時刻[ms], 往復時間[ms], 応答を受け取ったときのmonotonic_ms())
+        """
+        if self._address is None:  # 名前解決はブロッキングするので、結果を使い回す
+            self._address = usocket.getaddrinfo(self.host, 123)[0][-1]
+        query = bytearray(48)
+        query[0] = 0x1B  # LI=0, VN=3, Mode=3（クライアント）
+        s = usocket.socket(usocket.AF_INET, usocket.SOCK_DGRAM)
+        try:
+            s.setblocking(False)
+            sent_ms = monotonic_ms()
+            s.sendto(query, self._address)
+            while True:
+                try:
+                    reply = s.recv(48)
+                    break
+                except OSError as e:
+                    if e.args[0] != errno.EAGAIN:
+                        raise
+                if monotonic_ms() - sent_ms >= TIME_NTP_TIMEOUT_MS:
+                    raise OSError(errno.ETIMEDOUT)
+                await uasyncio.sleep_ms(TIME_NTP_POLL_MS)
+            received_ms = monotonic_ms()
+        finally:
+            s.close()
+        seconds, fraction = struct.unpack_from("!II", reply, 40)
+        if seconds == 0:
+            raise OSError(errno.EIO)  # 時刻が入っていない応答（Kiss-o'-Deathなど）
+        if seconds < 0x80000000:
+            seconds += 0x100000000  # 2036年以降（NTPの時代番号1）
+        rtt_ms = received_ms - sent_ms
+        epoch_ms = (seconds - NTP_DELTA) * 1000 + (fraction * 1000 >> 32) + rtt_ms // 2
+        return epoch_ms, rtt_ms, received_ms
+
+
 def ntp_sync() -> None:
-    """NTPサーバーと時刻を同期する
+    """NTPサーバーと時刻を同期する（応答を待つ間ブロッキングする。通常はTimeSyncを使う）
+
+    - RTCを合わせ、now_epoch_ms()も合わせる（秒単位）
 
     Caution:
         NTPサーバーから取得した時刻はUTCである
     """
-    ntptime.host = "ntp.nict.jp"
+    ntptime.host = TIME_NTP_HOST
     ntptime.settime()
+    set_epoch_ms(utime.time() * 1000)
@@ -0,0 +1,258 @@
+import json
+import os
+
+import network
+import uasyncio
+
+from src.const import (
+    WEBHOOK_BATCH_MAX_LINES,
+    WEBHOOK_QUEUE_MAX,
+    WEBHOOK_RETRY_BASE_MS,
+    WEBHOOK_RETRY_MAX,
+    WEBHOOK_RETRY_MAX_MS,
+    WEBHOOK_SEND_INTERVAL_SEC,
+    WEBHOOK_SPOOL_MAX_BYTES,
+    WEBHOOK_SPOOL_OFFSET_PATH,
+    WEBHOOK_SPOOL_PATH,
+    WEBHOOK_TIMEOUT_MS,
+)
+from src.errors import WebhookError
+from src.secret import WEB_HOOK_URL
+
+
+def _parse_url(url: str) -> tuple:
+    """URLをスキーム、ホスト、ポート、パスに分解する
+
+    Returns:
+        tuple: (https かどうか, ホスト, ポート, パス)
+    """
+    scheme, _, rest = url.partition("://")
+    host, _, path = rest.partition("/")
+    use_ssl = scheme == "https"
+    port = 443 if use_ssl else 80
+    if ":" in host:
+        host, port = host.split(":")
+        port = int(port)
+    return use_ssl, host, port, "/" + path
+
+
+class WebhookSender:
+    """ログをまとめてWebhook(Slack)に送信するクラス
+
+    - put()はキューに積むだけで、送信はrun()のタスクがバックグラウンドで行う
+    - 一定間隔でキューの内容を1回のPOSTにまとめ、接続はkeep-aliveで使い回す
+    - 失敗したら間隔を倍にしながら再送する
+    - Wi-Fiが使えない間や再送を諦めた場合は、フラッシュ上の退避ファイル
+      （上限あり）に書き出し、接続できたときに先に送り直す
+      （送信済みの位置を記録するので、重複は成功を記録する前に電源が切れた場合だけ）
+    - link（WifiSupervisor）を渡した場合は、その接続状態でWi-Fiが使えるか判断する
+
+    Examples:
+        >>> sender = WebhookSender()
+        >>> sender.put("hello")
+        >>> uasyncio.create_task(sender.run())
+    """
+    def __init__(self, url: str = WEB_HOOK_URL, link=None) -> None:
+        self.use_ssl, self.host, self.port, self.path = _parse_url(url)
+        self.queue = []
+        self.stats = {
+            "sent": 0, "posts": 0, "failures": 0, "connections": 0,
+            "spooled": 0, "dropped": 0,
+        }
+        self._wlan = network.WLAN(network.STA_IF)
+        self._link = link
+        self._reader = None
+        self._writer = None
+        self._failures = 0
+        self._backoff_ms = 0
+
+    def put(self, message: str) -> None:
+        """送信するメッセージをキューに積む
+
+        - キューが上限を超えたら、まとめて退避ファイルに書き出す
+        """
+        self.queue.append(message)
+        if len(self.queue) > WEBHOOK_QUEUE_MAX:
+            self.spill_queue()
+
+    async def run(self) -> None:
+        """一定間隔（失敗時は再送間隔）でキューを送信し続ける"""
+        while True:
+            await uasyncio.sleep_ms(
+                self._backoff_ms or WEBHOOK_SEND_INTERVAL_SEC * 1000
+            )
+            await self.send_pending()
+
+    async def send_pending(self) -> bool:
+        """退避ファイルとキューの内容を送信する
+
+        Returns:
+            bool: すべて送信できたか
+        """
+        if self._link is not None:
+            connected = self._link.connected
+        else:
+            connected = self._wlan.isconnected()
+        if not connected:
+            self.spill_queue()
+            self._close()
+            return False
+        pending, self.queue = self.queue, []  # 送信中に積まれたものは次回に回す
+        try:
+            await self._replay_spool()
+            while pending:
+                await self._post(pending[:WEBHOOK_BATCH_MAX_LINES])
+                del pending[:WEBHOOK_BATCH_MAX_LINES]
+        except (OSError, WebhookError, uasyncio.TimeoutError):
+            self.queue = pending + self.queue
+            self.stats["failures"] += 1
+            self._failures += 1
+            self._close()
+            self._backoff_ms = min(
+                WEBHOOK_RETRY_BASE_MS << (self._failures - 1), WEBHOOK_RETRY_MAX_MS
+            )
+            if self._failures >= WEBHOOK_RETRY_MAX or len(self.queue) > WEBHOOK_QUEUE_MAX:
+                self.spill_queue()
+            return False
+        self._failures = 0
+        self._backoff_ms = 0
+        return True
+
+    def spill_queue(self) -> None:
+        """キューの内容をすべて退避ファイルに書き出す"""
+        if self.queue:
+            self._spill(self.queue)
+            self.queue = []
+
+    def _spill(self, messages: list) -> None:
+        """メッセージを退避ファイルに追記する（上限を超えた分は捨てる）"""
+        try:
+            size = os.stat(WEBHOOK_SPOOL_PATH)[6]
+        except OSError:
+            size = 0
+        with open(WEBHOOK_SPOOL_PATH, "a", encoding="utf-8") as f:
+            for message in messages:
+                line = json.dumps(message) + "\n"
+                if size + len(line) > WEBHOOK_SPOOL_MAX_BYTES:
+                    self.stats["dropped"] += 1
+                    continue
+                f.write(line)
+                size += len(line)
+                self.stats["spooled"] += 1
+
+    async def _replay_spool(self) -> None:
+        """退避ファイルの内容を1バッチずつ送信し、送り終えたら削除する
+
+        - 1バッチ分の行だけを読み、RAMに全体を読み込まない
+        - 送信できるたびに送信済みの位置を記録し、途中で失敗しても送信済みのバッチは送り直さない
+        """
+        offset = self._read_spool_offset()
+        while True:
+            messages = []
+            end = offset
+            try:
+                with open(WEBHOOK_SPOOL_PATH, "rb") as f:
+                    f.seek(offset)
+                    while len(messages) < WEBHOOK_BATCH_MAX_LINES:
+                        line = f.readline()
+                        if not line:
+                            break
+                        messages.append(json.loads(line.decode("utf-8")))
+                        end += len(line)
+            except OSError:  # 退避ファイルがない
+                return
+            if not messages:
+                break
+            await self._post(messages)
+            offset = end
+            with open(WEBHOOK_SPOOL_OFFSET_PATH, "w") as f:
+                f.write(str(offset))
+        # 位置を先に消す（退避ファイルだけが残った場合は、最初から送り直す）
+        for path in (WEBHOOK_SPOOL_OFFSET_PATH, WEBHOOK_SPOOL_PATH):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _read_spool_offset(self) -> int:
+        """退避ファイルのうち送信済みのバイト数を返す（記録がなければ0）"""
+        try:
+            with open(WEBHOOK_SPOOL_OFFSET_PATH) as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return 0
+
+    async def _post(self, messages: list) -> None:
+        """メッセージを1件のSlackメッセージにまとめてPOSTする
+
+        - 使い回した接続が切れていた場合は、1回だけ繋ぎ直す
+
+        Raises:
+            WebhookError: 200以外のステータスが返ってきた場合
+        """
+        body = json.dumps({"text": "\n".join(messages)}).encode("utf-8")
+        request = (
+            f"POST {self.path} HTTP/1.1\r\n"
+            + f"Host: {self.host}\r\n"
+            + "Content-Type: application/json\r\n"
+            + f"Content-Length: {len(body)}\r\n"
+            + "Connection: keep-alive\r\n\r\n"
+        ).encode("utf-8") + body
+        for attempt in range(2):
+            reused = self._writer is not None
+            if not reused:
+                await self._connect()
+            try:
+                self._writer.write(request)
+                await self._writer.drain()
+                status = await uasyncio.wait_for_ms(
+                    self._read_response(), WEBHOOK_TIMEOUT_MS
+                )
+                break
+            except OSError:
+                self._close()
+                if not reused or attempt:
+                    raise
+        self.stats["posts"] += 1
+        if status != 200:
+            raise WebhookError(f"webhook returned {status}")
+        self.stats["sent"] += len(messages)
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await uasyncio.wait_for_ms(
+            uasyncio.open_connection(self.host, self.port, ssl=self.use_ssl),
+            WEBHOOK_TIMEOUT_MS,
+        )
+        self.stats["connections"] += 1
+
+    async def _read_response(self) -> int:
+        """レスポンスを読み、ステータスコードを返す"""
+        line = await self._reader.readline()
+        if not line:
+            raise OSError("connection closed")
+        status = int(line.split(None, 2)[1])
+        length = 0
+        keep_alive = True
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                raise OSError("connection closed")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode().partition(":")
+            name = name.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "connection" and value.strip().lower() == "close":
+                keep_alive = False
+        if length:
+            await self._reader.readexactly(length)
+        if not keep_alive:
+            self._close()
+        return status
+
+    def _close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = None
+        self._writer = None
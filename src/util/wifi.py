@@ -1,35 +1,137 @@
 import network
 import uasyncio
+import utime
 from src.secret import WIFI_SSID, WIFI_PASS
+from src.const import (
+    WIFI_CHECK_INTERVAL_MS,
+    WIFI_CONNECT_TIMEOUT_MS,
+    WIFI_POLL_INTERVAL_MS,
+    WIFI_RETRY_BASE_MS,
+    WIFI_RETRY_MAX_MS,
+    WIFI_STATE_CONNECTING,
+    WIFI_STATE_DOWN,
+    WIFI_STATE_UP,
+)
 from src.errors import WifiConnectionTimeoutError
 
 
+async def connect(wlan, timeout_ms: int = WIFI_CONNECT_TIMEOUT_MS) -> int:
+    """接続を開始し、つながるか失敗するかtimeout_msが経つまで待つ
+
+    Args:
+        wlan (network.WLAN): 接続するインターフェース
+        timeout_ms (int): 待つ最大時間（単位：ms）
+
+    Returns:
+        int: 最後の状態（network.STAT_*。つながった場合はSTAT_GOT_IP）
+    """
+    wlan.active(True)
+    wlan.connect(WIFI_SSID, WIFI_PASS)
+
+    start = utime.ticks_ms()
+    while True:
+        status = wlan.status()
+        if status < 0 or status >= network.STAT_GOT_IP:
+            return status
+        if utime.ticks_diff(utime.ticks_ms(), start) >= timeout_ms:
+            return status
+        await uasyncio.sleep_ms(WIFI_POLL_INTERVAL_MS)
+
+
 async def prepare_wifi():
     """wifiの設定を行うためのモジュール
 
+    - つながるまで待ち、つながらなければWifiConnectionTimeoutErrorを送出する
+      （待たずに動き始める場合はWifiSupervisorを使う）
+
     Example:
         >>> import urequests
         >>> r = urequests.get('https://umayadia-apisample.azurewebsites.net/api/persons/Shakespeare')
     """
     wlan = network.WLAN(network.STA_IF)
-    wlan.active(True)
+    wlan_status = await connect(wlan)
 
-    wlan.connect(WIFI_SSID, WIFI_PASS)
-
-    for i in range(10):
-        status = wlan.status()
-        if wlan.status() < 0 or wlan.status() >= network.STAT_GOT_IP:
-            break
-        print(f'Waiting for connection... status={status}')
-        await uasyncio.sleep(1)
-    else:  # breakしなかった場合
+    if 0 <= wlan_status < network.STAT_GOT_IP:
         raise WifiConnectionTimeoutError('Wifi connection timed out.')
-
-    wlan_status = wlan.status()
-
     if wlan_status != network.STAT_GOT_IP:
         raise WifiConnectionTimeoutError(
             'Wi-Fi connection failed. status={}'.format(wlan_status))
 
     print('Wi-fi ready. ifconfig:', wlan.ifconfig())
     return wlan
+
+
+class WifiSupervisor:
+    """Wi-Fiにつながるまで・切れたらつながり直すまで、バックグラウンドで接続を続けるクラス
+
+    - run()をuasyncioのタスクとして実行する。起動時につながるのを待たないので、
+      測定・制御はWi-Fiの有無に関わらずすぐに始められる
+    - 接続に失敗したら間隔を倍にしながら接続し直す（上限WIFI_RETRY_MAX_MS）
+    - 接続した後はWIFI_CHECK_INTERVAL_MSごとに切断していないか確認する
+    - 状態（WIFI_STATE_*）はstate・connectedで読め、変わったときは
+      on_change()で登録した関数を呼び出す（CustomLogging・WebhookSenderが使う）
+
+    Examples:
+        >>> wifi = WifiSupervisor()
+        >>> wifi.on_change(lambda state: print("wifi", state))
+        >>> uasyncio.create_task(wifi.run())
+        >>> wifi.connected  # つながるまではFalse
+        False
+    """
+    def __init__(self) -> None:
+        self.wlan = network.WLAN(network.STA_IF)
+        self.state = WIFI_STATE_DOWN
+        self.last_status = network.STAT_IDLE
+        self.stats = {"attempts": 0, "connects": 0, "failures": 0, "disconnects": 0}
+        self._failures = 0
+        self._listeners = []
+
+    @property
+    def connected(self) -> bool:
+        """つながっているか"""
+        return self.state == WIFI_STATE_UP
+
+    def on_change(self, callback) -> None:
+        """状態が変わったときに呼び出す関数を登録する
+
+        Args:
+            callback (callable): 新しい状態（WIFI_STATE_*）を引数にとる関数
+        """
+        self._listeners.append(callback)
+
+    async def run(self) -> None:
+        """接続を続ける（uasyncioのタスクとして実行する）"""
+        while True:
+            if self.wlan.isconnected():
+                self._failures = 0  # 待っている間につながった場合も、次は短い間隔から
+                self._set_state(WIFI_STATE_UP)
+                await uasyncio.sleep_ms(WIFI_CHECK_INTERVAL_MS)
+                continue
+            if self.state == WIFI_STATE_UP:
+                self.stats["disconnects"] += 1
+            self._set_state(WIFI_STATE_CONNECTING)
+            self.stats["attempts"] += 1
+            self.last_status = await connect(self.wlan)
+            if self.last_status == network.STAT_GOT_IP:
+                self.stats["connects"] += 1
+                self._failures = 0
+                continue
+            self.stats["failures"] += 1
+            self._failures += 1
+            self.wlan.disconnect()
+            self._set_state(WIFI_STATE_DOWN)
+            await uasyncio.sleep_ms(self.backoff_ms())
+
+    def backoff_ms(self) -> int:
+        """次に接続し直すまでの時間（単位：ms）"""
+        if not self._failures:
+            return 0
+        shift = min(self._failures - 1, 16)  # 長く切れていても大きな整数を作らない
+        return min(WIFI_RETRY_BASE_MS << shift, WIFI_RETRY_MAX_MS)
+
+    def _set_state(self, state: int) -> None:
+        if state == self.state:
+            return
+        self.state = state
+        for callback in self._listeners:
+            callback(state)
@@ -1,27 +1,142 @@
-import utime
+import uasyncio
 
 from src import device
+from src.const import (
+    ACQUISITION_ON_CORE1,
+    AMEDAS_MEASURE_INTERVAL_SEC,
+    SCHEDULER_REPORT_INTERVAL_SEC,
+    PRESSURE_DROP_ALERT_HPA,
+    TELEMETRY_TAG_AMEDAS,
+    PROFILE_ENABLED,
+    PROFILE_REPORT_INTERVAL_SEC,
+)
+from src.util import history, profile
 from src.util.logging import CustomLogging
+from src.util.scheduler import Scheduler
+from src.util.acquisition import Acquisition, ReadingBuffer
 from src.util.judge import is_wifi_usable  # noqa: F401
 
 if is_wifi_usable():
-    import uasyncio
-    from src.util.wifi import prepare_wifi
+    from src.util.time import TimeSync
+    from src.util.wifi import WifiSupervisor
 
-    wlan = uasyncio.run(prepare_wifi())
+    # 接続を待たずに始め、つながるまで・切れたらつながり直すまでバックグラウンドで接続する
+    wifi = WifiSupervisor()
+    # つながったら・その後は定期的に、バックグラウンドでNTPで時刻を合わせる
+    timesync = TimeSync(link=wifi)
+else:
+    wifi = None
+    timesync = None
 
-logger = CustomLogging()
+logger = CustomLogging(link=wifi)
 
 amedas = device.AMeDAS(num_sda=12, num_scl=13)
 display = device.Display(num_sda=12, num_scl=13)
 
 
-def run():
+scheduler = Scheduler()
+
+
+async def measure():
+    handle_measurement(await amedas.measure_async())
+
+
+def handle_measurement(measurement: device.AMeDASMeasurement):
+    """測定値を表示・記録する"""
+    display.print(measurement)
+    logger.write(measurement)
+    history.record(measurement)
+
+
+def acquire():
+    """（core1）気圧、温度、湿度を測定し、core0に渡す"""
+    measurement = amedas.measure()
+    readings.publish(
+        TELEMETRY_TAG_AMEDAS,
+        measurement.raw_temperature,
+        measurement.raw_pressure,
+        measurement.raw_humidity,
+    )
+
+
+async def consume():
+    """（core0）core1から受け取った測定値を表示・記録する
+
+    - AMeDASとDisplayは同じI2Cバスを使うが、バスのロックで交互に使う
+    """
     while True:
-        measurement = amedas.measure()
-        display.print(measurement)
-        logger.write(measurement)
-        utime.sleep(10)
+        await readings.wait()
+        while True:
+            reading = readings.read()
+            if reading is None:
+                break
+            _, _, raw_temperature, raw_pressure, raw_humidity, _ = reading
+            handle_measurement(
+                device.AMeDASMeasurement(raw_temperature, raw_pressure, raw_humidity)
+            )
+
+
+pressure_falling = False
+
+
+def check_pressure():
+    """1時間で気圧が大きく下がったら記録する（下がり始めたときだけ）"""
+    global pressure_falling
+    trend = history.get_channel("pressure").trend(60)
+    falling = trend is not None and trend <= -PRESSURE_DROP_ALERT_HPA
+    if falling and not pressure_falling:
+        logger.write(f"pressure falling: {trend:.2f}hPa/h")
+    pressure_falling = falling
+
+
+def report():
+    logger.write(scheduler.report())
+    if timesync is not None:
+        logger.write(f"ntp: {timesync.stats}")
+    if ACQUISITION_ON_CORE1:
+        logger.write(f"core1: {acquisition.report()}")
+
+
+if ACQUISITION_ON_CORE1:
+    # 測定はcore1で行い、core0は表示と記録だけを行う
+    readings = ReadingBuffer()
+    acquisition = Acquisition()
+    acquisition.every(AMEDAS_MEASURE_INTERVAL_SEC * 1000, acquire)
+else:
+    scheduler.every(AMEDAS_MEASURE_INTERVAL_SEC * 1000, measure)
+scheduler.every(60000, check_pressure, offset_ms=60000)
+scheduler.every(
+    SCHEDULER_REPORT_INTERVAL_SEC * 1000,
+    report,
+    offset_ms=SCHEDULER_REPORT_INTERVAL_SEC * 1000,
+)
+
+
+def report_profile():
+    logger.write(f"profile: {profile.report()}")
+
+
+if PROFILE_ENABLED:
+    scheduler.every(
+        PROFILE_REPORT_INTERVAL_SEC * 1000,
+        report_profile,
+        offset_ms=PROFILE_REPORT_INTERVAL_SEC * 1000,
+    )
+
+
+async def main():
+    if wifi is not None:
+        uasyncio.create_task(wifi.run())
+        uasyncio.create_task(timesync.run())
+    if ACQUISITION_ON_CORE1:
+        acquisition.start()
+        await uasyncio.gather(scheduler.run(), consume(), logger.run())
+        return
+    await uasyncio.gather(scheduler.run(), logger.run())
+
+
+def run():
+    uasyncio.run(main())
 
 
 try:
@@ -29,3 +144,7 @@ try:
 except Exception as e:
     logger.write(str(e))
     raise e
+finally:
+    if ACQUISITION_ON_CORE1:
+        acquisition.stop()
+    logger.flush()